@@ -0,0 +1,4 @@
+"""Reproducible benchmarks for scanning, the tree view, search and extraction.
+
+Run with ``python -m benchmarks``; see ``python -m benchmarks --help``.
+"""
@@ -0,0 +1,201 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from src.logger import set_console_level
+from benchmarks.synthetic import TreeSpec, generate_tree
+from benchmarks.scenarios import SCENARIOS, Workspace
+
+RESULTS_VERSION = 1
+DEFAULT_TREE_DIR = os.path.join(tempfile.gettempdir(), "codeextractor-bench", "tree")
+METRICS = ("min", "median")
+
+
+def parse_threshold(value: str):
+    name, _, fraction = value.partition("=")
+    if name not in SCENARIOS or not fraction:
+        raise argparse.ArgumentTypeError(f"expected SCENARIO=FRACTION, got {value!r}")
+    try:
+        return name, float(fraction)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid fraction: {fraction!r}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Time scanning, the tree view, search and extraction on a synthetic tree.",
+    )
+    parser.add_argument(
+        "scenarios", nargs="*", metavar="SCENARIO",
+        help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Timed runs per scenario")
+    parser.add_argument("-o", "--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--tree-dir", default=DEFAULT_TREE_DIR, help="Where the synthetic tree is generated")
+
+    tree = parser.add_argument_group("synthetic tree")
+    defaults = TreeSpec()
+    tree.add_argument("--files", type=int, default=defaults.files)
+    tree.add_argument("--depth", type=int, default=defaults.depth, help="Maximum folder nesting")
+    tree.add_argument("--files-per-dir", type=int, default=defaults.files_per_dir, help="Average files per folder")
+    tree.add_argument("--mean-size", type=int, default=defaults.mean_size, help="Mean text file size in bytes")
+    tree.add_argument("--binary-ratio", type=float, default=defaults.binary_ratio)
+    tree.add_argument("--pdf-ratio", type=float, default=defaults.pdf_ratio)
+    tree.add_argument("--duplicate-ratio", type=float, default=defaults.duplicate_ratio)
+    tree.add_argument("--ignored-ratio", type=float, default=defaults.ignored_ratio)
+    tree.add_argument("--seed", type=int, default=defaults.seed)
+
+    compare = parser.add_argument_group("baseline comparison")
+    compare.add_argument("--baseline", help="Earlier results to compare against; exits 1 on a regression")
+    compare.add_argument(
+        "--threshold", type=float, default=0.15,
+        help="Allowed slowdown as a fraction of the baseline (default: 0.15)",
+    )
+    compare.add_argument(
+        "--scenario-threshold", type=parse_threshold, action="append", default=[], metavar="SCENARIO=FRACTION",
+        help="Override --threshold for one scenario (repeatable)",
+    )
+    compare.add_argument(
+        "--min-delta", type=float, default=0.005,
+        help="Slowdowns under this many seconds are noise, never regressions (default: 0.005)",
+    )
+    compare.add_argument("--metric", choices=METRICS, default="median", help="Statistic compared (default: median)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    return args
+
+
+def run_scenario(scenario, workspace: Workspace, repeat: int) -> dict:
+    times = []
+    counters = {}
+    for _ in range(repeat):
+        state = scenario.setup(workspace)
+        gc.collect()
+        start = time.perf_counter()
+        counters = scenario.run(state) or {}
+        times.append(time.perf_counter() - start)
+    return {
+        "description": scenario.description,
+        "runs": times,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "counters": counters,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, overrides: dict,
+            min_delta: float, metric: str) -> dict:
+    """Each scenario's ratio to the baseline and whether it exceeds its threshold."""
+    scenarios = {}
+    regressions = []
+    for name, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            scenarios[name] = {"status": "new"}
+            continue
+        limit = overrides.get(name, threshold)
+        ratio = current[metric] / base[metric] if base[metric] else float("inf")
+        if ratio > 1 + limit and current[metric] - base[metric] > min_delta:
+            status = "regression"
+            regressions.append(name)
+        elif ratio < 1 - limit and base[metric] - current[metric] > min_delta:
+            status = "improvement"
+        else:
+            status = "ok"
+        scenarios[name] = {
+            "baseline": base[metric], "current": current[metric], "ratio": ratio,
+            "threshold": limit, "status": status,
+        }
+    return {
+        "metric": metric,
+        "same_tree": baseline.get("tree", {}).get("spec") == results["tree"]["spec"],
+        "scenarios": scenarios,
+        "regressions": regressions,
+    }
+
+
+def print_table(results: dict, file=sys.stderr):
+    comparison = results.get("comparison", {}).get("scenarios", {})
+    for name, result in results["scenarios"].items():
+        line = f"{name:<20} median {result['median'] * 1000:9.1f} ms   min {result['min'] * 1000:9.1f} ms"
+        compared = comparison.get(name)
+        if compared and "ratio" in compared:
+            line += f"   {compared['ratio']:5.2f}x baseline  {compared['status']}"
+        print(line, file=file)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Keep stdout for the JSON results
+    set_console_level(logging.WARNING)
+
+    spec = TreeSpec(
+        files=args.files, depth=args.depth, files_per_dir=args.files_per_dir, mean_size=args.mean_size,
+        binary_ratio=args.binary_ratio, pdf_ratio=args.pdf_ratio, duplicate_ratio=args.duplicate_ratio,
+        ignored_ratio=args.ignored_ratio, seed=args.seed,
+    )
+    try:
+        summary = generate_tree(args.tree_dir, spec)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "tree": {"spec": spec.to_dict(), "summary": summary},
+        "repeat": args.repeat,
+        "scenarios": {},
+    }
+    work_dir = tempfile.mkdtemp(prefix="codeextractor-bench-")
+    try:
+        workspace = Workspace(args.tree_dir, work_dir)
+        for name in args.scenarios or SCENARIOS:
+            results["scenarios"][name] = run_scenario(SCENARIOS[name], workspace, args.repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison = compare(
+            results, baseline, args.threshold, dict(args.scenario_threshold), args.min_delta, args.metric,
+        )
+        comparison["baseline"] = args.baseline
+        results["comparison"] = comparison
+        if not comparison["same_tree"]:
+            print("Warning: the baseline was measured on a different synthetic tree", file=sys.stderr)
+        regressed = bool(comparison["regressions"])
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if regressed:
+        print(f"Regressions: {', '.join(results['comparison']['regressions'])}", file=sys.stderr)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import itertools
+from types import SimpleNamespace
+from src import gui
+
+
+def _noop(*args, **kwargs):
+    return None
+
+
+class FakeWidget:
+    """Stands in for any Tk widget: calls are accepted and ignored, options are remembered."""
+
+    def __init__(self, *args, **kwargs):
+        self.options = dict(kwargs)
+
+    def __getitem__(self, key):
+        return self.options.get(key, "")
+
+    def __setitem__(self, key, value):
+        self.options[key] = value
+
+    def configure(self, *args, **kwargs):
+        # ttk.Style.configure(style, **options) has a leading positional
+        self.options.update(kwargs)
+
+    config = configure
+
+    def __getattr__(self, name):
+        return _noop
+
+
+class FakeVar:
+    def __init__(self, master=None, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeEntry(FakeWidget):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.text = ""
+
+    def get(self):
+        return self.text
+
+    def insert(self, index, text):
+        position = len(self.text) if index == "end" else int(index)
+        self.text = self.text[:position] + text + self.text[position:]
+
+    def delete(self, first, last=None):
+        self.text = ""
+
+
+class FakeRoot(FakeWidget):
+    """A Tk root whose after() callbacks run only when drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._ids = itertools.count(1)
+        self.pending = {}
+
+    def after(self, ms, func=None, *args):
+        after_id = f"after#{next(self._ids)}"
+        if func is not None:
+            self.pending[after_id] = (func, args)
+        return after_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def drain(self, skip=()):
+        """Run scheduled callbacks, and those they schedule, until only `skip` ones remain."""
+        ran = 0
+        while True:
+            ready = [(after_id, call) for after_id, call in self.pending.items() if call[0] not in skip]
+            if not ready:
+                return ran
+            for after_id, (func, args) in ready:
+                del self.pending[after_id]
+                func(*args)
+                ran += 1
+
+
+class FakeTreeview(FakeWidget):
+    """The subset of ttk.Treeview the GUI uses, kept in plain dicts.
+
+    calls counts every operation, a machine-independent measure of how much
+    work a scenario asks of the real widget.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ids = itertools.count(1)
+        self.items = {"": {"parent": None, "children": [], "open": True}}
+        self.calls = 0
+        self._focus = ""
+        self._selection = ()
+
+    def insert(self, parent, index, text="", open=False, values=(), tags=()):
+        self.calls += 1
+        iid = f"I{next(self._ids):X}"
+        self.items[iid] = {"parent": parent, "children": [], "text": text, "open": open,
+                           "values": values, "tags": tags}
+        siblings = self.items[parent]["children"]
+        if index == "end":
+            siblings.append(iid)
+        else:
+            siblings.insert(index, iid)
+        return iid
+
+    def delete(self, *iids):
+        self.calls += 1
+        for iid in iids:
+            item = self.items.get(iid)
+            if item is None:
+                continue
+            self.items[item["parent"]]["children"].remove(iid)
+            stack = [iid]
+            while stack:
+                stack.extend(self.items.pop(stack.pop())["children"])
+
+    def get_children(self, item=""):
+        self.calls += 1
+        return tuple(self.items[item]["children"])
+
+    def item(self, iid, option=None, **kwargs):
+        self.calls += 1
+        item = self.items[iid]
+        if kwargs:
+            item.update(kwargs)
+            return None
+        if option is not None:
+            return item[option]
+        return dict(item)
+
+    def parent(self, iid):
+        return self.items[iid]["parent"]
+
+    def exists(self, iid):
+        return iid in self.items
+
+    def _sibling(self, iid, step):
+        siblings = self.items[self.items[iid]["parent"]]["children"]
+        position = siblings.index(iid) + step
+        return siblings[position] if 0 <= position < len(siblings) else ""
+
+    def next(self, iid):
+        return self._sibling(iid, 1)
+
+    def prev(self, iid):
+        return self._sibling(iid, -1)
+
+    def see(self, iid):
+        self.calls += 1
+        parent = self.items[iid]["parent"]
+        while parent:
+            self.items[parent]["open"] = True
+            parent = self.items[parent]["parent"]
+
+    def focus(self, iid=None):
+        if iid is None:
+            return self._focus
+        self._focus = iid
+
+    def selection(self):
+        return self._selection
+
+    def selection_set(self, *iids):
+        self._selection = iids
+
+
+def install():
+    """Point src.gui's Tk references at the fakes, so the real GUI class runs without a display."""
+    gui.tk = SimpleNamespace(Menu=FakeWidget, StringVar=FakeVar, END="end", WORD="word")
+    gui.ttk = SimpleNamespace(
+        Style=FakeWidget, Frame=FakeWidget, Label=FakeWidget, Button=FakeWidget,
+        Combobox=FakeWidget, Progressbar=FakeWidget, Entry=FakeEntry, Treeview=FakeTreeview,
+    )
+    gui.ScrolledText = FakeWidget
+    gui.BooleanVar = FakeVar
+    gui.filedialog = SimpleNamespace(
+        askdirectory=lambda **kwargs: "", askopenfilename=lambda **kwargs: "", asksaveasfilename=lambda **kwargs: "",
+    )
+    gui.messagebox = SimpleNamespace(showinfo=_noop, showwarning=_noop, showerror=_noop)
+    gui.simpledialog = SimpleNamespace(askinteger=_noop, askstring=_noop)
+
+
+def headless_app(file_tree, selection_model) -> 'gui.CodeExtractorGUI':
+    """A CodeExtractorGUI on fake widgets, holding an already scanned tree.
+
+    Background token counting is switched off so scenarios time only the UI work.
+    """
+    install()
+    app = gui.CodeExtractorGUI(FakeRoot())
+    app.start_token_count = _noop
+    app.root_path = file_tree.path
+    app.file_tree = file_tree
+    app.selection_model = selection_model
+    return app
+
+
+def drain(app):
+    """Run the GUI's pending after() callbacks except the queue poller."""
+    return app.root.drain(skip=(app.process_queue,))
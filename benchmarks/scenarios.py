@@ -0,0 +1,231 @@
+import os
+import random
+import shutil
+import subprocess
+import sys
+from collections import OrderedDict
+from typing import Callable, Optional
+from src.file_node import FileNode
+from src.file_utils import scan_directory
+from src.ignore import IgnoreFilter
+from src.scan_cache import scan_with_cache
+from src.selection import SelectionModel
+from src.search_index import SearchIndex, SUBSTRING, GLOB, REGEX, FUZZY
+from src.token_budget import count_tokens, iter_files
+from src.content_cache import ContentCache, DocumentExtractor
+from src.extraction import stream_extract
+from src.output_writer import GZIP
+from benchmarks.headless import headless_app, drain
+
+SEARCH_QUERIES = (
+    (SUBSTRING, "handler"),
+    (GLOB, "*.json"),
+    (REGEX, r"^util_\d+\.py$"),
+    (FUZZY, "hndlr"),
+)
+TOGGLED_FILES = 200
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Workspace:
+    """Paths one benchmark run reads from and writes to; caches live here, not in the user's."""
+
+    def __init__(self, tree_path: str, work_dir: str):
+        self.tree_path = tree_path
+        self.work_dir = work_dir
+
+    def scratch(self, name: str) -> str:
+        """An empty directory for one scenario run."""
+        path = os.path.join(self.work_dir, name)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    def scan(self) -> FileNode:
+        # A fresh tree per run: nodes cache classifications and token counts
+        return scan_directory(self.tree_path, ignore=IgnoreFilter(self.tree_path))
+
+
+class Scenario:
+    """setup(workspace) builds untimed state; run(state) is timed and may return counters."""
+
+    def __init__(self, name: str, description: str, setup: Callable, run: Callable[..., Optional[dict]]):
+        self.name = name
+        self.description = description
+        self.setup = setup
+        self.run = run
+
+
+def _run_startup(ws: Workspace):
+    # A fresh interpreter, as at launch; -X importtime lists every module imported
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main, src.gui"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and line.count("|") == 2:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative)
+    return {
+        "modules": len(modules),
+        # What runs before the window appears; src.gui is imported after it
+        "main_import_us": modules.get("main", 0),
+        "gui_import_us": modules.get("src.gui", 0),
+        # Backends are imported on first use, never at startup
+        "extractor_backends": sum(1 for name in modules if name.startswith("src.extractors.")),
+    }
+
+
+def _populated(ws: Workspace):
+    file_tree = ws.scan()
+    app = headless_app(file_tree, SelectionModel(file_tree))
+    app.populate_tree()
+    drain(app)
+    return app
+
+
+def _expanded(ws: Workspace):
+    app = _populated(ws)
+    _expand_all(app)
+    return app
+
+
+def _expand_all(app):
+    stack = [app.file_tree]
+    while stack:
+        node = stack.pop()
+        if node.children:
+            app.load_children(node.tree_id, batch_size=len(node.children))
+            app.tree.item(node.tree_id, open=True)
+            stack.extend(node.children)
+
+
+def _tree_calls(app, since: int = 0) -> dict:
+    return {"tree_calls": app.tree.calls - since}
+
+
+# Scan
+
+def _run_scan(ws: Workspace):
+    root = ws.scan()
+    return {"files": sum(1 for _ in iter_files(root))}
+
+
+def _setup_scan_cached(ws: Workspace):
+    cache_dir = ws.scratch("scan-cache")
+    scan_with_cache(ws.tree_path, cache_dir=cache_dir, ignore=IgnoreFilter(ws.tree_path))
+    return ws, cache_dir
+
+
+def _run_scan_cached(state):
+    ws, cache_dir = state
+    scan_with_cache(ws.tree_path, cache_dir=cache_dir, ignore=IgnoreFilter(ws.tree_path))
+
+
+# Tree view
+
+def _setup_populate(ws: Workspace):
+    file_tree = ws.scan()
+    return headless_app(file_tree, SelectionModel(file_tree))
+
+
+def _run_populate(app):
+    calls = app.tree.calls
+    app.populate_tree()
+    drain(app)
+    return _tree_calls(app, calls)
+
+
+def _run_expand(app):
+    calls = app.tree.calls
+    _expand_all(app)
+    return _tree_calls(app, calls)
+
+
+def _setup_toggle(ws: Workspace):
+    app = _expanded(ws)
+    files = [node for node, _ in iter_files(app.file_tree)]
+    chosen = random.Random(0).sample(files, min(TOGGLED_FILES, len(files)))
+    return app, [node.tree_id for node in chosen]
+
+
+def _run_toggle(state):
+    app, items = state
+    calls = app.tree.calls
+    root_item = app.file_tree.tree_id
+    # Whole tree off and on again, then scattered single files
+    app.toggle_check(root_item)
+    app.toggle_check(root_item)
+    for item in items:
+        app.toggle_check(item)
+    return _tree_calls(app, calls)
+
+
+def _setup_search(ws: Workspace):
+    app = _populated(ws)
+    app.search_index = SearchIndex()
+    app.search_index.add_tree(app.file_tree)
+    return app
+
+
+def _run_search(app):
+    calls = app.tree.calls
+    counters = {}
+    for mode, query in SEARCH_QUERIES:
+        app.search_mode.set(mode)
+        app.search_entry.delete(0, "end")
+        app.search_entry.insert(0, query)
+        app.search_tree()
+        counters[f"{mode}_matches"] = len(app.search_matches)
+    counters.update(_tree_calls(app, calls))
+    return counters
+
+
+# Token estimates and extraction
+
+def _setup_tokens(ws: Workspace):
+    return ws.scan(), ws.scratch("token-cache")
+
+
+def _run_tokens(state):
+    root, cache_dir = state
+    return {"counted": count_tokens(root, cache_dir=cache_dir), "tokens": root.tokens}
+
+
+def _extract_setup(**options):
+    def setup(ws: Workspace):
+        root = ws.scan()
+        files = [node for node, _ in iter_files(root)]
+        out_dir = ws.scratch("extract")
+        # A cold document cache per run, so every run parses the same PDFs
+        extractor = DocumentExtractor(ContentCache(os.path.join(out_dir, "document-cache")))
+        return files, ws.tree_path, os.path.join(out_dir, "bundle.txt"), extractor, options
+    return setup
+
+
+def _run_extract(state):
+    files, root_path, output_file, extractor, options = state
+    try:
+        stats = stream_extract(files, root_path, output_file, document_extractor=extractor, **options)
+    finally:
+        extractor.close()
+    return {"files": stats.files, "bytes_written": stats.bytes_written, "duplicates": stats.duplicates}
+
+
+SCENARIOS = OrderedDict((s.name, s) for s in (
+    Scenario("startup", "Import the GUI in a fresh interpreter", lambda ws: ws, _run_startup),
+    Scenario("scan", "Scan the tree with ignore rules", lambda ws: ws, _run_scan),
+    Scenario("scan_cached", "Load the tree from a warm scan cache", _setup_scan_cached, _run_scan_cached),
+    Scenario("populate", "Fill the tree view's top level", _setup_populate, _run_populate),
+    Scenario("expand", "Open every folder in the tree view", _populated, _run_expand),
+    Scenario("toggle", "Toggle the root twice and single files", _setup_toggle, _run_toggle),
+    Scenario("search", "Substring, glob, regex and fuzzy name searches", _setup_search, _run_search),
+    Scenario("tokens", "Estimate tokens with a cold cache", _setup_tokens, _run_tokens),
+    Scenario("extract", "Extract every file", _extract_setup(), _run_extract),
+    Scenario(
+        "extract_compressed", "Extract every file, gzip-compressed and deduplicated",
+        _extract_setup(compression=GZIP, dedupe=True), _run_extract,
+    ),
+))
@@ -0,0 +1,183 @@
+import json
+import math
+import os
+import random
+import shutil
+from typing import List
+
+MARKER_FILE = ".benchtree.json"
+
+TEXT_EXTENSIONS = (".py", ".js", ".ts", ".java", ".go", ".c", ".h", ".md", ".json", ".txt")
+BINARY_EXTENSIONS = (".png", ".bin")
+WORDS = (
+    "core", "util", "model", "view", "config", "handler", "service", "parser",
+    "client", "server", "cache", "index", "worker", "schema", "render", "session",
+)
+# Every file's mtime is fixed so cache keys and "recent" ordering repeat across runs
+BASE_MTIME = 1600000000
+
+
+class TreeSpec:
+    """Parameters of a synthetic source tree; the same spec and seed give the same bytes."""
+
+    def __init__(self, files: int = 5000, depth: int = 5, files_per_dir: int = 12, mean_size: int = 4096,
+                 binary_ratio: float = 0.05, pdf_ratio: float = 0.01, duplicate_ratio: float = 0.02,
+                 ignored_ratio: float = 0.05, seed: int = 1):
+        self.files = files
+        self.depth = depth
+        self.files_per_dir = files_per_dir  # average; a new folder is started at this rate
+        self.mean_size = mean_size  # of text files; sizes are log-normal around it
+        self.binary_ratio = binary_ratio
+        self.pdf_ratio = pdf_ratio
+        self.duplicate_ratio = duplicate_ratio  # text files that copy an earlier one
+        self.ignored_ratio = ignored_ratio  # files under build/ and node_modules/
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def _text_lines(rng: random.Random, count: int) -> List[bytes]:
+    templates = (
+        "def {0}_{1}({2}, {3}):",
+        "    return {0}.{1}({2}) + {4}",
+        "    {0} = {1}_{2}[{4}]",
+        "class {0}{1}({2}):",
+        "# {0} {1} {2} {3}",
+        "const {0}{1} = require('{2}/{3}');",
+        "    if ({0} > {4}) {{ {1}({2}); }}",
+        "",
+    )
+    lines = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(4)]
+        lines.append(rng.choice(templates).format(*words, rng.randrange(1000)).encode("ascii"))
+    return lines
+
+
+def _pdf(pages: List[str]) -> bytes:
+    """A minimal PDF with one line of Helvetica text per page."""
+    count = len(pages)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(count))}] "
+        f"/Count {count} >>".encode("ascii"),
+    ]
+    font_id = 3 + 2 * count
+    for i, text in enumerate(pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode("ascii")
+        )
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("ascii")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _is_generated(path: str, spec: TreeSpec) -> bool:
+    try:
+        with open(os.path.join(path, MARKER_FILE), "r", encoding="utf-8") as f:
+            return json.load(f).get("spec") == spec.to_dict()
+    except (OSError, ValueError):
+        return False
+
+
+def generate_tree(path: str, spec: TreeSpec) -> dict:
+    """Write the tree described by spec under path and return a summary of what was written.
+
+    A tree generated earlier from the same spec is reused. path must be empty,
+    missing, or a previous benchmark tree, which is replaced.
+    """
+    marker = os.path.join(path, MARKER_FILE)
+    if _is_generated(path, spec):
+        with open(marker, "r", encoding="utf-8") as f:
+            return json.load(f)["summary"]
+    if os.path.isdir(path) and os.listdir(path):
+        if not os.path.isfile(marker):
+            raise ValueError(f"Refusing to overwrite {path}: not a benchmark tree")
+        shutil.rmtree(path)
+    os.makedirs(path, exist_ok=True)
+
+    rng = random.Random(spec.seed)
+    lines = _text_lines(rng, 4096)
+    # Log-normal sizes with the requested mean, capped so one file can't dominate
+    sigma = 1.0
+    mu = math.log(max(spec.mean_size, 1)) - sigma * sigma / 2
+    max_size = spec.mean_size * 50
+    summary = {"files": 0, "dirs": 0, "bytes": 0, "text": 0, "binary": 0, "pdf": 0,
+               "duplicates": 0, "ignored": 0}
+    dirs = [[]]  # path parts of every folder, the root first
+    nestable = [[]]  # folders shallower than the maximum depth
+    written: List[bytes] = []
+
+    with open(os.path.join(path, ".gitignore"), "w", encoding="utf-8") as f:
+        f.write(f"*.tmp\n{MARKER_FILE}\n")
+
+    for i in range(spec.files):
+        if rng.random() < 1 / max(spec.files_per_dir, 1):
+            parts = rng.choice(nestable) + [f"{rng.choice(WORDS)}_{len(dirs)}"]
+            dirs.append(parts)
+            if len(parts) < spec.depth:
+                nestable.append(parts)
+        else:
+            parts = rng.choice(dirs)
+        if rng.random() < spec.ignored_ratio:
+            parts = [rng.choice(("build", "node_modules"))] + parts
+            summary["ignored"] += 1
+        directory = os.path.join(path, *parts)
+        os.makedirs(directory, exist_ok=True)
+
+        roll = rng.random()
+        if roll < spec.pdf_ratio:
+            name = f"{rng.choice(WORDS)}_{i}.pdf"
+            pages = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(rng.randint(1, 4))]
+            data = _pdf(pages)
+            summary["pdf"] += 1
+        elif roll < spec.pdf_ratio + spec.binary_ratio:
+            # Some carry a code extension, so only the content sniff can reject them
+            extension = rng.choice(BINARY_EXTENSIONS + (".txt",))
+            name = f"{rng.choice(WORDS)}_{i}{extension}"
+            size = min(int(rng.lognormvariate(mu, sigma)), max_size) + 1
+            data = b"\x00" + rng.getrandbits(8 * size).to_bytes(size, "little")
+            summary["binary"] += 1
+        else:
+            name = f"{rng.choice(WORDS)}_{i}{rng.choice(TEXT_EXTENSIONS)}"
+            if written and rng.random() < spec.duplicate_ratio:
+                data = rng.choice(written)
+                summary["duplicates"] += 1
+            else:
+                size = min(int(rng.lognormvariate(mu, sigma)), max_size)
+                start = rng.randrange(len(lines))
+                chunks = []
+                total = 0
+                while total < size:
+                    line = lines[(start + len(chunks)) % len(lines)]
+                    chunks.append(line)
+                    total += len(line) + 1
+                data = b"\n".join(chunks) + b"\n"
+                if len(written) < 256:
+                    written.append(data)
+            summary["text"] += 1
+
+        file_path = os.path.join(directory, name)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        os.utime(file_path, (BASE_MTIME + i, BASE_MTIME + i))
+        summary["files"] += 1
+        summary["bytes"] += len(data)
+
+    summary["dirs"] = len(dirs) - 1
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump({"spec": spec.to_dict(), "summary": summary}, f, indent=1)
+    return summary
@@ -0,0 +1,133 @@
+import argparse
+import json
+import logging
+import sys
+from src.engine import run_extraction
+from src.token_budget import BUDGET_ORDERS, SMALLEST
+from src.output_writer import COMPRESSIONS
+from src.logger import set_console_level
+
+
+def parse_size(value: str) -> int:
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = value.strip().upper().rstrip("B")
+    try:
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="Extract code files into a single text file without the GUI.",
+    )
+    parser.add_argument("roots", nargs="+", help="Directories, or zip and tar archives, to scan")
+    parser.add_argument("-o", "--output", required=True, help="Output file path")
+    parser.add_argument(
+        "-i", "--include", action="append", default=[], metavar="GLOB",
+        help="Only extract files matching this glob (repeatable)",
+    )
+    parser.add_argument(
+        "-x", "--exclude", action="append", default=[], metavar="GLOB",
+        help="Skip files and directories matching this glob (repeatable)",
+    )
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Extraction worker threads")
+    parser.add_argument("--scan-workers", type=int, default=None, help="Directory scanning threads")
+    parser.add_argument("--window", type=int, default=None, help="Maximum files in flight")
+    parser.add_argument("--cache", action="store_true", help="Reuse and update the on-disk scan cache")
+    parser.add_argument(
+        "--archives", action="store_true",
+        help="Read zip and tar files inside the roots as folders instead of skipping them",
+    )
+    parser.add_argument(
+        "--no-ignore", dest="ignore", action="store_false",
+        help="Scan everything, without .gitignore, .codeextractorignore or built-in ignore rules",
+    )
+    parser.add_argument(
+        "--changed", nargs="?", const="HEAD", default=None, metavar="REF",
+        help="Only extract files changed in the git working tree since REF's merge base "
+             "(without REF: uncommitted changes); the roots are not scanned",
+    )
+    parser.add_argument(
+        "--diff", action="store_true",
+        help="With --changed, write changed and deleted files as unified diffs instead of in full",
+    )
+    parser.add_argument(
+        "--token-budget", type=int, default=None,
+        help="Only extract files that fit this many estimated tokens",
+    )
+    parser.add_argument(
+        "--budget-order", choices=BUDGET_ORDERS, default=SMALLEST,
+        help="Which files fill the budget first (default: smallest)",
+    )
+    parser.add_argument(
+        "--shard-size", type=parse_size, default=None, metavar="SIZE",
+        help="Split the output into shards of at most SIZE bytes on disk (suffixes K, M, G)",
+    )
+    parser.add_argument(
+        "--shard-tokens", type=int, default=None, metavar="N",
+        help="Split the output into shards of at most N estimated tokens",
+    )
+    parser.add_argument("--compress", choices=COMPRESSIONS, default=None, help="Compress the output")
+    parser.add_argument(
+        "--no-manifest", dest="manifest", action="store_false",
+        help="Don't write the JSON manifest of shard, offset, length and hash per file",
+    )
+    parser.add_argument(
+        "--dedupe", action="store_true",
+        help="Write identical file contents once; later copies reference the first",
+    )
+    parser.add_argument("--json", action="store_true", help="Print a JSON timing report to stdout")
+    args = parser.parse_args(argv)
+    if args.diff and args.changed is None:
+        parser.error("--diff requires --changed")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.json:
+        # Keep stdout clean for the machine-readable report
+        set_console_level(logging.WARNING)
+
+    try:
+        report = run_extraction(
+            args.roots, args.output, args.include, args.exclude,
+            args.workers, args.window, args.scan_workers, args.cache, args.ignore,
+            args.token_budget, args.budget_order,
+            shard_bytes=args.shard_size, shard_tokens=args.shard_tokens,
+            compression=args.compress, manifest=args.manifest, dedupe=args.dedupe,
+            expand_archives=args.archives, changed_since=args.changed, diffs=args.diff,
+        )
+    except Exception as e:
+        print(f"Extraction failed: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"Extracted {report['files']} files ({report['bytes']} bytes) "
+            f"to {report['output']} in {report['timings']['total']:.2f}s"
+        )
+        if "changed_files" in report:
+            print(f"{report['changed_files']} files changed since {report['changed_since']}")
+        if report["duplicates"]:
+            print(f"Skipped {report['duplicates']} duplicate files, saving {report['bytes_saved']} bytes")
+        if len(report["shards"]) > 1:
+            print(f"Wrote {len(report['shards'])} shards")
+        if report["manifest"]:
+            print(f"Manifest: {report['manifest']}")
+        if "estimated_tokens" in report:
+            print(
+                f"Estimated {report['estimated_tokens']} of {report['token_budget']} tokens, "
+                f"{report['files']} of {report['files_considered']} candidate files"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
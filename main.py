@@ -1,5 +1,4 @@
 import tkinter as tk
-from src.gui import CodeExtractorGUI
 import os
 
 
@@ -12,6 +11,10 @@ def main():
     if os.path.exists(icon_path):
         root.iconbitmap(icon_path)
 
+    # The window is drawn before the rest of the application is imported; spawned
+    # worker processes, which re-import this module, skip that import entirely
+    root.update()
+    from src.gui import CodeExtractorGUI
     gui = CodeExtractorGUI(root)
     root.mainloop()
 
@@ -0,0 +1,374 @@
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+from src.file_node import FileNode
+from src.config import ARCHIVE_EXTENSIONS, ARCHIVE_OPEN_MAX, ARCHIVE_IDLE_HANDLES, ARCHIVE_READ_BUFFER
+
+# A path such as /drops/src.zip/pkg/mod.py names a member of an archive. Such
+# paths never exist on disk, so the functions below resolve them against the
+# archive instead; every other path falls through to the file system.
+
+
+class ArchiveError(OSError):
+    """A corrupt or unsupported archive or member; an OSError, like any unreadable file."""
+
+
+# Raised by zipfile and tarfile for damaged data, besides OSError
+_FORMAT_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error)
+
+
+def is_archive_name(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def is_archive_file(path: str) -> bool:
+    return is_archive_name(path) and os.path.isfile(path)
+
+
+def _member_name(name: str) -> Optional[str]:
+    """Normalised member name, or None for names that would escape the archive."""
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return "/".join(parts)
+
+
+class Archive:
+    """Member index of one archive and a pool of open handles for reading members.
+
+    Each reader checks a handle out for the duration of one member, so
+    formats with random access (zip, uncompressed tar) are read in parallel.
+    """
+
+    random_access = True
+
+    def __init__(self, path: str):
+        self.path = path
+        st = os.stat(path)
+        self.signature = (st.st_size, st.st_mtime_ns)
+        self.files: Dict[str, Tuple[int, float]] = {}  # member -> (size, mtime), in archive order
+        self.dirs: Set[str] = set()
+        self._infos = {}
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+        handle = self._open_handle()
+        try:
+            self._index(handle)
+        finally:
+            self._release(handle)
+        for name in self.files:
+            parent = name.rpartition("/")[0]
+            while parent and parent not in self.dirs:
+                self.dirs.add(parent)
+                parent = parent.rpartition("/")[0]
+
+    def _open_handle(self):
+        raise NotImplementedError
+
+    def _index(self, handle):
+        raise NotImplementedError
+
+    def _open_member(self, handle, name: str) -> BinaryIO:
+        raise NotImplementedError
+
+    def _pick(self, name: str) -> Optional[int]:
+        """Index of the idle handle to read name with, or None to open another."""
+        return len(self._idle) - 1 if self._idle else None
+
+    def _acquire(self, name: str):
+        with self._lock:
+            index = self._pick(name)
+            if index is not None:
+                return self._idle.pop(index)
+        return self._open_handle()
+
+    def _release(self, handle):
+        with self._lock:
+            if not self._closed and len(self._idle) < ARCHIVE_IDLE_HANDLES:
+                self._idle.append(handle)
+                return
+        handle.close()
+
+    @contextmanager
+    def open(self, name: str) -> Iterator[BinaryIO]:
+        if name not in self.files:
+            raise FileNotFoundError(f"No member {name!r} in {self.path}")
+        handle = self._acquire(name)
+        try:
+            try:
+                member = self._open_member(handle, name)
+            except (RuntimeError, NotImplementedError) as e:
+                # Encrypted members and unsupported compression methods
+                raise ArchiveError(f"{name}: {str(e)}") from e
+            # The buffer keeps sniffed leading bytes, so seeking back to the start
+            # never has to restart a compressed stream
+            with io.BufferedReader(member, ARCHIVE_READ_BUFFER) as stream:
+                yield stream
+        except _FORMAT_ERRORS as e:
+            # The handle may be left mid-way through a damaged stream
+            handle.close()
+            handle = None
+            raise ArchiveError(f"{name}: {str(e)}") from e
+        finally:
+            if handle is not None:
+                self._release(handle)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for handle in idle:
+            handle.close()
+
+
+class ZipArchive(Archive):
+    def _open_handle(self):
+        return zipfile.ZipFile(self.path)
+
+    def _index(self, handle):
+        for info in handle.infolist():
+            name = _member_name(info.filename)
+            if name is None:
+                continue
+            if info.is_dir():
+                self.dirs.add(name)
+            else:
+                self.files[name] = (info.file_size, time.mktime(info.date_time + (0, 0, -1)))
+                self._infos[name] = info
+
+    def _open_member(self, handle, name: str) -> BinaryIO:
+        return handle.open(self._infos[name])
+
+
+class TarArchive(Archive):
+    def __init__(self, path: str):
+        # Compressed tars can only be read front to back: seeking backwards
+        # restarts decompression from the beginning of the archive
+        self.random_access = path.lower().endswith(".tar")
+        super().__init__(path)
+
+    def _open_handle(self):
+        return tarfile.open(self.path, "r:*")
+
+    def _index(self, handle):
+        for info in handle:
+            name = _member_name(info.name)
+            if name is None:
+                continue
+            if info.isdir():
+                self.dirs.add(name)
+            elif info.isfile():
+                # Later copies of a name replace earlier ones, as when unpacking;
+                # links and devices are left out
+                self.files.pop(name, None)
+                self.files[name] = (info.size, float(info.mtime))
+                self._infos[name] = info
+        # Iterating keeps every TarInfo on the handle; the index above is enough
+        handle.members = []
+
+    def _pick(self, name: str) -> Optional[int]:
+        if self.random_access:
+            return super()._pick(name)
+        # The handle furthest along that has not yet passed the member only has
+        # to read forward. When every handle is past it, a new handle starts
+        # from the beginning and the others stay where later members need them.
+        offset = self._infos[name].offset_data
+        positions = [handle.fileobj.tell() for handle in self._idle]
+        behind = [i for i, position in enumerate(positions) if position <= offset]
+        if behind:
+            return max(behind, key=positions.__getitem__)
+        if len(self._idle) < ARCHIVE_IDLE_HANDLES:
+            return None
+        return min(range(len(positions)), key=positions.__getitem__)
+
+    def _open_member(self, handle, name: str) -> BinaryIO:
+        return handle.extractfile(self._infos[name])
+
+
+_open_archives: "OrderedDict[str, Archive]" = OrderedDict()
+_browsed: Set[str] = set()  # archives shown as directories in this process
+_open_lock = threading.Lock()
+
+
+def open_archive(path: str) -> Archive:
+    """The archive at path, indexed once and kept open until it changes or is evicted."""
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    with _open_lock:
+        archive = _open_archives.get(key)
+        if archive is not None and archive.signature == (st.st_size, st.st_mtime_ns):
+            _open_archives.move_to_end(key)
+            return archive
+    try:
+        archive = (ZipArchive if key.lower().endswith(".zip") else TarArchive)(key)
+    except _FORMAT_ERRORS as e:
+        raise ArchiveError(f"{path}: {str(e)}") from e
+    with _open_lock:
+        stale = _open_archives.pop(key, None)
+        _open_archives[key] = archive
+        evicted = [stale] if stale is not None else []
+        while len(_open_archives) > ARCHIVE_OPEN_MAX:
+            evicted.append(_open_archives.popitem(last=False)[1])
+    for old in evicted:
+        old.close()
+    return archive
+
+
+def close_archives():
+    with _open_lock:
+        archives = list(_open_archives.values())
+        _open_archives.clear()
+        _browsed.clear()
+    for archive in archives:
+        archive.close()
+
+
+def locate(path: str) -> Optional[Tuple[str, str]]:
+    """(archive path, member name) when path lies inside an archive; member "" is the archive itself.
+
+    Only path components with an archive extension are checked, so ordinary
+    paths cost a few string operations. Nothing is opened.
+    """
+    head = path
+    while True:
+        parent, tail = os.path.split(head)
+        if not tail:
+            return None
+        if is_archive_name(tail) and os.path.isfile(head):
+            member = os.path.relpath(path, head)
+            return head, "" if member == os.curdir else member.replace(os.sep, "/")
+        head = parent
+
+
+def _member(path: str) -> Optional[Tuple[Archive, str]]:
+    located = locate(path)
+    if located is None or not located[1]:
+        return None
+    return open_archive(located[0]), located[1]
+
+
+def mark_browsed(path: str):
+    with _open_lock:
+        _browsed.add(os.path.abspath(path))
+
+
+def is_browsed(path: str) -> bool:
+    """True for an archive shown as a directory by a scan in this process."""
+    with _open_lock:
+        return os.path.abspath(path) in _browsed
+
+
+def isdir(path: str) -> bool:
+    if os.path.isdir(path):
+        return True
+    located = locate(path)
+    if located is None:
+        return False
+    if not located[1]:
+        return is_browsed(path)
+    return located[1] in open_archive(located[0]).dirs
+
+
+def isfile(path: str) -> bool:
+    member = _member(path)
+    if member is None:
+        return os.path.isfile(path) and not is_browsed(path)
+    return member[1] in member[0].files
+
+
+def signature(path: str) -> Tuple[int, int]:
+    """(size, mtime in ns) of a file or archive member."""
+    member = _member(path)
+    if member is None:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    archive, name = member
+    try:
+        size, mtime = archive.files[name]
+    except KeyError:
+        raise FileNotFoundError(path)
+    return size, int(mtime * 1e9)
+
+
+@contextmanager
+def open_file(path: str, seekable: bool = False) -> Iterator[BinaryIO]:
+    """Open a file or archive member for binary reading.
+
+    seekable reads a member into memory first, for parsers that jump around
+    (PDF, zip-based documents); plain reads stream it.
+    """
+    member = _member(path)
+    if member is None:
+        with open(path, "rb") as file:
+            yield file
+        return
+    archive, name = member
+    with archive.open(name) as stream:
+        if seekable:
+            yield io.BytesIO(stream.read())
+        else:
+            yield stream
+
+
+class ArchiveNode(FileNode):
+    """A node inside an archive (or the archive itself): never listed with scandir."""
+
+    __slots__ = ()
+
+    @property
+    def is_listable(self) -> bool:
+        return False
+
+    @property
+    def is_archive_root(self) -> bool:
+        return not isinstance(self.parent, ArchiveNode)
+
+
+def expand(name: str, parent: Optional[FileNode], size: int, mtime: float, archive: Archive,
+           context=None) -> Tuple[ArchiveNode, List[FileNode]]:
+    """Build the virtual directory for archive, named name under parent.
+
+    context is an IgnoreContext for the archive's contents, applied as the
+    scanner would; .gitignore files inside the archive are not read. Returns
+    the archive's node and every node below it.
+    """
+    mark_browsed(archive.path)
+    root = ArchiveNode(name, parent, True, size, mtime)
+    dirs = {"": (root, context)}
+    nodes = []
+
+    def directory(dir_name: str):
+        if dir_name in dirs:
+            return dirs[dir_name]
+        parent_name, _, base = dir_name.rpartition("/")
+        parent_node, parent_context = directory(parent_name)
+        if parent_node is None or parent_context is not None and parent_context.is_ignored(base, True):
+            dirs[dir_name] = (None, None)
+        else:
+            node = ArchiveNode(base, parent_node, True, 0, mtime)
+            parent_node.children.append(node)
+            nodes.append(node)
+            dirs[dir_name] = (node, parent_context.descend(base) if parent_context is not None else None)
+        return dirs[dir_name]
+
+    # Members keep their archive order, which is the only cheap order to read
+    # a compressed tar in; folders are placed where their first member is
+    for member, (member_size, member_mtime) in archive.files.items():
+        parent_name, _, base = member.rpartition("/")
+        parent_node, parent_context = directory(parent_name)
+        if parent_node is None or parent_context is not None and parent_context.is_ignored(base, False):
+            continue
+        node = ArchiveNode(base, parent_node, False, member_size, member_mtime)
+        parent_node.children.append(node)
+        nodes.append(node)
+    for dir_name in sorted(archive.dirs):
+        directory(dir_name)  # Empty folders
+    return root, nodes
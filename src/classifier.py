@@ -0,0 +1,103 @@
+import codecs
+import os
+from typing import BinaryIO, Iterable, Optional, Tuple
+from src.config import CODE_FILE_EXTENSIONS, BINARY_SNIFF_BYTES, MAX_EXTRACT_FILE_BYTES
+from src.extractors import REGISTRY, ExtractorRegistry
+from src import archives
+
+NOT_CODE = "not_code"
+DOCUMENT = "document"  # read by a registered extractor (PDF, notebook, ...)
+TEXT = "text"
+BINARY = "binary"
+UNDECODABLE = "undecodable"
+TOO_LARGE = "too_large"
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+Classification = Tuple[str, Optional[str]]  # (kind, encoding for TEXT)
+
+
+class FileClassifier:
+    """Decides how a file is extracted without reading more than its first few KB.
+
+    Built once: the extension set is normalised up front so each lookup is a
+    single set membership test on the file's suffix.
+    """
+
+    def __init__(self, extensions: Iterable[str] = CODE_FILE_EXTENSIONS,
+                 max_size: int = MAX_EXTRACT_FILE_BYTES, sniff_bytes: int = BINARY_SNIFF_BYTES,
+                 extractors: ExtractorRegistry = REGISTRY):
+        self.extensions = frozenset(ext.lower() for ext in extensions)
+        # Multi-dot extensions such as ".d.ts" need the last N suffixes checked
+        self._max_dots = max((ext.count(".") for ext in self.extensions), default=1)
+        self.max_size = max_size
+        self.sniff_bytes = sniff_bytes
+        self.extractors = extractors
+
+    def has_code_extension(self, filename: str) -> bool:
+        name = os.path.basename(filename).lower()
+        end = len(name)
+        for _ in range(self._max_dots):
+            dot = name.rfind(".", 0, end)
+            if dot == -1:
+                return False
+            if name[dot:] in self.extensions:
+                return True
+            end = dot
+        return False
+
+    def classify_name(self, filename: str) -> Optional[str]:
+        """NOT_CODE or DOCUMENT when the name alone decides, else None (content must be sniffed)."""
+        if not self.has_code_extension(filename):
+            return NOT_CODE
+        if self.extractors.lookup(filename) is not None:
+            return DOCUMENT
+        return None
+
+    def sniff(self, head: bytes, complete: bool = False) -> Classification:
+        """Classify leading bytes; complete means head is the whole file."""
+        for bom, encoding in _BOMS:
+            if head.startswith(bom):
+                return TEXT, encoding
+        if b"\0" in head:
+            return BINARY, None
+        try:
+            # Unless head is the whole file, tolerate a multi-byte character cut off at its end
+            codecs.getincrementaldecoder("utf-8")().decode(head, final=complete)
+        except UnicodeDecodeError:
+            return UNDECODABLE, None
+        return TEXT, "utf-8"
+
+    def classify_open(self, file: BinaryIO, size: Optional[int] = None) -> Classification:
+        """Classify an open binary file by size and leading bytes; leaves the position moved.
+
+        size is required for streams without a file descriptor (archive members).
+        """
+        if size is None:
+            size = os.fstat(file.fileno()).st_size
+        if size > self.max_size:
+            return TOO_LARGE, None
+        head = file.read(self.sniff_bytes)
+        return self.sniff(head, complete=len(head) < self.sniff_bytes)
+
+    def classify(self, file_path: str) -> Classification:
+        kind = self.classify_name(file_path)
+        if kind is not None:
+            return kind, None
+        with archives.open_file(file_path) as file:
+            return self.classify_open(file, archives.signature(file_path)[0])
+
+    def classify_node(self, node) -> Classification:
+        """classify() memoised on the FileNode; the watcher clears it when the file changes."""
+        if node.kind is None:
+            node.kind = self.classify(node.path)
+        return node.kind
+
+
+DEFAULT_CLASSIFIER = FileClassifier()
@@ -1,5 +1,110 @@
+import os
+
 CODE_FILE_EXTENSIONS = {
     '.py', '.js', '.java', '.cpp', '.c', '.h', '.html', '.css', '.php',
     '.rb', '.go', '.ts', '.swift', '.md', '.sh', '.sql', '.json', '.xml',
-    '.yml', '.yaml', '.ini', '.cfg', '.conf', '.txt', '.log', '.csv', '.tsv', '.pdf'
+    '.yml', '.yaml', '.ini', '.cfg', '.conf', '.txt', '.log', '.csv', '.tsv', '.pdf',
+    '.ipynb', '.docx', '.xlsx', '.pptx'
 }
+
+# Extraction pipeline
+EXTRACTION_WINDOW_PER_WORKER = 2  # in-flight files per worker before backpressure
+WRITE_BUFFER_SIZE = 1024 * 1024  # bytes buffered by the output file object
+FLUSH_INTERVAL_BYTES = 8 * 1024 * 1024  # flush to disk after this many bytes
+MAX_EXTRACT_FILE_BYTES = 2 * 1024 * 1024  # larger text files are listed but not read
+MAX_DOCUMENT_FILE_BYTES = 32 * 1024 * 1024  # notebooks and Office files are parsed whole, in-process
+DEDUPE_MIN_BYTES = 128  # smaller files are always written out, never replaced by a reference
+
+# Sampling of large text files: above SAMPLE_MIN_BYTES, files with these
+# extensions are extracted and previewed as a sample instead of skipped.
+# Policies: "full" (no sampling), "head", "tail", "head+tail" (N lines from
+# each end) and "stride" (N lines spread evenly through the file).
+SAMPLE_POLICIES = {
+    '.log': ("head+tail", 200),
+    '.csv': ("head", 200),
+    '.tsv': ("head", 200),
+    '.json': ("head", 500),
+}
+SAMPLE_MIN_BYTES = MAX_EXTRACT_FILE_BYTES
+SAMPLE_MAX_BYTES = 1024 * 1024  # per sample, however long its lines are
+
+# Tree view
+TREE_INSERT_BATCH_SIZE = 200  # rows inserted per event-loop turn when a folder is opened
+
+# Search
+SEARCH_DEBOUNCE_MS = 250  # idle time after the last keystroke before searching
+SEARCH_MAX_RESULTS = 500  # matches revealed in the tree per query
+
+# Content search
+CONTENT_SEARCH_BATCH_SIZE = 64  # files per worker task
+CONTENT_SEARCH_MAX_MATCHES_PER_FILE = 20
+CONTENT_SEARCH_MAX_DISPLAYED = 2000  # result lines written to the preview pane
+BINARY_SNIFF_BYTES = 8192  # leading bytes checked for NUL to detect binaries
+
+# Scan cache
+SCAN_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codeextractor", "scans")
+SCAN_CACHE_MAX_BYTES = 512 * 1024 * 1024
+SCAN_CACHE_MAX_ENTRIES = 50  # cached roots kept before least recently used are evicted
+SCAN_CACHE_STAT_CHUNK = 256  # directories stat'ed per worker task when validating
+
+# File system watching
+WATCH_COALESCE_SECONDS = 0.3  # quiet period before a burst of events is applied
+WATCH_MAX_DELAY_SECONDS = 2.0  # apply anyway when events keep arriving
+WATCH_POLL_INTERVAL_SECONDS = 2.0  # mtime polling fallback
+
+# Archives (zip and tar files browsed as folders)
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+ARCHIVE_OPEN_MAX = 16  # archives kept open and indexed for member reads
+ARCHIVE_IDLE_HANDLES = 8  # open handles kept per archive, one per concurrent reader
+ARCHIVE_READ_BUFFER = 64 * 1024  # buffered per member read; covers the sniffed head
+
+# Extracted content cache (text of isolated extractors such as PDF)
+CONTENT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codeextractor", "content")
+CONTENT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+CONTENT_CACHE_MAX_ENTRIES = 10000
+
+# Preview
+PREVIEW_MAX_CHARS = 4000
+PREVIEW_PDF_PAGES = 3  # leading pages parsed for a PDF preview
+PREVIEW_DOCUMENT_PARTS = 50  # leading cells, paragraphs, slides or sheets parsed for other documents
+PREVIEW_DEBOUNCE_MS = 80  # selection must settle this long before loading
+PREVIEW_CACHE_ENTRIES = 128
+PREVIEW_PREFETCH_NEIGHBOURS = 2  # files loaded ahead on each side of the selection
+
+# Ignore rules applied while scanning (gitignore syntax)
+DEFAULT_IGNORE_PATTERNS = (
+    ".git/", ".hg/", ".svn/",
+    "node_modules/", "bower_components/",
+    "__pycache__/", ".mypy_cache/", ".pytest_cache/", ".tox/",
+    "venv/", ".venv/",
+    "build/", "dist/", "target/",
+    ".idea/", ".vscode/",
+)
+PROJECT_IGNORE_FILE = ".codeextractorignore"
+
+# Token estimates and budget packing
+TOKEN_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codeextractor", "tokens")
+TOKEN_CACHE_MAX_BYTES = 256 * 1024 * 1024
+TOKEN_CACHE_MAX_ENTRIES = 50  # cached roots
+TOKEN_COUNT_BATCH_SIZE = 128  # files per worker task
+# Documents are sized from the file instead of parsed
+PDF_BYTES_PER_TOKEN = 40
+NOTEBOOK_BYTES_PER_TOKEN = 8  # JSON escaping, metadata and outputs around the sources
+OFFICE_BYTES_PER_TOKEN = 6  # zipped XML
+TOKEN_BUDGET_DEFAULT = 100000
+
+# Output shards and compression
+GZIP_LEVEL = 6
+XZ_PRESET = 6
+
+# Git changes (delta extraction)
+GIT_TIMEOUT_SECONDS = 60  # per git command
+GIT_DIFF_CONTEXT_LINES = 3
+
+# Background jobs
+JOB_WORKERS = 6  # enough that long scans and extractions don't hold up previews
+PROGRESS_INTERVAL_SECONDS = 0.2  # progress events passed to the UI at most this often per job
+
+# Logging and statistics
+LOG_LEVEL = os.environ.get("CODEEXTRACTOR_LOG_LEVEL", "INFO")  # name or number; DEBUG logs every toggle and preview
+STATS_REFRESH_MS = 1000  # how often an open Statistics window updates
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+from typing import Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from src.jobs import process_pool
+from src.file_utils import evict_lru
+from src import archives
+from src.extractors import Extractor, extract_to_file
+from src.instrumentation import metrics
+from src.logger import logger
+from src.config import CONTENT_CACHE_DIR, CONTENT_CACHE_MAX_BYTES, CONTENT_CACHE_MAX_ENTRIES
+
+CACHE_SUFFIX = ".txt"
+
+
+class ContentCache:
+    """On-disk cache of extracted text, keyed by path, size and mtime."""
+
+    def __init__(self, cache_dir: str = CONTENT_CACHE_DIR, max_bytes: int = CONTENT_CACHE_MAX_BYTES,
+                 max_entries: int = CONTENT_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, file_path: str, kind: str = "text") -> str:
+        size, mtime_ns = archives.signature(file_path)
+        key = f"{os.path.abspath(file_path)}\0{size}\0{mtime_ns}\0{kind}"
+        digest = hashlib.sha1(key.encode("utf-8", errors="surrogatepass")).hexdigest()
+        return os.path.join(self.cache_dir, digest + CACHE_SUFFIX)
+
+    def lookup(self, file_path: str, kind: str = "text") -> Tuple[Optional[str], str]:
+        """Return (cached entry or None, entry path to store into on a miss)."""
+        entry = self.entry_path(file_path, kind)
+        try:
+            os.utime(entry)  # Recency for LRU eviction
+            self.hits += 1
+            return entry, entry
+        except FileNotFoundError:
+            self.misses += 1
+            return None, entry
+
+    def temp_path(self, entry: str) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def evict(self):
+        if os.path.isdir(self.cache_dir):
+            evict_lru(self.cache_dir, CACHE_SUFFIX, self.max_bytes, self.max_entries)
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            evict_lru(self.cache_dir, CACHE_SUFFIX, 0, 0)
+
+
+class DocumentExtractor:
+    """Runs isolated extractors (PDF) in worker processes, reusing cached results.
+
+    PyPDF2 parsing is CPU-bound, so threads would serialize on the GIL. Safe
+    to call from several threads; the process pool starts on first use, and
+    each worker imports a backend only when it is first given a file for it.
+    """
+
+    def __init__(self, cache: Optional[ContentCache] = None, max_workers: Optional[int] = None):
+        self.cache = cache or ContentCache()
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = process_pool(self.max_workers)
+            return self._executor
+
+    def extract_to_cache(self, path: str, extractor: Extractor) -> str:
+        """Return the path of a cache entry holding the text extractor gets from path."""
+        cached, entry = self.cache.lookup(path, extractor.name)
+        if cached is not None:
+            return cached
+        tmp_path = self.cache.temp_path(entry)
+        try:
+            self._pool().submit(extract_to_file, extractor.name, path, tmp_path).result()
+            os.replace(tmp_path, entry)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return entry
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        self.cache.evict()
+        metrics.count("document_cache_hits", self.cache.hits)
+        metrics.count("document_cache_misses", self.cache.misses)
+        logger.debug("Document cache: %d hits, %d misses", self.cache.hits, self.cache.misses)
@@ -0,0 +1,114 @@
+import mmap
+import os
+import re
+from concurrent.futures import as_completed
+from threading import Event
+from typing import Callable, List, Optional, Sequence, Tuple
+from src.file_node import FileNode
+from src import archives
+from src.jobs import process_pool
+from src.config import CONTENT_SEARCH_BATCH_SIZE, CONTENT_SEARCH_MAX_MATCHES_PER_FILE, BINARY_SNIFF_BYTES
+
+SNIPPET_LENGTH = 200
+
+ContentMatch = Tuple[FileNode, int, str]
+
+
+def compile_query(query: str, regex: bool = False, ignore_case: bool = True) -> "re.Pattern":
+    source = query.encode("utf-8")
+    if not regex:
+        source = re.escape(source)
+    # Matches are reported per line, so anchors should work per line too
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    return re.compile(source, flags)
+
+
+def _search_buffer(data, pattern: "re.Pattern", max_matches: int) -> List[Tuple[int, str]]:
+    """Matches in bytes or an mmap, which support the same find and slice operations."""
+    matches = []
+    if data.find(b"\0", 0, BINARY_SNIFF_BYTES) != -1:
+        return matches
+    line_no, counted_to = 1, 0
+    for match in pattern.finditer(data):
+        start = match.start()
+        line_no += data[counted_to:start].count(b"\n")
+        counted_to = start
+        # The snippet is the match's line, or on long lines a window that opens at
+        # most half a snippet before the match; the scans stay within that window
+        window_start = max(0, start - SNIPPET_LENGTH // 2)
+        line_start = data.rfind(b"\n", window_start, start) + 1 or window_start
+        window_end = min(len(data), line_start + SNIPPET_LENGTH)
+        line_end = data.find(b"\n", start, window_end)
+        if line_end == -1:
+            line_end = window_end
+        snippet = data[line_start:line_end].decode("utf-8", errors="replace").strip()
+        matches.append((line_no, snippet))
+        if len(matches) >= max_matches:
+            break
+    return matches
+
+
+def search_file(path: str, pattern: "re.Pattern", max_matches: int) -> List[Tuple[int, str]]:
+    """Return (line number, snippet) for matches in a text file; binaries yield nothing."""
+    try:
+        located = archives.locate(path)
+        if located is not None and located[1]:
+            # Archive members can't be mapped; they are read into memory instead
+            with archives.open_file(path) as f:
+                return _search_buffer(f.read(), pattern, max_matches)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _search_buffer(mm, pattern, max_matches)
+    except (OSError, ValueError):
+        # Unreadable files, and files that shrank to zero before mmap
+        return []
+
+
+def _search_batch(batch: List[Tuple[int, str]], pattern: "re.Pattern", max_matches: int):
+    results = []
+    for file_id, path in batch:
+        for line_no, snippet in search_file(path, pattern, max_matches):
+            results.append((file_id, line_no, snippet))
+    return results
+
+
+def search_contents(
+    nodes: Sequence[FileNode],
+    pattern: "re.Pattern",
+    on_matches: Optional[Callable[[List[ContentMatch]], None]] = None,
+    max_workers: Optional[int] = None,
+    cancel_event: Optional[Event] = None,
+) -> List[ContentMatch]:
+    """Search file nodes in parallel worker processes.
+
+    Matches are passed to on_matches batch by batch as workers finish, and the
+    full list is returned at the end.
+    """
+    files = [node for node in nodes if not node.is_dir]
+    if not files:
+        return []
+    batches = [
+        [(i, files[i].path) for i in range(start, min(start + CONTENT_SEARCH_BATCH_SIZE, len(files)))]
+        for start in range(0, len(files), CONTENT_SEARCH_BATCH_SIZE)
+    ]
+
+    all_matches = []
+    executor = process_pool(max_workers)
+    try:
+        futures = [
+            executor.submit(_search_batch, batch, pattern, CONTENT_SEARCH_MAX_MATCHES_PER_FILE)
+            for batch in batches
+        ]
+        for future in as_completed(futures):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            matches = [(files[i], line_no, snippet) for i, line_no, snippet in future.result()]
+            if matches:
+                all_matches.extend(matches)
+                if on_matches:
+                    on_matches(matches)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return all_matches
@@ -0,0 +1,167 @@
+import os
+import time
+from fnmatch import fnmatch
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.file_node import FileNode
+from src.archives import ArchiveNode, is_archive_file, close_archives
+from src.file_utils import scan_directory
+from src.scan_cache import scan_with_cache
+from src.ignore import IgnoreFilter
+from src.extraction import stream_extract
+from src.git_delta import GitChanges
+from src.token_budget import count_tokens, pack_budget, SMALLEST
+from src.instrumentation import metrics
+from src.logger import logger
+
+# Headless counterpart of CodeExtractorGUI: scanning, selection and extraction
+# without importing tkinter, so it can run on display-less build machines.
+
+
+def _matches(rel_path: str, name: str, patterns: Sequence[str]) -> bool:
+    return any(fnmatch(rel_path, p) or fnmatch(name, p) for p in patterns)
+
+
+def collect_files(
+    node: FileNode,
+    base_path: str,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+) -> List[Tuple[FileNode, str]]:
+    """Return (file node, path relative to base_path) under node in tree order,
+    filtered by include/exclude globs."""
+    selected = []
+    root_rel = os.path.relpath(node.path, base_path).replace(os.sep, "/")
+    stack = [(node, "" if root_rel == "." else root_rel)]
+    while stack:
+        current, rel_path = stack.pop()
+        if current is not node and _matches(rel_path, current.name, exclude):
+            continue
+        if current.is_dir:
+            prefix = rel_path + "/" if rel_path else ""
+            # Archive members stay in archive order, the cheap order to read a compressed tar in
+            children = current.children if isinstance(current, ArchiveNode) else sorted(
+                current.children, key=lambda c: c.name
+            )
+            stack.extend((c, prefix + c.name) for c in reversed(children))
+        elif not include or _matches(rel_path, current.name, include):
+            selected.append((current, rel_path))
+    return selected
+
+
+def run_extraction(
+    roots: Sequence[str],
+    output_file: str,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    max_workers: Optional[int] = None,
+    window: Optional[int] = None,
+    scan_workers: Optional[int] = None,
+    use_cache: bool = False,
+    use_ignore: bool = True,
+    token_budget: Optional[int] = None,
+    budget_order: str = SMALLEST,
+    shard_bytes: Optional[int] = None,
+    shard_tokens: Optional[int] = None,
+    compression: Optional[str] = None,
+    manifest: bool = True,
+    dedupe: bool = False,
+    expand_archives: bool = False,
+    changed_since: Optional[str] = None,
+    diffs: bool = False,
+) -> Dict:
+    """Scan roots, select files and extract them to output_file; returns a report.
+
+    With changed_since (a git ref; "HEAD" for uncommitted changes) only the
+    files git reports as changed are considered and the roots are not
+    scanned. diffs then writes changed files as unified diffs, deleted
+    files included.
+    """
+    roots = [os.path.abspath(r) for r in roots]
+    for root in roots:
+        if not os.path.isdir(root) and not is_archive_file(root):
+            raise NotADirectoryError(f"Not a directory or archive: {root}")
+    # Single root keeps GUI-compatible relative paths; several roots are made
+    # relative to their common parent so the headers stay unambiguous.
+    base_path = roots[0] if len(roots) == 1 else os.path.commonpath(
+        [os.path.dirname(r) for r in roots]
+    )
+
+    timings = {}
+    start = time.perf_counter()
+
+    changes = None
+    changes_report = {}
+    if changed_since is not None:
+        # git already knows what changed, so the trees hold just those files
+        changesets = [GitChanges(root, changed_since) for root in roots]
+        trees = [changeset.build_tree(include_deleted=diffs) for changeset in changesets]
+        if diffs:
+            changes = {path: change for changeset in changesets for path, change in changeset.changes.items()}
+        changes_report = {
+            "changed_since": changed_since,
+            "changed_files": sum(len(changeset) for changeset in changesets),
+        }
+        logger.info(f"{changes_report['changed_files']} files changed since {changed_since}")
+    else:
+        scan = scan_with_cache if use_cache else scan_directory
+        trees = [
+            scan(
+                root, max_workers=scan_workers, ignore=IgnoreFilter(root) if use_ignore else None,
+                expand_archives=expand_archives,
+            )
+            for root in roots
+        ]
+    timings["scan"] = time.perf_counter() - start
+
+    mark = time.perf_counter()
+    candidates = []
+    for tree in trees:
+        candidates.extend(collect_files(tree, base_path, include, exclude))
+    selected_files = [node for node, _ in candidates]
+    timings["select"] = time.perf_counter() - mark
+
+    budget_report = {}
+    if token_budget is not None:
+        # Estimates come from the token cache where possible; files that don't
+        # fit are dropped here and never read by the extractor
+        mark = time.perf_counter()
+        for tree in trees:
+            count_tokens(tree, max_workers=max_workers, partial=changed_since is not None)
+        selected_files, estimated = pack_budget(candidates, token_budget, order=budget_order)
+        timings["tokens"] = time.perf_counter() - mark
+        budget_report = {
+            "token_budget": token_budget,
+            "estimated_tokens": estimated,
+            "files_considered": len(candidates),
+        }
+
+    mark = time.perf_counter()
+    try:
+        stats = stream_extract(
+            selected_files, base_path, output_file, max_workers=max_workers, window=window,
+            shard_bytes=shard_bytes, shard_tokens=shard_tokens, compression=compression, manifest=manifest,
+            dedupe=dedupe, changes=changes,
+        )
+    finally:
+        close_archives()
+    timings["extract"] = time.perf_counter() - mark
+    timings["total"] = time.perf_counter() - start
+
+    logger.info(f"Headless extraction finished in {timings['total']:.2f}s")
+    return {
+        "roots": roots,
+        "output": os.path.abspath(output_file),
+        "files": stats.files,
+        "bytes": stats.bytes_written,
+        "content_bytes": stats.content_bytes,
+        "duplicates": stats.duplicates,
+        "bytes_saved": stats.bytes_saved,
+        "bytes_per_second": stats.bytes_per_second,
+        "shards": [os.path.abspath(path) for path in stats.shard_files],
+        "manifest": os.path.abspath(stats.manifest_file) if stats.manifest_file else None,
+        "timings": timings,
+        # Spans (scan, extract, write, ...) and cache counters for this process
+        "metrics": metrics.snapshot(),
+        **budget_report,
+        **changes_report,
+    }
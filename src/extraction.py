@@ -0,0 +1,301 @@
+import hashlib
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Mapping, Optional, Sequence, Union
+from src.file_node import FileNode
+from src import archives
+from src.archives import ArchiveNode
+from src.classifier import (
+    FileClassifier, Classification, DEFAULT_CLASSIFIER, NOT_CODE, DOCUMENT, TEXT, BINARY, UNDECODABLE, TOO_LARGE,
+)
+from src.extractors import SkippedContent
+from src.sampling import policy_for, read_sample
+from src.content_cache import DocumentExtractor
+from src.git_delta import Change, GitError
+from src.output_writer import BundleWriter, PreparedEntry, StreamedEntry, prepare_entry
+from src.instrumentation import metrics
+from src.logger import logger
+from src.config import EXTRACTION_WINDOW_PER_WORKER, FLUSH_INTERVAL_BYTES, WRITE_BUFFER_SIZE, DEDUPE_MIN_BYTES
+
+SEPARATOR = "-" * 80
+
+SKIPPED_BODIES = {
+    NOT_CODE: "Non-code file (content not extracted)\n",
+    BINARY: "Binary file (content not extracted)\n",
+    UNDECODABLE: "Unable to read file: encoding error\n",
+    TOO_LARGE: "File exceeds the size limit (content not extracted)\n",
+}
+
+
+class ExtractionStats:
+    def __init__(self, output_file: str):
+        self.output_file: str = output_file
+        self.files: int = 0
+        self.bytes_written: int = 0  # on disk, after compression
+        self.content_bytes: int = 0
+        self.duplicates: int = 0
+        self.bytes_saved: int = 0  # uncompressed content replaced by references
+        self.elapsed: float = 0.0
+        self.shard_files: List[str] = []
+        self.manifest_file: Optional[str] = None
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_written / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.files} items, {self.bytes_written / (1024 * 1024):.1f} MB "
+            f"in {self.elapsed:.2f}s ({self.bytes_per_second / (1024 * 1024):.1f} MB/s)"
+        ) + (f", {len(self.shard_files)} shards" if len(self.shard_files) > 1 else "") + (
+            f", {self.duplicates} duplicates ({self.bytes_saved / (1024 * 1024):.1f} MB saved)"
+            if self.duplicates else ""
+        )
+
+
+def _read_text(item_path: str, classification: Optional[Classification], classifier: FileClassifier,
+               member_size: Optional[int] = None):
+    """Return (body, classification), opening the file at most once and only if it is text.
+
+    member_size is the size of an archive member; files on disk are fstat'ed.
+    """
+    if classification is not None and classification[0] != TEXT:
+        return SKIPPED_BODIES[classification[0]], classification
+    with archives.open_file(item_path) as code_file:
+        if classification is None:
+            classification = classifier.classify_open(code_file, member_size)
+            if classification[0] != TEXT:
+                return SKIPPED_BODIES[classification[0]], classification
+            code_file.seek(0)
+        return io.TextIOWrapper(code_file, encoding=classification[1]).read(), classification
+
+
+def build_entry(item: Union[str, FileNode], root_path: str,
+                document_extractor: Optional[DocumentExtractor] = None,
+                classifier: FileClassifier = DEFAULT_CLASSIFIER,
+                changes: Optional[Mapping[str, Change]] = None):
+    """Return the output for one item as bytes, or a StreamedEntry for cached document text.
+
+    item is a path or a FileNode; for nodes the classification is cached on the
+    node so re-extracting skips binaries and oversized files without opening them.
+    Documents go to the extractor registered for their extension; isolated
+    ones run on document_extractor when given. Large files with a sampling
+    policy (src.sampling) are written as a sample. Items found in changes
+    (absolute path -> git Change) are written as their unified diff. Encoding
+    runs here, on the worker, so the writer only moves bytes.
+    """
+    node = item if isinstance(item, FileNode) else None
+    item_path = item.path if node is not None else item
+    relative_path = os.path.relpath(item_path, root_path)
+    change = changes.get(os.path.abspath(item_path)) if changes is not None else None
+    if change is not None:
+        try:
+            body = change.diff() or "No differences\n"
+        except GitError as e:
+            body = f"Error reading diff: {str(e)}\n"
+        return f"File: {relative_path}\n{SEPARATOR}\n{body}\n\n".encode("utf-8")
+    if node.is_dir if node is not None else not archives.isfile(item_path):
+        return f"Directory: {relative_path}\n{SEPARATOR}\n\n".encode("utf-8")
+
+    header = f"File: {relative_path}\n{SEPARATOR}\n"
+    footer = "\n\n"
+    kind = classifier.classify_name(item_path)
+    if kind == NOT_CODE:
+        body = SKIPPED_BODIES[NOT_CODE]
+    elif kind == DOCUMENT:
+        extractor = classifier.extractors.lookup(item_path)
+        try:
+            if extractor.too_large(archives.signature(item_path)[0]):
+                raise SkippedContent(TOO_LARGE)
+            if extractor.isolated and document_extractor is not None:
+                body_path = document_extractor.extract_to_cache(item_path, extractor)
+                return StreamedEntry(header.encode("utf-8"), body_path, footer.encode("utf-8"))
+            body = extractor.extract(item_path)
+        except SkippedContent as e:
+            body = SKIPPED_BODIES[e.kind]
+        except Exception as e:
+            body = f"Error extracting {extractor.label} content: {str(e)}\n"
+    else:
+        try:
+            cached = None
+            if isinstance(node, ArchiveNode):
+                size = member_size = node.size
+                cached = node.kind
+            elif node is not None:
+                # Stat'ed now rather than taken from the scan: files grow after it, and
+                # a cached classification only holds for the size and mtime it was made at
+                st = os.stat(item_path)
+                size, member_size = st.st_size, None
+                if (node.size, node.mtime) == (st.st_size, st.st_mtime):
+                    cached = node.kind
+            else:
+                size = archives.signature(item_path)[0]
+                member_size = size if archives.locate(item_path) else None
+            policy = policy_for(item_path, size)
+            body = read_sample(item_path, policy, classifier=classifier) if policy is not None else None
+            if body is None:
+                body, classification = _read_text(item_path, cached, classifier, member_size)
+                if node is not None:
+                    node.kind = classification
+        except SkippedContent as e:
+            body = SKIPPED_BODIES[e.kind]
+        except UnicodeDecodeError:
+            body = SKIPPED_BODIES[UNDECODABLE]
+            if node is not None:
+                node.kind = (UNDECODABLE, None)
+        except Exception as e:
+            body = f"Error reading file: {str(e)}\n"
+    return (header + body + footer).encode("utf-8")
+
+
+def _content_hash(entry, header: bytes, footer: bytes) -> Optional[str]:
+    """sha256 of an entry's body, or None when it is too small to be worth a reference."""
+    if isinstance(entry, StreamedEntry):
+        if os.path.getsize(entry.body_path) < DEDUPE_MIN_BYTES:
+            return None
+        digest = hashlib.sha256()
+        with open(entry.body_path, "rb") as body:
+            for chunk in iter(lambda: body.read(WRITE_BUFFER_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    # Directory entries and skipped-file placeholders fall under the size floor too
+    if not entry.startswith(header) or len(entry) - len(header) - len(footer) < DEDUPE_MIN_BYTES:
+        return None
+    return hashlib.sha256(memoryview(entry)[len(header):len(entry) - len(footer)]).hexdigest()
+
+
+def _extract_item(item: Union[str, FileNode], root_path: str, document_extractor: DocumentExtractor,
+                  classifier: FileClassifier, compression: Optional[str], count_tokens: bool,
+                  dedupe: bool = False, changes: Optional[Mapping[str, Change]] = None) -> PreparedEntry:
+    item_path = item.path if isinstance(item, FileNode) else item
+    relative_path = os.path.relpath(item_path, root_path)
+    entry = build_entry(item, root_path, document_extractor, classifier, changes)
+    content_hash = None
+    if dedupe:
+        content_hash = _content_hash(entry, f"File: {relative_path}\n{SEPARATOR}\n".encode("utf-8"), b"\n\n")
+    prepared = prepare_entry(relative_path, entry, compression, count_tokens)
+    prepared.content_hash = content_hash
+    return prepared
+
+
+def _duplicate_reference(entry: PreparedEntry, first_path: str, compression: Optional[str],
+                         count_tokens: bool) -> PreparedEntry:
+    relative_path = entry.path.replace("/", os.sep)
+    text = f"File: {relative_path}\n{SEPARATOR}\nDuplicate of: {first_path.replace('/', os.sep)} (content omitted)\n\n"
+    reference = prepare_entry(relative_path, text.encode("utf-8"), compression, count_tokens)
+    reference.duplicate_of = first_path
+    return reference
+
+
+def manifest_path(output_file: str) -> str:
+    """bundle.txt -> bundle.manifest.json"""
+    for suffix in (".gz", ".xz"):
+        if output_file.endswith(suffix):
+            output_file = output_file[:-len(suffix)]
+    return os.path.splitext(output_file)[0] + ".manifest.json"
+
+
+def stream_extract(
+    selected_items: Sequence[Union[str, FileNode]],
+    root_path: str,
+    output_file: str,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    max_workers: Optional[int] = None,
+    window: Optional[int] = None,
+    flush_interval: int = FLUSH_INTERVAL_BYTES,
+    classifier: FileClassifier = DEFAULT_CLASSIFIER,
+    shard_bytes: Optional[int] = None,
+    shard_tokens: Optional[int] = None,
+    compression: Optional[str] = None,
+    manifest: bool = True,
+    dedupe: bool = False,
+    document_extractor: Optional[DocumentExtractor] = None,
+    changes: Optional[Mapping[str, Change]] = None,
+) -> ExtractionStats:
+    """Extract selected items to output_file in order, holding at most `window` results in memory.
+
+    With shard_bytes or shard_tokens the output is split into numbered shards
+    (bundle.000.txt, ...) capped at that many bytes on disk or estimated tokens.
+    compression is "gzip" or "xz"; entries are compressed on the workers. A
+    manifest beside the output records each entry's shard, offset, length
+    and sha256. With dedupe, files whose content already appeared are written
+    as a one-line reference to the first copy. A document_extractor passed
+    in is left open for the caller to reuse or close. Items listed in
+    changes (see src.git_delta) are written as unified diffs instead of in
+    full.
+
+    The output is binary: entries are written as the UTF-8 bytes built for
+    them, with no newline translation, so text files read in full come out
+    with "\n" line endings on every platform, Windows included.
+
+    An exception, including one raised by progress_callback to cancel the
+    extraction, removes the partial output before propagating.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    window = max(1, window or max_workers * EXTRACTION_WINDOW_PER_WORKER)
+    total_items = len(selected_items)
+    stats = ExtractionStats(output_file)
+    start = time.perf_counter()
+
+    items = iter(selected_items)
+    pending = deque()
+    owns_extractor = document_extractor is None
+    if owns_extractor:
+        document_extractor = DocumentExtractor()
+    writer = BundleWriter(
+        output_file, root_path, shard_bytes, shard_tokens, compression,
+        manifest_path(output_file) if manifest else None, flush_interval,
+    )
+    count_tokens = bool(shard_tokens)
+    first_paths = {}  # content hash -> first path written with that content
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            def fill_window():
+                while len(pending) < window:
+                    item = next(items, None)
+                    if item is None:
+                        return
+                    pending.append(executor.submit(
+                        _extract_item, item, root_path, document_extractor, classifier, compression,
+                        count_tokens, dedupe, changes,
+                    ))
+
+            fill_window()
+            while pending:
+                # Waiting on the oldest future keeps output ordered; new work is only
+                # submitted once a slot frees up, which bounds memory to the window.
+                entry = pending.popleft().result()
+                fill_window()
+                if entry.content_hash is not None:
+                    # Decided here, in output order, so the first copy is always the one kept
+                    first_path = first_paths.setdefault(entry.content_hash, entry.path)
+                    if first_path != entry.path:
+                        reference = _duplicate_reference(entry, first_path, compression, count_tokens)
+                        stats.duplicates += 1
+                        stats.bytes_saved += entry.size - reference.size
+                        entry = reference
+                stats.bytes_written += writer.write(entry)
+                stats.content_bytes += entry.size
+                stats.files += 1
+                if progress_callback:
+                    progress_callback(stats.files, total_items)
+    except BaseException:
+        writer.discard()
+        raise
+    else:
+        writer.close()
+    finally:
+        if owns_extractor:
+            document_extractor.close()
+    stats.shard_files = writer.shard_files
+    stats.manifest_file = writer.manifest_file
+
+    stats.elapsed = time.perf_counter() - start
+    metrics.record("extract", stats.elapsed, files=stats.files, bytes=stats.content_bytes)
+    logger.info(f"Extracted to {output_file}: {stats.summary()}")
+    return stats
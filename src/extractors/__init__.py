@@ -0,0 +1,146 @@
+"""Content extractors for formats that are not plain text, keyed by extension.
+
+Backends are modules exposing iter_text(file, max_parts=None), which yields
+the text of an open binary file piece by piece; max_parts caps the pages,
+cells, slides or sheets read. A backend module is imported the first time a
+file needs it, so formats that are never opened cost nothing at startup.
+"""
+import importlib
+import os
+import threading
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional
+from src.archives import open_file
+from src.config import (
+    PDF_BYTES_PER_TOKEN, NOTEBOOK_BYTES_PER_TOKEN, OFFICE_BYTES_PER_TOKEN, PREVIEW_PDF_PAGES, PREVIEW_DOCUMENT_PARTS,
+    MAX_DOCUMENT_FILE_BYTES,
+)
+
+# Imported at startup: keep this module free of any backend's dependencies.
+
+
+class SkippedContent(Exception):
+    """Raised by a backend for content it will not extract; kind is a classifier kind."""
+
+    def __init__(self, kind: str):
+        super().__init__(kind)
+        self.kind = kind
+
+
+class Extractor:
+    """One backend, named by module path and imported on first use.
+
+    isolated backends are CPU-bound in pure Python, so extraction runs them in
+    worker processes and caches the text. bytes_per_token, when set, sizes
+    token estimates from the file instead of extracting it. Files over
+    max_bytes are listed but not read.
+    """
+
+    def __init__(self, name: str, module: str, label: str, isolated: bool = False,
+                 preview_parts: Optional[int] = None, bytes_per_token: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self.name = name
+        self.module = module
+        self.label = label
+        self.isolated = isolated
+        self.preview_parts = preview_parts
+        self.bytes_per_token = bytes_per_token
+        self.max_bytes = max_bytes
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = importlib.import_module(self.module)
+        return self._backend
+
+    @property
+    def loaded(self) -> bool:
+        return self._backend is not None
+
+    def too_large(self, size: int) -> bool:
+        return self.max_bytes is not None and size > self.max_bytes
+
+    def iter_text(self, file: BinaryIO, max_parts: Optional[int] = None) -> Iterator[str]:
+        return self.backend.iter_text(file, max_parts)
+
+    def extract(self, path: str) -> str:
+        with open_file(path, seekable=True) as file:
+            # Joined once at the end; repeated += made long documents quadratic
+            return "".join(self.iter_text(file))
+
+    def extract_to_file(self, path: str, out_path: str) -> int:
+        """Write the text of path to out_path piece by piece; return the pieces written."""
+        pieces = 0
+        with open_file(path, seekable=True) as file, open(out_path, "w", encoding="utf-8") as out:
+            for text in self.iter_text(file):
+                out.write(text)
+                pieces += 1
+        return pieces
+
+
+class ExtractorRegistry:
+    def __init__(self):
+        self._by_extension: Dict[str, Extractor] = {}
+        self._by_name: Dict[str, Extractor] = {}
+        self._max_dots = 1
+
+    def register(self, extensions: Iterable[str], extractor: Extractor):
+        """Route files with these extensions to extractor; later registrations win."""
+        self._by_name[extractor.name] = extractor
+        for ext in extensions:
+            ext = ext.lower()
+            self._by_extension[ext] = extractor
+            self._max_dots = max(self._max_dots, ext.count("."))
+
+    def lookup(self, filename: str) -> Optional[Extractor]:
+        """The extractor for filename, or None for plain text. Imports nothing."""
+        name = os.path.basename(filename).lower()
+        end = len(name)
+        for _ in range(self._max_dots):
+            dot = name.rfind(".", 0, end)
+            if dot == -1:
+                return None
+            extractor = self._by_extension.get(name[dot:])
+            if extractor is not None:
+                return extractor
+            end = dot
+        return None
+
+    def get(self, name: str) -> Extractor:
+        return self._by_name[name]
+
+    def extensions(self) -> frozenset:
+        return frozenset(self._by_extension)
+
+    def __iter__(self) -> Iterator[Extractor]:
+        return iter(list(self._by_name.values()))
+
+
+# Files without a registered extractor are read as text after sniffing
+TEXT = Extractor("text", "src.extractors.text", "text")
+
+REGISTRY = ExtractorRegistry()
+REGISTRY.register((".pdf",), Extractor(
+    "pdf", "src.extractors.pdf", "PDF", isolated=True,
+    preview_parts=PREVIEW_PDF_PAGES, bytes_per_token=PDF_BYTES_PER_TOKEN,
+))
+REGISTRY.register((".ipynb",), Extractor(
+    "notebook", "src.extractors.notebook", "notebook",
+    preview_parts=PREVIEW_DOCUMENT_PARTS, bytes_per_token=NOTEBOOK_BYTES_PER_TOKEN, max_bytes=MAX_DOCUMENT_FILE_BYTES,
+))
+REGISTRY.register((".docx", ".xlsx", ".pptx"), Extractor(
+    "office", "src.extractors.office", "Office document",
+    preview_parts=PREVIEW_DOCUMENT_PARTS, bytes_per_token=OFFICE_BYTES_PER_TOKEN, max_bytes=MAX_DOCUMENT_FILE_BYTES,
+))
+
+
+def extractor_for(filename: str) -> Extractor:
+    return REGISTRY.lookup(filename) or TEXT
+
+
+def extract_to_file(name: str, path: str, out_path: str) -> int:
+    """Worker process entry point: the registered extractor's extract_to_file."""
+    return REGISTRY.get(name).extract_to_file(path, out_path)
@@ -0,0 +1,26 @@
+import json
+from typing import BinaryIO, Iterator, Optional
+
+
+def _source(cell: dict) -> str:
+    # nbformat 4 stores "source", nbformat 3 code cells "input"; either may be a list of lines
+    source = cell.get("source", cell.get("input", ""))
+    return "".join(source) if isinstance(source, list) else source
+
+
+def iter_text(file: BinaryIO, max_parts: Optional[int] = None) -> Iterator[str]:
+    """Cell sources in percent format ("# %%" markers); max_parts caps the cells.
+
+    Outputs are left out: they are mostly images and reprs that cost tokens
+    without showing any code.
+    """
+    notebook = json.load(file)
+    cells = notebook.get("cells")
+    if cells is None:
+        cells = [cell for sheet in notebook.get("worksheets", []) for cell in sheet.get("cells", [])]
+    for index, cell in enumerate(cells):
+        if max_parts is not None and index >= max_parts:
+            break
+        cell_type = cell.get("cell_type", "code")
+        marker = "# %%" if cell_type == "code" else f"# %% [{cell_type}]"
+        yield f"{marker}\n{_source(cell).rstrip()}\n\n"
@@ -0,0 +1,168 @@
+import posixpath
+import re
+import zipfile
+from typing import BinaryIO, Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+# Word, Excel and PowerPoint files are zip archives of XML parts. Elements are
+# matched on their local name, so transitional and strict OOXML namespaces
+# both work, and large parts are parsed incrementally.
+
+_SLIDE_PART = re.compile(r"ppt/slides/slide(\d+)\.xml$")
+_COLUMN = re.compile(r"[A-Z]+")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _paragraph_text(paragraph) -> str:
+    parts = []
+    for element in paragraph.iter():
+        name = _local(element.tag)
+        if name == "t" and element.text:
+            parts.append(element.text)
+        elif name == "tab":
+            parts.append("\t")
+        elif name in ("br", "cr"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _iter_document(archive: zipfile.ZipFile, max_parts: Optional[int]) -> Iterator[str]:
+    """Word: one paragraph per line; max_parts caps the paragraphs."""
+    paragraphs = 0
+    with archive.open("word/document.xml") as part:
+        for _, element in ElementTree.iterparse(part):
+            if _local(element.tag) != "p":
+                continue
+            yield _paragraph_text(element) + "\n"
+            element.clear()
+            paragraphs += 1
+            if max_parts is not None and paragraphs >= max_parts:
+                return
+
+
+def _iter_presentation(archive: zipfile.ZipFile, max_parts: Optional[int]) -> Iterator[str]:
+    """PowerPoint: the text of each slide under a heading; max_parts caps the slides."""
+    slides = sorted(
+        (int(match.group(1)), name)
+        for name in archive.namelist() for match in [_SLIDE_PART.match(name)] if match
+    )
+    for number, name in slides[:max_parts]:
+        with archive.open(name) as part:
+            root = ElementTree.parse(part).getroot()
+        lines = [_paragraph_text(p) for p in root.iter() if _local(p.tag) == "p"]
+        body = "\n".join(line for line in lines if line.strip())
+        yield f"# Slide {number}\n{body}\n\n"
+
+
+def _relationships(archive: zipfile.ZipFile, part_name: str) -> Dict[str, str]:
+    """Relationship id -> target part name for one part."""
+    folder, name = posixpath.split(part_name)
+    rels_name = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_name not in archive.NameToInfo:
+        return {}
+    with archive.open(rels_name) as part:
+        root = ElementTree.parse(part).getroot()
+    targets = {}
+    for rel in root:
+        target = rel.get("Target", "")
+        # Targets are relative to the part's folder unless absolute
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+        targets[rel.get("Id")] = target
+    return targets
+
+
+def _shared_strings(archive: zipfile.ZipFile) -> List[str]:
+    if "xl/sharedStrings.xml" not in archive.NameToInfo:
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as part:
+        for _, element in ElementTree.iterparse(part):
+            if _local(element.tag) == "si":
+                # Phonetic runs (rPh) annotate the string; they are not part of it
+                strings.append("".join(
+                    t.text or "" for run in element if _local(run.tag) != "rPh"
+                    for t in run.iter() if _local(t.tag) == "t"
+                ))
+                element.clear()
+    return strings
+
+
+def _column(ref: str) -> Optional[int]:
+    match = _COLUMN.match(ref)
+    if match is None:
+        return None
+    index = 0
+    for letter in match.group():
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def _cell_value(cell, shared: List[str]) -> str:
+    kind = cell.get("t")
+    value = None
+    for child in cell:
+        name = _local(child.tag)
+        if name == "v":
+            value = child.text or ""
+        elif name == "is":
+            value = "".join(t.text or "" for t in child.iter() if _local(t.tag) == "t")
+    if value is None:
+        return ""
+    if kind == "s":
+        try:
+            return shared[int(value)]
+        except (ValueError, IndexError):
+            return ""
+    if kind == "b":
+        return "TRUE" if value == "1" else "FALSE"
+    return value
+
+
+def _iter_workbook(archive: zipfile.ZipFile, max_parts: Optional[int]) -> Iterator[str]:
+    """Excel: each sheet as tab-separated rows; max_parts caps the sheets."""
+    with archive.open("xl/workbook.xml") as part:
+        workbook = ElementTree.parse(part).getroot()
+    targets = _relationships(archive, "xl/workbook.xml")
+    sheets = []
+    for sheet in workbook.iter():
+        if _local(sheet.tag) == "sheet":
+            rel_id = next((value for key, value in sheet.attrib.items() if _local(key) == "id"), None)
+            sheets.append((sheet.get("name", ""), targets.get(rel_id)))
+    shared = _shared_strings(archive)
+    for name, target in sheets[:max_parts]:
+        if target is None or target not in archive.NameToInfo:
+            continue
+        yield f"# Sheet: {name}\n"
+        with archive.open(target) as part:
+            for _, element in ElementTree.iterparse(part):
+                if _local(element.tag) != "row":
+                    continue
+                cells = []
+                for cell in element:
+                    if _local(cell.tag) != "c":
+                        continue
+                    # Sparse rows keep their columns: skipped cells become empty fields
+                    column = _column(cell.get("r", ""))
+                    if column is not None and column > len(cells):
+                        cells.extend([""] * (column - len(cells)))
+                    cells.append(_cell_value(cell, shared))
+                element.clear()
+                if any(cells):
+                    yield "\t".join(cells).rstrip("\t") + "\n"
+        yield "\n"
+
+
+def iter_text(file: BinaryIO, max_parts: Optional[int] = None) -> Iterator[str]:
+    with zipfile.ZipFile(file) as archive:
+        names = archive.NameToInfo
+        if "word/document.xml" in names:
+            yield from _iter_document(archive, max_parts)
+        elif "ppt/presentation.xml" in names:
+            yield from _iter_presentation(archive, max_parts)
+        elif "xl/workbook.xml" in names:
+            yield from _iter_workbook(archive, max_parts)
+        else:
+            raise ValueError("not a Word, Excel or PowerPoint document")
@@ -0,0 +1,11 @@
+from typing import BinaryIO, Iterator, Optional
+import PyPDF2
+
+
+def iter_text(file: BinaryIO, max_parts: Optional[int] = None) -> Iterator[str]:
+    """Page by page; max_parts caps the pages parsed."""
+    reader = PyPDF2.PdfReader(file)
+    for page_number, page in enumerate(reader.pages):
+        if max_parts is not None and page_number >= max_parts:
+            break
+        yield (page.extract_text() or "") + "\n"
@@ -0,0 +1,32 @@
+import io
+from typing import BinaryIO, Iterator, Optional
+from src.classifier import DEFAULT_CLASSIFIER, FileClassifier, TEXT
+from src.extractors import SkippedContent
+
+CHUNK_CHARS = 64 * 1024
+
+
+def iter_text(file: BinaryIO, max_parts: Optional[int] = None,
+              classifier: FileClassifier = DEFAULT_CLASSIFIER) -> Iterator[str]:
+    """Decoded text in chunks of CHUNK_CHARS; max_parts caps the chunks.
+
+    The encoding is sniffed from the leading bytes; binaries and undecodable
+    files raise SkippedContent before anything is yielded.
+    """
+    head = file.read(classifier.sniff_bytes)
+    kind, encoding = classifier.sniff(head, complete=len(head) < classifier.sniff_bytes)
+    if kind != TEXT:
+        raise SkippedContent(kind)
+    file.seek(0)
+    reader = io.TextIOWrapper(file, encoding=encoding)
+    try:
+        chunks = 0
+        while max_parts is None or chunks < max_parts:
+            chunk = reader.read(CHUNK_CHARS)
+            if not chunk:
+                return
+            yield chunk
+            chunks += 1
+    finally:
+        # The caller owns file; detaching stops the wrapper from closing it
+        reader.detach()
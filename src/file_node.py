@@ -2,16 +2,73 @@ from typing import List, Optional
 import os
 
 class FileNode:
-    def __init__(self, path: str, parent: Optional['FileNode'] = None):
-        self.path: str = path
+    # Slots instead of a per-instance __dict__: scans of 1M+ entries keep one
+    # of these per entry. Only the root keeps its full path; every other node
+    # stores its entry name and derives the path from its ancestors.
+    __slots__ = (
+        "_name", "parent", "children", "tree_id", "is_dir", "size", "mtime",
+        "leaf_count", "checked_count", "kind", "tokens",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional['FileNode'] = None,
+        is_dir: Optional[bool] = None,
+        size: int = 0,
+        mtime: float = 0.0,
+    ):
+        self._name: str = name
         self.parent: Optional['FileNode'] = parent
-        self.children: List['FileNode'] = []
+        if is_dir is None:
+            # Only taken for nodes built without a DirEntry, such as the scan root
+            is_dir = os.path.isdir(self.path)
+        self.is_dir: bool = is_dir
+        # Files share an empty tuple rather than each holding an empty list
+        self.children: List['FileNode'] = [] if is_dir else ()
         self.tree_id: Optional[str] = None
+        self.size: int = size
+        self.mtime: float = mtime
+        # Maintained by SelectionModel
+        self.leaf_count: int = 1
+        self.checked_count: int = 0
+        # (kind, encoding) cached by FileClassifier.classify_node
+        self.kind: Optional[tuple] = None
+        # Estimated tokens (see src.token_budget); directories hold their total
+        self.tokens: Optional[int] = None
+
+    @classmethod
+    def from_entry(cls, entry: os.DirEntry, parent: 'FileNode') -> 'FileNode':
+        try:
+            is_dir = entry.is_dir()
+            is_link = entry.is_symlink()
+            st = entry.stat()
+            size, mtime = (0 if is_dir else st.st_size), st.st_mtime
+        except OSError:
+            # Broken symlinks and entries removed mid-scan
+            is_dir, is_link, size, mtime = False, False, 0, 0.0
+        node = cls(entry.name, parent, is_dir, size, mtime)
+        if is_dir and is_link:
+            # Symlinked directories are recorded but never listed, which keeps
+            # link cycles from recursing forever
+            node.children = ()
+        return node
+
+    @property
+    def is_listable(self) -> bool:
+        """True for directories the scanner lists (not symlinked ones)."""
+        return self.is_dir and self.children != ()
 
     @property
     def name(self) -> str:
-        return os.path.basename(self.path)
+        return self._name if self.parent is not None else os.path.basename(self._name)
 
     @property
-    def is_dir(self) -> bool:
-        return os.path.isdir(self.path)
+    def path(self) -> str:
+        parts = []
+        node = self
+        while node.parent is not None:
+            parts.append(node._name)
+            node = node.parent
+        parts.append(node._name)
+        return os.path.join(*reversed(parts))
@@ -1,7 +1,14 @@
 import os
-import PyPDF2
-from typing import Set, List, Callable
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Set, List, Callable, Optional, Tuple
 from src.file_node import FileNode
+from src import archives
+from src.search_index import SearchIndex
+from src.classifier import DEFAULT_CLASSIFIER
+from src.ignore import IgnoreContext, IgnoreFilter, GITIGNORE_FILE
+from src.instrumentation import metrics
 from src.logger import logger
 from src.config import CODE_FILE_EXTENSIONS
 
@@ -10,29 +17,134 @@ def get_code_extensions() -> Set[str]:
 
 def is_code_file(filename: str, custom_extensions: Set[str] = set()) -> bool:
     """Check if the file is a code file based on its extension."""
-    extensions = get_code_extensions().union(custom_extensions)
-    return any(filename.lower().endswith(ext) for ext in extensions)
+    if DEFAULT_CLASSIFIER.has_code_extension(filename):
+        return True
+    return any(filename.lower().endswith(ext) for ext in custom_extensions)
 
-def scan_directory(path: str, progress_callback: Callable[[str], None] = None) -> FileNode:
-    root = FileNode(path)
-    stack = [root]
-    
-    while stack:
-        node = stack.pop()
+def expand_archive(node: FileNode, path: str, context: Optional[IgnoreContext] = None) -> Tuple[FileNode, List[FileNode]]:
+    """Return the archive file node as a virtual directory and the nodes below it.
+
+    Unreadable archives are logged and returned unchanged, as plain files.
+    """
+    try:
+        archive = archives.open_archive(path)
+        return archives.expand(node.name if node.parent is not None else node.path, node.parent,
+                               node.size, node.mtime, archive, context)
+    except Exception as e:
+        logger.error(f"Unable to read archive {path}: {str(e)}")
+        return node, []
+
+def _list_directory(node: FileNode, context: Optional[IgnoreContext] = None,
+                    expand_archives: bool = False) -> Tuple[List[Tuple[FileNode, Optional[IgnoreContext]]], List[FileNode]]:
+    """Read one directory, attach its entries to node and return the subdirectories.
+
+    Entries matched by context are dropped here, so ignored directories are
+    never opened. Each subdirectory is returned with the context it inherits.
+    With expand_archives, archive files become virtual directories; every
+    node found inside them is returned as well.
+    """
+    subdirs = []
+    members = []
+    node_path = node.path
+    try:
+        with os.scandir(node_path) as it:
+            entries = list(it)
+        if context is not None:
+            context = context.enter(node_path, any(e.name == GITIGNORE_FILE for e in entries))
+        for entry in entries:
+            if context is not None and context.is_ignored(entry.name, entry.is_dir()):
+                continue
+            child = FileNode.from_entry(entry, node)
+            if expand_archives and not child.is_dir and archives.is_archive_name(entry.name):
+                child, inside = expand_archive(
+                    child, entry.path, context.descend(child.name) if context is not None else None
+                )
+                members.extend(inside)
+            node.children.append(child)
+            if child.is_listable:
+                subdirs.append((child, context.descend(child.name) if context is not None else None))
+    except PermissionError:
+        logger.error(f"Permission denied: {node_path}")
+    except Exception as e:
+        logger.error(f"Error scanning directory {node_path}: {str(e)}")
+    return subdirs, members
+
+def scan_directory(
+    path: str,
+    progress_callback: Callable[[int, int], None] = None,
+    max_workers: Optional[int] = None,
+    index: Optional[SearchIndex] = None,
+    ignore: Optional[IgnoreFilter] = None,
+    expand_archives: bool = False,
+) -> FileNode:
+    """Scan path in a single pass, listing directories concurrently.
+
+    progress_callback receives the running totals of entries and directories
+    discovered so far, once per directory listed; an exception it raises
+    abandons the scan, dropping the listings still queued. When index is given, every
+    node is added to it as its directory is listed. When ignore is given,
+    ignored entries are left out and ignored subtrees are never listed.
+
+    A zip or tar file as path is scanned from its member index, without
+    unpacking it. expand_archives does the same for archives inside the tree.
+    """
+    start = time.perf_counter()
+    if archives.is_archive_file(path):
+        st = os.stat(path)
+        root, members = expand_archive(
+            FileNode(path, None, False, st.st_size, st.st_mtime), path,
+            ignore.context_for(path) if ignore is not None else None,
+        )
+        if not root.is_dir:
+            raise ValueError(f"Unable to read archive: {path}")
+        if index is not None:
+            index.add([root])
+            index.add(members)
+        if progress_callback:
+            progress_callback(len(members), sum(1 for node in members if node.is_dir))
+        metrics.record("scan", time.perf_counter() - start, entries=len(members))
+        return root
+    try:
+        # Taken before listing, so a change made during the scan shows up on the next refresh
+        root_mtime = os.stat(path).st_mtime
+    except OSError:
+        root_mtime = 0.0  # listing it logs the error
+    root = FileNode(path, mtime=root_mtime)
+    if index is not None:
+        index.add([root])
+    results = queue.Queue()
+    entries_found = 0
+    dirs_found = 0
+
+    # Each node's children list is only ever written by the worker listing that
+    # directory, so the tree itself needs no locking.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit(node, context):
+            future = executor.submit(_list_directory, node, context, expand_archives)
+            future.add_done_callback(lambda f: results.put((node, f)))
+
+        submit(root, ignore.context_for(path) if ignore is not None else None)
+        outstanding = 1
         try:
-            with os.scandir(node.path) as entries:
-                for entry in entries:
-                    child = FileNode(entry.path, parent=node)
-                    node.children.append(child)
-                    if child.is_dir:
-                        stack.append(child)
-                    if progress_callback:
-                        progress_callback(entry.path)
-        except PermissionError:
-            logger.error(f"Permission denied: {node.path}")
-        except Exception as e:
-            logger.error(f"Error scanning directory {node.path}: {str(e)}")
-    
+            while outstanding:
+                node, future = results.get()
+                subdirs, members = future.result()
+                outstanding -= 1
+                for subdir, context in subdirs:
+                    submit(subdir, context)
+                outstanding += len(subdirs)
+                entries_found += len(node.children) + len(members)
+                if index is not None:
+                    index.add(node.children)
+                    index.add(members)
+                dirs_found += len(subdirs)
+                if progress_callback:
+                    progress_callback(entries_found, dirs_found)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    metrics.record("scan", time.perf_counter() - start, entries=entries_found, dirs=dirs_found)
     return root
 
 def filter_files(node: FileNode, include_extensions: Set[str] = set(), exclude_extensions: Set[str] = set()) -> List[str]:
@@ -42,19 +154,29 @@ def filter_files(node: FileNode, include_extensions: Set[str] = set(), exclude_e
         for child in node.children:
             filtered_files.extend(filter_files(child, include_extensions, exclude_extensions))
     else:
-        _, ext = os.path.splitext(node.path)
+        _, ext = os.path.splitext(node.name)
         if (not include_extensions or ext in include_extensions) and ext not in exclude_extensions:
             filtered_files.append(node.path)
     
     return filtered_files
 
-def extract_pdf_content(file_path: str) -> str:
-    content = ""
-    try:
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                content += page.extract_text() + "\n"
-    except Exception as e:
-        content = f"Error extracting PDF content: {str(e)}"
-    return content
+def evict_lru(cache_dir: str, suffix: str, max_bytes: int, max_entries: int):
+    """Delete the least recently used files ending in suffix until both limits are met."""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(suffix):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    while entries and (total > max_bytes or len(entries) > max_entries):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
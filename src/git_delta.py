@@ -0,0 +1,171 @@
+import os
+import stat
+import subprocess
+from typing import Dict, List, Optional
+from src.file_node import FileNode
+from src.config import GIT_TIMEOUT_SECONDS, GIT_DIFF_CONTEXT_LINES
+
+ADDED = "added"
+MODIFIED = "modified"
+DELETED = "deleted"
+RENAMED = "renamed"
+UNTRACKED = "untracked"
+
+# git diff --name-status letters; copies count as additions, unmerged and
+# type changes as modifications
+_STATUSES = {"A": ADDED, "C": ADDED, "M": MODIFIED, "T": MODIFIED, "U": MODIFIED, "D": DELETED, "R": RENAMED}
+
+# The empty tree, for repositories without commits yet
+_EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+
+class GitError(RuntimeError):
+    """git is missing, the root is not in a repository, or a git command failed."""
+
+
+def _git(cwd: str, *args: str, ok_codes=(0,)) -> bytes:
+    try:
+        result = subprocess.run(
+            ["git", "-C", cwd, *args], capture_output=True, timeout=GIT_TIMEOUT_SECONDS,
+        )
+    except FileNotFoundError:
+        raise GitError("git is not installed or not on PATH")
+    except subprocess.TimeoutExpired:
+        raise GitError(f"git {args[0]} timed out after {GIT_TIMEOUT_SECONDS}s")
+    if result.returncode not in ok_codes:
+        message = result.stderr.decode("utf-8", errors="replace").strip()
+        raise GitError(message or f"git {args[0]} failed with exit code {result.returncode}")
+    return result.stdout
+
+
+class Change:
+    """One changed file under a GitChanges root; paths are relative to that root."""
+
+    __slots__ = ("root", "base", "path", "status", "old_path")
+
+    def __init__(self, root: str, base: str, path: str, status: str, old_path: Optional[str] = None):
+        self.root = root
+        self.base = base
+        self.path = path
+        self.status = status
+        self.old_path = old_path
+
+    def diff(self) -> str:
+        """Unified diff of this file from the base to the working tree."""
+        context = f"-U{GIT_DIFF_CONTEXT_LINES}"
+        if self.status == UNTRACKED:
+            # Exit code 1 just means the files differ
+            output = _git(
+                self.root, "diff", "--no-index", "--no-color", "--no-ext-diff", context,
+                "--", os.devnull, self.path, ok_codes=(0, 1),
+            )
+        else:
+            paths = [self.old_path, self.path] if self.old_path else [self.path]
+            output = _git(
+                self.root, "diff", "--no-color", "--no-ext-diff", "--relative", "-M", context,
+                self.base, "--", *paths,
+            )
+        return output.decode("utf-8", errors="replace")
+
+
+class GitChanges:
+    """Files under root that differ from ref in the working tree, untracked ones included.
+
+    The comparison starts from the merge base of ref and HEAD, as a pull
+    request against ref would, and takes in committed, staged and unstaged
+    changes alike; ref "HEAD" gives just the uncommitted changes. Files git
+    ignores are left out.
+    """
+
+    def __init__(self, root: str, ref: str = "HEAD"):
+        if ref.startswith("-"):
+            # git would read it as an option, such as --output=<file>
+            raise GitError(f"Invalid revision {ref!r}")
+        self.root = os.path.abspath(root)
+        self.ref = ref
+        self.base = self._resolve_base(ref)
+        # Absolute path -> Change, in git's path order with untracked files last
+        self.changes: Dict[str, Change] = {}
+        fields = _git(
+            self.root, "diff", "--name-status", "-z", "--relative", "-M", "--no-ext-diff", self.base, "--",
+        ).split(b"\0")
+        i = 0
+        while i < len(fields) - 1:
+            letter = fields[i].decode("ascii")[:1]
+            if letter in "RC":
+                old_path, path = os.fsdecode(fields[i + 1]), os.fsdecode(fields[i + 2])
+                i += 3
+            else:
+                old_path, path = None, os.fsdecode(fields[i + 1])
+                i += 2
+            status = _STATUSES.get(letter, MODIFIED)
+            self._add(Change(self.root, self.base, path, status, old_path if status == RENAMED else None))
+        untracked = _git(self.root, "ls-files", "-z", "--others", "--exclude-standard")
+        for path in untracked.split(b"\0"):
+            if path:
+                self._add(Change(self.root, self.base, os.fsdecode(path), UNTRACKED))
+
+    def _resolve_base(self, ref: str) -> str:
+        try:
+            return _git(self.root, "merge-base", ref, "HEAD").decode("ascii").strip()
+        except GitError:
+            pass
+        # Unrelated histories, or HEAD not born yet
+        try:
+            return _git(self.root, "rev-parse", "--verify", "--quiet", ref + "^{commit}").decode("ascii").strip()
+        except GitError:
+            _git(self.root, "rev-parse", "--git-dir")  # raises when root is not in a repository
+            if ref == "HEAD":
+                return _EMPTY_TREE
+            raise GitError(f"Unknown revision {ref!r} in {self.root}")
+
+    def _add(self, change: Change):
+        self.changes[os.path.join(self.root, change.path.replace("/", os.sep))] = change
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def existing_paths(self) -> List[str]:
+        """Changed files still in the working tree."""
+        return [path for path, change in self.changes.items() if change.status != DELETED]
+
+    def deleted_paths(self) -> List[str]:
+        return [path for path, change in self.changes.items() if change.status == DELETED]
+
+    def build_tree(self, include_deleted: bool = False) -> FileNode:
+        """A FileNode tree holding only the changed files, in place of a full scan.
+
+        Deleted files become empty nodes when include_deleted is set, so their
+        diffs can be extracted; submodules and other non-regular files are
+        left out.
+        """
+        root = FileNode(self.root, None, True)
+        dirs = {"": root}
+
+        def directory(rel_dir: str) -> FileNode:
+            node = dirs.get(rel_dir)
+            if node is None:
+                parent_dir, name = rel_dir.rpartition("/")[::2]
+                parent = directory(parent_dir)
+                node = FileNode(name, parent, True)
+                parent.children.append(node)
+                dirs[rel_dir] = node
+            return node
+
+        for path, change in self.changes.items():
+            if change.status == DELETED:
+                if not include_deleted:
+                    continue
+                size, mtime = 0, 0.0
+            else:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                size, mtime = st.st_size, st.st_mtime
+            parent_dir, name = change.path.rpartition("/")[::2]
+            parent = directory(parent_dir)
+            parent.children.append(FileNode(name, parent, False, size, mtime))
+        return root
@@ -1,14 +1,71 @@
+import logging
 import os
+import re
+import time
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, BooleanVar
+from tkinter import ttk, filedialog, messagebox, simpledialog, BooleanVar
 from tkinter.scrolledtext import ScrolledText
 from typing import List
-import threading
 import queue
-from concurrent.futures import ThreadPoolExecutor
-from src.file_utils import scan_directory, is_code_file, extract_pdf_content
-from src.logger import logger
-import io
+from src.file_node import FileNode
+from src.file_utils import scan_directory
+from src import archives
+from src.ignore import IgnoreFilter
+from src import scan_cache
+from src.scan_cache import scan_with_cache
+from src.watcher import DirectoryWatcher, ChangeBatches, compute_delta, apply_delta, iter_listable_dirs
+from src.selection import SelectionModel, CHECKED, PARTIAL, UNCHECKED
+from src.search_index import SearchIndex, SEARCH_MODES, SUBSTRING
+from src.content_search import search_contents, compile_query
+from src.config import (
+    TREE_INSERT_BATCH_SIZE, SEARCH_DEBOUNCE_MS, SEARCH_MAX_RESULTS,
+    CONTENT_SEARCH_MAX_DISPLAYED, PREVIEW_DEBOUNCE_MS, PREVIEW_PREFETCH_NEIGHBOURS,
+    TOKEN_BUDGET_DEFAULT, STATS_REFRESH_MS, ARCHIVE_EXTENSIONS,
+)
+from src.extraction import stream_extract
+from src.git_delta import GitChanges
+from src.output_writer import GZIP, XZ
+from src.preview import PreviewLoader
+from src.token_budget import count_tokens, update_rollup, selected_tokens, iter_files, pack_budget
+from src.instrumentation import metrics
+from src.jobs import JobScheduler, Cancelled, HIGH, LOW
+from src.logger import logger, set_log_level
+
+CHECK_SYMBOLS = {CHECKED: "☑", PARTIAL: "▣", UNCHECKED: "☐"}
+CONTENT_MODE = "content"
+OUTPUT_FILETYPES = [
+    ("Text files", "*.txt"),
+    ("Gzip-compressed text", "*.txt.gz"),
+    ("XZ-compressed text", "*.txt.xz"),
+    ("All files", "*.*"),
+]
+
+
+def format_tokens(tokens):
+    if tokens is None or tokens < 0:
+        return ""
+    if tokens < 1000:
+        return str(tokens)
+    if tokens < 1000000:
+        return f"{tokens / 1000:.1f}k"
+    return f"{tokens / 1000000:.1f}M"
+
+def format_eta(seconds):
+    if seconds is None:
+        return ""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"~{seconds}s left"
+    return f"~{seconds // 60}m {seconds % 60:02d}s left"
+
+def format_rate(unit, value):
+    if unit == "bytes":
+        for suffix in ("B", "KB", "MB"):
+            if value < 1024:
+                return f"{value:.0f} {suffix}"
+            value /= 1024
+        return f"{value:.1f} GB"
+    return f"{value:.0f} {unit}"
 
 class CodeExtractorGUI:
     def __init__(self, root):
@@ -19,10 +76,40 @@ class CodeExtractorGUI:
         self.style = ttk.Style()
         self.style.theme_use('clam')
         self.is_dark_mode = BooleanVar(value=False)
+        self.use_scan_cache = BooleanVar(value=True)
+        self.apply_ignore_rules = BooleanVar(value=True)
+        self.expand_archives = BooleanVar(value=False)
+        self.write_manifest = BooleanVar(value=True)
+        self.dedupe_output = BooleanVar(value=False)
+        self.diff_changed = BooleanVar(value=False)
+        self.git_changes = None  # from the last Select Changed Files, for the current tree
+        self.shard_size_mb = 0
+        self.watch_enabled = BooleanVar(value=False)
+        self.debug_logging = BooleanVar(value=logger.isEnabledFor(logging.DEBUG))
+        self.stats_window = None
+        self.stats_table = None
+        self.stats_after_id = None
+        self.watcher = None
+        self.fs_batches = ChangeBatches()  # one delta job at a time
+        self.ignore_filter = None
         self.create_menu()
 
         self.setup_ui()
         self.file_tree = None
+        self.selection_model = None
+        self.search_index = None
+        self.search_after_id = None
+        # Background work runs as jobs; only the Tk thread applies their results
+        self.jobs = JobScheduler(on_progress=lambda job, progress: self.queue.put(("job_progress", (job, progress))))
+        self.progress_job = None  # the job shown in the progress bar
+        self.preview_loader = PreviewLoader(lambda path, text: self.queue.put(("preview", (path, text))), self.jobs)
+        self.preview_after_id = None
+        self.preview_path = None
+        self.content_matches = []
+        self.content_match_files = {}
+        self.node_by_item = {}
+        self.unloaded_items = {}
+        self.search_matches = set()
         self.root_path = ""
         self.queue = queue.Queue()
         self.process_queue()
@@ -41,6 +128,38 @@ class CodeExtractorGUI:
         view_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="View", menu=view_menu)
         view_menu.add_checkbutton(label="Dark Mode", variable=self.is_dark_mode, command=self.toggle_dark_mode)
+        view_menu.add_checkbutton(label="Use Scan Cache", variable=self.use_scan_cache)
+        view_menu.add_checkbutton(label="Apply Ignore Rules", variable=self.apply_ignore_rules)
+        view_menu.add_checkbutton(label="Open Archives as Folders", variable=self.expand_archives)
+        view_menu.add_command(label="Clear Scan Cache", command=scan_cache.clear)
+        view_menu.add_checkbutton(
+            label="Watch for Changes", variable=self.watch_enabled, command=self.toggle_watching
+        )
+        view_menu.add_separator()
+        view_menu.add_command(label="Statistics...", command=self.show_stats)
+        view_menu.add_checkbutton(
+            label="Debug Logging", variable=self.debug_logging,
+            command=lambda: set_log_level(logging.DEBUG if self.debug_logging.get() else logging.INFO),
+        )
+
+        output_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Output", menu=output_menu)
+        output_menu.add_command(label="Shard Size...", command=self.ask_shard_size)
+        output_menu.add_checkbutton(label="Write Manifest", variable=self.write_manifest)
+        output_menu.add_checkbutton(label="Deduplicate Identical Files", variable=self.dedupe_output)
+        output_menu.add_checkbutton(label="Write Changed Files as Diffs", variable=self.diff_changed)
+
+    def ask_shard_size(self):
+        size = simpledialog.askinteger(
+            "Shard Size", "Maximum MB per output shard (0 writes a single file):",
+            initialvalue=self.shard_size_mb, minvalue=0, parent=self.root,
+        )
+        if size is not None:
+            self.shard_size_mb = size
+
+    def ask_output_file(self):
+        # Compression follows the chosen extension: .gz or .xz
+        return filedialog.asksaveasfilename(defaultextension=".txt", filetypes=OUTPUT_FILETYPES)
 
     def toggle_dark_mode(self):
         if self.is_dark_mode.get():
@@ -60,6 +179,7 @@ class CodeExtractorGUI:
         self.root.configure(bg="#2E2E2E")
         self.tree.tag_configure("checked", foreground="#FFFFFF")  
         self.tree.tag_configure("unchecked", foreground="#FFFFFF")
+        self.tree.tag_configure("partial", foreground="#9FC5E8")
         self.tree.tag_configure("match", background="#6A5ACD")
 
     def apply_light_theme(self):
@@ -74,6 +194,7 @@ class CodeExtractorGUI:
         self.root.configure(bg="SystemButtonFace")
         self.tree.tag_configure("checked", foreground="blue")
         self.tree.tag_configure("unchecked", foreground="black")
+        self.tree.tag_configure("partial", foreground="#4A6984")
         self.tree.tag_configure("match", background="yellow")
 
 
@@ -87,16 +208,19 @@ class CodeExtractorGUI:
 
         browse_btn = ttk.Button(path_frame, text="Browse", command=self.browse_directory)
         browse_btn.pack(side="left", padx=5)
+
+        archive_btn = ttk.Button(path_frame, text="Open Archive", command=self.browse_archive)
+        archive_btn.pack(side="left")
     
 
     def on_path_enter(self, event):
         entered_path = self.path_entry.get()
-        if os.path.isdir(entered_path):
+        if os.path.isdir(entered_path) or archives.is_archive_file(entered_path):
             self.root_path = entered_path
             self.start_scanning_thread()
         else:
             messagebox.showerror(
-                "Invalid Path", "The entered path is not a valid directory."
+                "Invalid Path", "The entered path is not a valid directory or archive."
             )
 
     def create_main_frame(self):
@@ -113,23 +237,40 @@ class CodeExtractorGUI:
 
         self.search_entry = ttk.Entry(search_frame)
         self.search_entry.pack(side="left", expand=True, fill="x")
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        self.search_entry.bind("<Return>", lambda event: self.search_tree())
+
+        self.search_mode = tk.StringVar(value=SUBSTRING)
+        search_mode_box = ttk.Combobox(
+            search_frame, textvariable=self.search_mode, values=SEARCH_MODES + (CONTENT_MODE,),
+            state="readonly", width=10,
+        )
+        search_mode_box.pack(side="left", padx=(5, 0))
+        search_mode_box.bind("<<ComboboxSelected>>", lambda event: self.search_tree())
 
         search_btn = ttk.Button(search_frame, text="Search", command=self.search_tree)
         search_btn.pack(side="left", padx=5)
 
+        self.search_status = ttk.Label(search_frame, text="")
+        self.search_status.pack(side="left")
+
         # Treeview
-        self.tree = ttk.Treeview(left_frame, columns=("check",))
+        self.tree = ttk.Treeview(left_frame, columns=("check", "tokens"))
         self.tree.heading("#0", text="File Structure")
         self.tree.heading("check", text="Select")
         self.tree.column("check", width=50, anchor="center")
+        self.tree.heading("tokens", text="Tokens")
+        self.tree.column("tokens", width=70, anchor="e")
         self.tree.pack(expand=True, fill="both")
 
         self.tree.tag_configure("checked", foreground="blue")
         self.tree.tag_configure("unchecked", foreground="black")
+        self.tree.tag_configure("partial", foreground="#4A6984")
         self.tree.tag_configure("match", background="yellow")
 
         self.tree.bind("<ButtonRelease-1>", self.on_click)
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        self.tree.bind("<<TreeviewOpen>>", self.on_tree_open)
 
         # Right side: Preview
         right_frame = ttk.Frame(main_frame)
@@ -152,6 +293,24 @@ class CodeExtractorGUI:
         )
         extract_btn.pack(side="right", padx=10)
 
+        budget_btn = ttk.Button(
+            btn_frame, text="Extract Within Budget...", command=self.extract_within_budget
+        )
+        budget_btn.pack(side="right")
+
+        select_matching_btn = ttk.Button(
+            btn_frame, text="Select Matching Files", command=self.select_matching_files
+        )
+        select_matching_btn.pack(side="right", padx=(0, 10))
+
+        select_changed_btn = ttk.Button(
+            btn_frame, text="Select Changed Files...", command=self.select_changed_files
+        )
+        select_changed_btn.pack(side="right")
+
+        self.token_status = ttk.Label(btn_frame, text="")
+        self.token_status.pack(side="left", padx=10)
+
     def create_progress_bar(self):
         self.progress_frame = ttk.Frame(self.root)
         self.progress_frame.pack(fill="x", pady=10, padx=10)
@@ -164,6 +323,9 @@ class CodeExtractorGUI:
         self.progress_label = ttk.Label(self.progress_frame, text="")
         self.progress_label.pack(side="left", padx=5)
 
+        cancel_btn = ttk.Button(self.progress_frame, text="Cancel", command=self.cancel_progress_job)
+        cancel_btn.pack(side="right")
+
         self.progress_frame.pack_forget()  # Hide initially
 
     def browse_directory(self):
@@ -174,52 +336,336 @@ class CodeExtractorGUI:
             self.root_path = folder_path
             self.start_scanning_thread()
 
+    def browse_archive(self):
+        archive_path = filedialog.askopenfilename(
+            filetypes=[("Zip and tar archives", " ".join("*" + ext for ext in ARCHIVE_EXTENSIONS)), ("All files", "*")]
+        )
+        if archive_path:
+            self.path_entry.delete(0, tk.END)
+            self.path_entry.insert(0, archive_path)
+            self.root_path = archive_path
+            self.start_scanning_thread()
+
     def start_scanning_thread(self):
-        self.progress_frame.pack(fill="x", pady=10, padx=10)  # Show progress bar
-        self.progress_bar["value"] = 0
-        self.progress_label["text"] = "Scanning directory..."
-        scanning_thread = threading.Thread(target=self.scan_and_populate)
-        scanning_thread.start()
+        self.stop_watching()
+        # Archive handles of the previous tree are reopened on demand if still needed
+        archives.close_archives()
+        self.git_changes = None
+        # A scan still running for the previous path is superseded and cancelled
+        job = self.jobs.submit(
+            "scan", self.scan_and_populate, self.root_path, self.use_scan_cache.get(),
+            self.apply_ignore_rules.get(), self.expand_archives.get(), priority=HIGH,
+        )
+        # The scan streams discovery counts, so there is no total to measure against
+        self.show_progress_frame(job, "Scanning directory...", indeterminate=True)
 
-    def scan_and_populate(self):
+    def scan_and_populate(self, job, root_path, use_cache, apply_ignore, expand_archives):
+        """Scan job: builds the tree off the Tk thread and hands it over through the queue."""
         try:
-            total_items = sum(
-                [len(files) + len(dirs) for _, dirs, files in os.walk(self.root_path)]
-            )
-            scanned_items = 0
-
-            def progress_callback(item):
-                nonlocal scanned_items
-                scanned_items += 1
-                progress = int((scanned_items / total_items) * 100)
-                self.queue.put(("update_progress", progress))
-
-            self.file_tree = scan_directory(self.root_path, progress_callback)
-            self.queue.put(("populate", None))
+            def progress_callback(entries_found, dirs_found):
+                job.progress(entries_found, message=f"Scanning: {entries_found} items in {dirs_found} folders")
+
+            search_index = SearchIndex()
+            # .gitignore files, .codeextractorignore and the built-in defaults
+            ignore_filter = IgnoreFilter(root_path) if apply_ignore else None
+            if use_cache:
+                file_tree = scan_with_cache(
+                    root_path, progress_callback, ignore=ignore_filter, expand_archives=expand_archives
+                )
+            else:
+                file_tree = scan_directory(
+                    root_path, progress_callback, index=search_index, ignore=ignore_filter,
+                    expand_archives=expand_archives,
+                )
+            selection_model = SelectionModel(file_tree)
+            job.token.check()
+            self.queue.put(("scan_complete", (job, file_tree, selection_model, ignore_filter)))
+            if not len(search_index):
+                # Cached trees skip the scan, so index them after the tree is shown
+                search_index.add_tree(file_tree)
+            self.queue.put(("search_index", (job, file_tree, search_index)))
+        except Cancelled:
+            logger.info(f"Scan of {root_path} cancelled")
         except Exception as e:
             logger.error(f"Error scanning directory: {str(e)}")
             self.queue.put(("error", str(e)))
         finally:
-            self.queue.put(("hide_progress", None))
+            self.queue.put(("hide_progress", job))
+
+    def apply_scan(self, job, file_tree, selection_model, ignore_filter):
+        # A superseded or cancelled scan must not replace the tree of a newer one
+        if not self.jobs.is_current(job):
+            return
+        self.file_tree = file_tree
+        self.selection_model = selection_model
+        self.ignore_filter = ignore_filter
+        self.search_index = None
+        self.populate_tree()
+
+    def show_progress_frame(self, job, text, indeterminate=False):
+        self.progress_job = job
+        self.progress_frame.pack(fill="x", pady=10, padx=10)
+        if indeterminate:
+            self.progress_bar.configure(mode="indeterminate")
+            self.progress_bar.start(50)
+        else:
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate")
+            self.progress_bar["value"] = 0
+        self.progress_label["text"] = text
+
+    def show_job_progress(self, progress):
+        text = progress.message or ""
+        if progress.total:
+            self.progress_bar["value"] = int(progress.fraction * 100)
+            eta = format_eta(progress.eta)
+            text = f"{text} ({eta})" if eta else text
+        self.progress_label["text"] = text
+
+    def cancel_progress_job(self):
+        if self.progress_job is not None:
+            self.progress_job.cancel()
+            self.progress_label["text"] = "Cancelling..."
+
+    def hide_progress(self, job):
+        # Only the job on display may hide the bar; a superseded scan finishing
+        # late must not hide its replacement's progress
+        if job is not self.progress_job:
+            return
+        self.progress_job = None
+        self.progress_bar.stop()
+        self.progress_bar.configure(mode="determinate")
+        self.progress_frame.pack_forget()
 
     def populate_tree(self):
+        start = time.perf_counter()
         for item in self.tree.get_children():
             self.tree.delete(item)
+        self.node_by_item = {}
+        self.unloaded_items = {}
+        self.search_matches = set()
+
+        root_item = self.insert_node("", self.file_tree)
+        self.load_children(root_item)
+        self.tree.item(root_item, open=True)
+        metrics.record("populate", time.perf_counter() - start)
+        if self.watch_enabled.get():
+            self.start_watching()
+        self.start_token_count()
+
+    def insert_node(self, parent, node):
+        state = self.selection_model.state(node)
+        tree_node = self.tree.insert(
+            parent,
+            "end",
+            text=node.name,
+            open=False,
+            values=(CHECK_SYMBOLS[state], format_tokens(node.tokens)),
+            tags=(state,),
+        )
+        node.tree_id = tree_node
+        self.node_by_item[tree_node] = node
+        if node.children:
+            # Placeholder gives the row an expand arrow until it is opened
+            self.tree.insert(tree_node, "end", text="Loading...")
+            self.unloaded_items[tree_node] = 0
+        return tree_node
+
+    def on_tree_open(self, event):
+        item = self.tree.focus()
+        self.load_children(item)
+        # Rows hidden under a collapsed folder are not refreshed on toggle
+        for child in self.tree.get_children(item):
+            if child in self.node_by_item:
+                self.refresh_visible(self.node_by_item[child])
 
-        def insert_node(parent, node):
-            tree_node = self.tree.insert(
-                parent,
-                "end",
-                text=node.name,
-                open=False,
-                values=("☑",),
-                tags=("checked",),
-            )
-            node.tree_id = tree_node
-            for child in node.children:
-                insert_node(tree_node, child)
+    def load_children(self, item, batch_size=TREE_INSERT_BATCH_SIZE):
+        if item not in self.unloaded_items:
+            return
+        start = self.unloaded_items[item]
+        node = self.node_by_item[item]
+        if start == 0:
+            for placeholder in self.tree.get_children(item):
+                if placeholder not in self.node_by_item:
+                    self.tree.delete(placeholder)
+
+        end = start + batch_size
+        with metrics.span("tree_insert") as span:
+            for child in node.children[start:end]:
+                self.insert_node(item, child)
+            span.add(rows=len(node.children[start:end]))
+
+        if end < len(node.children):
+            self.unloaded_items[item] = end
+            # Yield to the event loop between batches so the UI stays responsive
+            self.root.after(1, self.continue_loading, item, node)
+        else:
+            del self.unloaded_items[item]
+
+    def continue_loading(self, item, node):
+        # The tree may have been repopulated since this batch was scheduled
+        if self.node_by_item.get(item) is node:
+            self.load_children(item)
+
+    def materialize(self, node):
+        """Insert every ancestor row of node so it can be shown in the tree."""
+        chain = []
+        while node is not None and node.tree_id not in self.node_by_item:
+            chain.append(node)
+            node = node.parent
+        if not chain:
+            return
+        for ancestor in [node] + list(reversed(chain))[:-1]:
+            self.load_children(ancestor.tree_id, batch_size=len(ancestor.children))
+
+    def refresh_row(self, node):
+        state = self.selection_model.state(node)
+        tags = ("match",) if node.tree_id in self.search_matches else (state,)
+        self.tree.item(
+            node.tree_id, values=(CHECK_SYMBOLS[state], format_tokens(node.tokens)), tags=tags
+        )
+
+    def refresh_visible(self, node):
+        """Refresh node's row and the rows of its descendants that are on screen."""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            self.refresh_row(current)
+            if current.children and self.tree.item(current.tree_id, "open"):
+                stack.extend(
+                    child for child in current.children if child.tree_id in self.node_by_item
+                )
+
+    def forget_rows(self, node):
+        """Delete node's row, if materialized, and drop bookkeeping for its subtree."""
+        if node.tree_id not in self.node_by_item:
+            return
+        self.tree.delete(node.tree_id)
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.tree_id in self.node_by_item:
+                del self.node_by_item[current.tree_id]
+                self.unloaded_items.pop(current.tree_id, None)
+                self.search_matches.discard(current.tree_id)
+                stack.extend(current.children)
+
+    def toggle_watching(self):
+        if self.watch_enabled.get():
+            self.start_watching()
+        else:
+            self.stop_watching()
 
-        insert_node("", self.file_tree)
+    def start_watching(self):
+        self.stop_watching()
+        if self.file_tree is None:
+            return
+        self.watcher = DirectoryWatcher(
+            iter_listable_dirs(self.file_tree),
+            lambda paths: self.queue.put(("fs_changes", paths)),
+        )
+        self.watcher.start()
+
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def find_node(self, path):
+        relative_path = os.path.relpath(path, self.file_tree.path)
+        node = self.file_tree
+        if relative_path == os.curdir:
+            return node
+        for part in relative_path.split(os.sep):
+            node = next((c for c in node.children if c.name == part), None)
+            if node is None:
+                return None
+        return node
+
+    def handle_fs_changes(self, paths):
+        if self.file_tree is None:
+            return
+        if self.fs_batches.hold(paths):
+            return
+        # Snapshot the affected directories here; the listing runs on a worker
+        file_tree = self.file_tree
+        ignore_filter = self.ignore_filter
+        expand_archives = self.expand_archives.get()
+        snapshots = []
+        for path in paths:
+            node = self.find_node(path)
+            if node is not None and node.is_listable:
+                snapshots.append((node, path, {c.name: c for c in node.children}))
+
+        def run(job):
+            deltas = []
+            try:
+                deltas = [
+                    compute_delta(node, path, existing, ignore_filter, expand_archives)
+                    for node, path, existing in snapshots
+                ]
+            finally:
+                self.queue.put(("fs_deltas", (file_tree, deltas)))
+
+        if snapshots:
+            # Every batch of changes must be applied, so none supersedes another
+            self.fs_batches.running = True
+            self.jobs.submit("fs_changes", run, supersede=False)
+
+    def apply_fs_deltas(self, file_tree, deltas):
+        held = self.fs_batches.finish()
+        if file_tree is self.file_tree:
+            self.apply_deltas(deltas)
+        if held:
+            self.handle_fs_changes(held)
+
+    def apply_deltas(self, deltas):
+        for delta in deltas:
+            node = delta.node
+            top = node
+            while top.parent is not None:
+                top = top.parent
+            if not delta or top is not self.file_tree:
+                continue
+
+            for child in delta.removed:
+                self.forget_rows(child)
+            apply_delta(delta, self.selection_model)
+
+            new_dirs = []
+            for child in delta.added:
+                if self.search_index is not None:
+                    self.search_index.add_tree(child)
+                if child.is_listable:
+                    new_dirs.extend(iter_listable_dirs(child))
+            if self.watcher is not None and new_dirs:
+                self.watcher.add_directories(new_dirs)
+
+            item = node.tree_id
+            if item in self.node_by_item:
+                if item in self.unloaded_items:
+                    # Not fully loaded: reload from the placeholder state
+                    for child_item in self.tree.get_children(item):
+                        if child_item in self.node_by_item:
+                            self.forget_rows(self.node_by_item[child_item])
+                        else:
+                            self.tree.delete(child_item)
+                    self.tree.insert(item, "end", text="Loading...")
+                    self.unloaded_items[item] = 0
+                    if self.tree.item(item, "open"):
+                        self.load_children(item)
+                else:
+                    for child in delta.added:
+                        self.insert_node(item, child)
+            update_rollup(node)
+            parent = node
+            while parent is not None:
+                if parent.tree_id in self.node_by_item:
+                    self.refresh_row(parent)
+                parent = parent.parent
+        logger.debug(f"Applied {len(deltas)} file system changes")
+        # Only new and modified files are counted; the rest come from the cache
+        self.start_token_count()
 
     def on_click(self, event):
         region = self.tree.identify_region(event.x, event.y)
@@ -230,210 +676,448 @@ class CodeExtractorGUI:
                 self.toggle_check(item)
 
     def toggle_check(self, item):
-        current_value = self.tree.item(item, "values")[0]
-        new_value = "☐" if current_value == "☑" else "☑"
-        self.tree.item(item, values=(new_value,))
-        new_tag = "unchecked" if new_value == "☐" else "checked"
-        self.tree.item(item, tags=(new_tag,))
-        logger.debug(
-            f"Toggled item: {self.tree.item(item, 'text')}, New value: {new_value}"
-        )
-        self.update_children(item, new_value)
-        self.update_parents(self.tree.parent(item))
-
-    def update_children(self, parent, value):
-        for child in self.tree.get_children(parent):
-            self.tree.item(child, values=(value,))
-            tag = "checked" if value == "☑" else "unchecked"
-            self.tree.item(child, tags=(tag,))
-            self.update_children(child, value)
-
-    def update_parents(self, parent):
-        if parent:
-            children = self.tree.get_children(parent)
-            all_checked = all(
-                self.tree.item(child, "values")[0] == "☑" for child in children
-            )
-            new_value = "☑" if all_checked else "☐"
-            self.tree.item(parent, values=(new_value,))
-            tag = "checked" if new_value == "☑" else "unchecked"
-            self.tree.item(parent, tags=(tag,))
-            self.update_parents(self.tree.parent(parent))
+        node = self.node_by_item.get(item)
+        if node is None:
+            return
+        with metrics.span("toggle") as span:
+            new_state = self.selection_model.toggle(node)
+            logger.debug("Toggled item: %s, New state: %s", node.name, new_state)
+            self.refresh_visible(node)
+            # Ancestors are always materialized, and their counts changed
+            parent = node.parent
+            while parent is not None:
+                self.refresh_row(parent)
+                parent = parent.parent
+            self.update_token_status()
+            span.add(files=node.leaf_count)
+
+    def start_token_count(self):
+        file_tree = self.file_tree
+        self.token_status["text"] = "Estimating tokens..."
+
+        def run(job):
+            try:
+                count_tokens(file_tree, cancel_event=job.token)
+                self.queue.put(("tokens_ready", (job, file_tree)))
+            except Exception as e:
+                logger.error(f"Error estimating tokens: {str(e)}")
 
-    def get_selected_files(self, item):
-        selected_files = []
-        value = self.tree.item(item, "values")[0]
-        logger.debug(f"Checking item: {self.tree.item(item, 'text')}, Value: {value}")
+        # Background work: anything the user is waiting on runs first
+        self.jobs.submit("tokens", run, priority=LOW)
 
-        item_path = self.get_item_path(item)
-        logger.debug(f"Constructed path: {item_path}")
+    def update_token_status(self):
+        if self.file_tree is None or self.file_tree.tokens is None:
+            return
+        self.token_status["text"] = (
+            f"Selected: ~{format_tokens(selected_tokens(self.selection_model)) or 0} "
+            f"of {format_tokens(self.file_tree.tokens) or 0} tokens"
+        )
 
-        if value == "☑":
-            selected_files.append(item_path)
-            logger.debug(f"Added item: {item_path}")
+    def extract_within_budget(self):
+        if self.file_tree is None:
+            return
+        if self.file_tree.tokens is None:
+            messagebox.showinfo("Token Budget", "Token estimates are still being computed.")
+            return
+        budget = simpledialog.askinteger(
+            "Token Budget", "Maximum estimated tokens:",
+            initialvalue=TOKEN_BUDGET_DEFAULT, minvalue=1, parent=self.root,
+        )
+        if not budget:
+            return
+        # Checked files go first, then the rest of the tree smallest first;
+        # files that don't fit are never opened
+        preferred = [node for node in self.selection_model.selected_nodes() if not node.is_dir]
+        chosen, estimated = pack_budget(list(iter_files(self.file_tree)), budget, preferred)
+        if not chosen:
+            messagebox.showwarning("Token Budget", "No file fits within the budget.")
+            return
+        logger.info(f"Packed {len(chosen)} files, ~{estimated} of {budget} tokens")
 
-        for child in self.tree.get_children(item):
-            selected_files.extend(self.get_selected_files(child))
+        output_file = self.ask_output_file()
+        if output_file:
+            self.start_extraction(
+                chosen, output_file, f"Extracting {len(chosen)} files (~{format_tokens(estimated)} tokens)..."
+            )
 
-        return selected_files
+    def get_selected_files(self):
+        # Nodes rather than paths: extraction caches each file's classification on its node
+        with metrics.span("selection") as span:
+            nodes = self.selection_model.selected_nodes()
+            span.add(files=len(nodes))
+        return nodes
 
     def get_item_path(self, item):
-        path_parts = []
-        current_item = item
-        while current_item:
-            item_text = self.tree.item(current_item, "text")
-            path_parts.insert(0, item_text)
-            current_item = self.tree.parent(current_item)
-
-        # Remove the root directory name from the path parts
-        if path_parts and path_parts[0] == os.path.basename(self.root_path):
-            path_parts.pop(0)
-
-        full_path = os.path.join(self.root_path, *path_parts)
-        logger.debug(f"Constructed full path: {full_path}")
+        full_path = self.node_by_item[item].path
+        logger.debug("Constructed full path: %s", full_path)
         return full_path
 
     def extract_selected(self):
-        root_item = self.tree.get_children()[0]
-        logger.debug(f"Root item: {self.tree.item(root_item, 'text')}")
-        logger.debug(f"Root path: {self.root_path}")
-        selected_items = self.get_selected_files(root_item)
-        logger.debug(f"Number of selected items: {len(selected_items)}")
-        logger.debug(f"Selected items: {selected_items}")
+        if self.file_tree is None:
+            return
+        logger.debug("Root path: %s", self.root_path)
+        selected_items = self.get_selected_files()
+        logger.debug("Number of selected items: %d", len(selected_items))
 
         if not selected_items:
             messagebox.showwarning("No Selection", "No items selected for extraction.")
             return
 
-        output_file = filedialog.asksaveasfilename(
-            defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
-        )
+        if self.git_changes is not None and self.diff_changed.get():
+            # Deleted files have no node to check; their diffs go at the end
+            selected_items = selected_items + self.git_changes.deleted_paths()
+
+        output_file = self.ask_output_file()
 
         if output_file:
-            self.progress_frame.pack(fill="x", pady=10, padx=10)  # Show progress bar
-            self.progress_bar["value"] = 0
-            self.progress_label["text"] = "Extracting files..."
-            threading.Thread(
-                target=self.extract_files, args=(selected_items, output_file)
-            ).start()
+            self.start_extraction(selected_items, output_file, "Extracting files...")
 
-    def extract_files(self, selected_items: List[str], output_file: str):
+    def start_extraction(self, selected_items, output_file, text):
+        # Extractions to different files may run side by side; none supersedes another
+        job = self.jobs.submit(
+            "extract", self.extract_files, selected_items, self.file_tree.path, output_file,
+            self.output_options(output_file), supersede=False,
+        )
+        self.show_progress_frame(job, text)
+
+    def output_options(self, output_file):
+        """stream_extract keyword arguments from the Output menu, read on the Tk thread."""
+        compression = GZIP if output_file.endswith(".gz") else XZ if output_file.endswith(".xz") else None
+        return {
+            "shard_bytes": self.shard_size_mb * 1024 * 1024 or None,
+            "compression": compression,
+            "manifest": self.write_manifest.get(),
+            "dedupe": self.dedupe_output.get(),
+            "changes": self.git_changes.changes if self.git_changes is not None and self.diff_changed.get() else None,
+        }
+
+    def extract_files(self, job, selected_items: List[FileNode], root_path: str, output_file: str, options=None):
         try:
-            total_items = len(selected_items)
-            buffer = io.StringIO()
-            
-            def process_file(item_path):
-                relative_path = os.path.relpath(item_path, self.root_path)
-                content = ""
-                if os.path.isfile(item_path):
-                    content += f"File: {relative_path}\n"
-                    content += "-" * 80 + "\n"
-                    if is_code_file(item_path):
-                        if item_path.lower().endswith(".pdf"):
-                            content += extract_pdf_content(item_path)
-                        else:
-                            try:
-                                with open(item_path, "r", encoding="utf-8") as code_file:
-                                    content += code_file.read()
-                            except UnicodeDecodeError:
-                                content += "Unable to read file: encoding error\n"
-                            except Exception as e:
-                                content += f"Error reading file: {str(e)}\n"
-                    else:
-                        content += "Non-code file (content not extracted)\n"
-                    content += "\n\n"
-                else:
-                    content += f"Directory: {relative_path}\n"
-                    content += "-" * 80 + "\n\n"
-                return content
-
-            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
-                futures = [executor.submit(process_file, item_path) for item_path in selected_items]
-                for i, future in enumerate(futures):
-                    buffer.write(future.result())
-                    progress = int(((i + 1) / total_items) * 100)
-                    self.queue.put(("update_progress", progress))
+            def progress_callback(done, total):
+                job.progress(done, total, message=f"Extracting: {done} of {total} files")
 
-            with open(output_file, "w", encoding="utf-8") as out_file:
-                out_file.write(buffer.getvalue())
-
-            self.queue.put(("extraction_complete", output_file))
+            stats = stream_extract(
+                selected_items, root_path, output_file, progress_callback, **(options or {})
+            )
+            self.queue.put(("extraction_complete", stats))
+        except Cancelled:
+            # stream_extract has removed the partial output
+            logger.info(f"Extraction to {output_file} cancelled")
         except Exception as e:
             self.queue.put(("extraction_error", str(e)))
         finally:
-            self.queue.put(("hide_progress", None))
+            self.queue.put(("hide_progress", job))
 
     def on_tree_select(self, event):
         selected_items = self.tree.selection()
-        if selected_items:
-            item = selected_items[0]
-            item_path = self.get_item_path(item)
-            self.preview_file(item_path)
-
-    def preview_file(self, file_path):
-        self.preview_text.delete("1.0", tk.END)
-        if os.path.isfile(file_path):
-            try:
-                if file_path.lower().endswith(".pdf"):
-                    content = extract_pdf_content(file_path)[:4000]  # First 4000 characters
-                    self.preview_text.insert(tk.END, content)
-                    if len(content) == 4000:
-                        self.preview_text.insert(tk.END, "\n\n[File truncated...]")
-                else:
-                    with open(file_path, "r", encoding="utf-8") as file:
-                        content = file.read(4000)  # Read first 4000 characters
-                        self.preview_text.insert(tk.END, content)
-                        if len(content) == 4000:
-                            self.preview_text.insert(tk.END, "\n\n[File truncated...]")
-            except UnicodeDecodeError:
-                self.preview_text.insert(tk.END, "Unable to preview: encoding error")
-            except Exception as e:
-                self.preview_text.insert(tk.END, f"Error previewing file: {str(e)}")
-        elif os.path.isdir(file_path):
-            self.preview_text.insert(tk.END, f"Selected item is a directory: {file_path}")
+        if not selected_items or selected_items[0] not in self.node_by_item:
+            return
+        item = selected_items[0]
+        self.preview_path = self.get_item_path(item)
+        if self.preview_after_id is not None:
+            self.root.after_cancel(self.preview_after_id)
+        # Cached previews show immediately; everything else waits for the
+        # selection to settle so holding an arrow key doesn't queue every file
+        cached = self.preview_loader.get(self.preview_path)
+        if cached is not None:
+            self.show_preview(cached)
+        self.preview_after_id = self.root.after(PREVIEW_DEBOUNCE_MS, lambda: self.preview_file(item))
+
+    def preview_file(self, item):
+        self.preview_after_id = None
+        if item not in self.node_by_item:
+            return
+        file_path = self.get_item_path(item)
+        neighbours = self.neighbour_files(item)
+        if self.preview_loader.get(file_path) is not None:
+            self.preview_loader.request(None, neighbours)
         else:
-            self.preview_text.insert(tk.END, f"Item not found: {file_path}")
+            self.preview_text.delete("1.0", tk.END)
+            self.preview_text.insert(tk.END, "Loading preview...")
+            self.preview_loader.request(file_path, neighbours)
+
+    def neighbour_files(self, item):
+        """Paths of the sibling files just after and just before item."""
+        found = []
+        for step in (self.tree.next, self.tree.prev):
+            sibling = item
+            taken = 0
+            for _ in range(PREVIEW_PREFETCH_NEIGHBOURS * 4):
+                sibling = step(sibling)
+                if not sibling or taken == PREVIEW_PREFETCH_NEIGHBOURS:
+                    break
+                node = self.node_by_item.get(sibling)
+                if node is not None and not node.is_dir:
+                    found.append(node.path)
+                    taken += 1
+        return found
+
+    def show_preview(self, text):
+        self.preview_text.delete("1.0", tk.END)
+        self.preview_text.insert(tk.END, text)
+        logger.debug("Previewing: %s", self.preview_path)
 
-        logger.debug(f"Previewing: {file_path}")
+    def schedule_search(self, event):
+        # Content searches read every file, so they only run on Enter or Search
+        if self.search_mode.get() == CONTENT_MODE:
+            return
+        # Debounce search-as-you-type so only the last keystroke in a burst runs a query
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.search_tree)
+
+    def clear_search_matches(self):
+        previous_matches = self.search_matches
+        self.search_matches = set()
+        for item in previous_matches:
+            if item in self.node_by_item:
+                self.refresh_row(self.node_by_item[item])
+
+    def mark_match(self, node):
+        self.materialize(node)
+        self.search_matches.add(node.tree_id)
+        self.tree.item(node.tree_id, tags=("match",))
 
     def search_tree(self):
-        query = self.search_entry.get().lower()
+        self.search_after_id = None
+        if self.search_index is None:
+            return
+        query = self.search_entry.get()
+
+        self.clear_search_matches()
         if not query:
+            self.search_status["text"] = ""
+            return
+        if self.search_mode.get() == CONTENT_MODE:
+            self.start_content_search(query)
             return
 
-        def search_recursive(item):
-            item_text = self.tree.item(item, "text").lower()
-            if query in item_text:
-                self.tree.item(item, tags=("match",))
-                self.tree.see(item)
-            else:
-                self.tree.item(item, tags=())
+        start = time.perf_counter()
+        try:
+            matches = self.search_index.search(query, self.search_mode.get())
+        except re.error as e:
+            self.search_status["text"] = f"Invalid pattern: {e}"
+            return
+        metrics.record("search", time.perf_counter() - start, matches=len(matches))
+
+        # Only the first matches are materialized; revealing every hit in a
+        # huge tree would insert most of it
+        shown = matches[:SEARCH_MAX_RESULTS]
+        for node in shown:
+            self.mark_match(node)
+        if shown:
+            self.tree.see(shown[0].tree_id)
+
+        if len(matches) > len(shown):
+            self.search_status["text"] = f"{len(matches)} matches (showing {len(shown)})"
+        else:
+            self.search_status["text"] = f"{len(matches)} matches"
+
+    def start_content_search(self, query):
+        pattern = compile_query(query)
+        self.content_matches = []
+        self.content_match_files = {}
+        self.preview_path = None
+        self.preview_text.delete("1.0", tk.END)
+        self.search_status["text"] = "Searching file contents..."
+
+        file_tree = self.file_tree
+
+        def run(job):
+            try:
+                nodes = []
+                stack = [file_tree]
+                while stack:
+                    node = stack.pop()
+                    nodes.append(node)
+                    stack.extend(node.children)
+                search_contents(
+                    nodes,
+                    pattern,
+                    on_matches=lambda matches: self.queue.put(("content_matches", (job, matches))),
+                    cancel_event=job.token,
+                )
+            except Exception as e:
+                logger.error(f"Error searching file contents: {str(e)}")
+            finally:
+                self.queue.put(("content_search_done", job))
+
+        # Supersedes the previous content search, whose late results are dropped
+        self.jobs.submit("content_search", run)
+
+    def show_content_matches(self, matches):
+        for node, line_no, snippet in matches:
+            if node not in self.content_match_files:
+                self.content_match_files[node] = len(self.content_match_files)
+                if len(self.content_match_files) <= SEARCH_MAX_RESULTS:
+                    self.mark_match(node)
+            if len(self.content_matches) < CONTENT_SEARCH_MAX_DISPLAYED:
+                relative_path = os.path.relpath(node.path, self.file_tree.path)
+                self.preview_text.insert(tk.END, f"{relative_path}:{line_no}: {snippet}\n")
+            self.content_matches.append((node, line_no, snippet))
+        self.search_status["text"] = (
+            f"{len(self.content_matches)} matches in {len(self.content_match_files)} files"
+        )
+
+    def select_matching_files(self):
+        """Check only the files with content matches, ready for Extract Selected."""
+        if self.file_tree is None or not self.content_match_files:
+            return
+        self.selection_model.select_only(self.content_match_files)
+        self.refresh_visible(self.file_tree)
+        self.update_token_status()
 
-            for child in self.tree.get_children(item):
-                search_recursive(child)
+    def select_changed_files(self):
+        """Check only the files git reports as changed, ready for Extract Selected."""
+        if self.file_tree is None:
+            return
+        ref = simpledialog.askstring(
+            "Select Changed Files", "Compare with branch, tag or commit (blank for uncommitted changes):",
+            parent=self.root,
+        )
+        if ref is None:
+            return
+        file_tree = self.file_tree
+
+        def run(job):
+            try:
+                changes = GitChanges(file_tree.path, ref.strip() or "HEAD")
+                self.queue.put(("git_changes", (job, file_tree, changes)))
+            except Exception as e:
+                self.queue.put(("git_error", str(e)))
+
+        self.jobs.submit("git_changes", run, priority=HIGH)
+
+    def apply_git_changes(self, changes):
+        nodes = [node for node in map(self.find_node, changes.existing_paths()) if node is not None]
+        self.git_changes = changes
+        self.selection_model.select_only(nodes)
+        self.refresh_visible(self.file_tree)
+        self.update_token_status()
+        deleted = len(changes.deleted_paths())
+        logger.info(
+            f"Selected {len(nodes)} files changed since {changes.ref}"
+            + (f", {deleted} deleted" if deleted else "")
+        )
+        if not nodes:
+            messagebox.showinfo("Select Changed Files", f"No files in the tree changed since {changes.ref}.")
 
-        root_item = self.tree.get_children()[0]
-        search_recursive(root_item)
+    def show_stats(self):
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Statistics")
+        window.geometry("640x320")
+        self.stats_window = window
+
+        columns = ("count", "total", "mean", "rate")
+        self.stats_table = ttk.Treeview(window, columns=columns)
+        self.stats_table.heading("#0", text="Phase / counter")
+        self.stats_table.heading("count", text="Count")
+        self.stats_table.heading("total", text="Total")
+        self.stats_table.heading("mean", text="Mean")
+        self.stats_table.heading("rate", text="Throughput")
+        for column, width in zip(columns, (60, 70, 70, 220)):
+            self.stats_table.column(column, width=width, anchor="e")
+        self.stats_table.pack(expand=True, fill="both", padx=10, pady=(10, 0))
+
+        btn_frame = ttk.Frame(window)
+        btn_frame.pack(fill="x", pady=10)
+        ttk.Button(btn_frame, text="Export JSON...", command=self.export_stats).pack(side="right", padx=10)
+        ttk.Button(btn_frame, text="Reset", command=self.reset_stats).pack(side="right")
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        # Called by its own timer and by Reset; only one timer may stay scheduled
+        if self.stats_after_id is not None:
+            self.root.after_cancel(self.stats_after_id)
+            self.stats_after_id = None
+        if self.stats_window is None or not self.stats_window.winfo_exists():
+            self.stats_window = None
+            return
+        snapshot = metrics.snapshot()
+        self.stats_table.delete(*self.stats_table.get_children())
+        for name, span in sorted(snapshot["spans"].items()):
+            rates = ", ".join(
+                f"{format_rate(key[:-len('_per_second')], value)}/s"
+                for key, value in span.items() if key.endswith("_per_second")
+            )
+            self.stats_table.insert("", "end", text=name, values=(
+                span["count"], f"{span['seconds']:.2f}s",
+                f"{span['seconds'] / span['count'] * 1000:.1f}ms", rates,
+            ))
+        for name, value in sorted(snapshot["counters"].items()):
+            self.stats_table.insert("", "end", text=name, values=(value, "", "", ""))
+        self.stats_after_id = self.root.after(STATS_REFRESH_MS, self.refresh_stats)
+
+    def export_stats(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("JSON files", "*.json")], parent=self.stats_window
+        )
+        if path:
+            try:
+                metrics.export(path)
+            except OSError as e:
+                messagebox.showerror("Export Failed", f"Unable to write {path}: {e}", parent=self.stats_window)
 
+    def reset_stats(self):
+        metrics.reset()
+        self.refresh_stats()
 
     def process_queue(self):
         try:
             while True:
                 action, data = self.queue.get_nowait()
-                if action == "populate":
-                    self.populate_tree()
+                if action == "scan_complete":
+                    self.apply_scan(*data)
+                elif action == "search_index":
+                    job, file_tree, search_index = data
+                    if self.jobs.is_current(job) and file_tree is self.file_tree:
+                        self.search_index = search_index
                 elif action == "error":
                     messagebox.showerror("Error", f"Failed to scan directory: {data}")
-                elif action == "update_progress":
-                    self.progress_bar["value"] = data
-                    self.progress_label["text"] = f"Progress: {data}%"
+                elif action == "job_progress":
+                    job, progress = data
+                    if job is self.progress_job and not job.cancelled:
+                        self.show_job_progress(progress)
+                elif action == "content_matches":
+                    job, matches = data
+                    if self.jobs.is_current(job):
+                        self.show_content_matches(matches)
+                elif action == "content_search_done":
+                    if self.jobs.is_current(data):
+                        self.search_status["text"] = (
+                            f"{len(self.content_matches)} matches in "
+                            f"{len(self.content_match_files)} files (done)"
+                        )
+                elif action == "preview":
+                    file_path, text = data
+                    if file_path == self.preview_path:
+                        self.show_preview(text)
+                elif action == "tokens_ready":
+                    job, file_tree = data
+                    if self.jobs.is_current(job) and file_tree is self.file_tree:
+                        self.refresh_visible(self.file_tree)
+                        self.update_token_status()
+                elif action == "fs_changes":
+                    self.handle_fs_changes(data)
+                elif action == "fs_deltas":
+                    self.apply_fs_deltas(*data)
+                elif action == "git_changes":
+                    job, file_tree, changes = data
+                    if self.jobs.is_current(job) and file_tree is self.file_tree:
+                        self.apply_git_changes(changes)
+                elif action == "git_error":
+                    messagebox.showerror("Select Changed Files", f"Unable to read git changes: {data}")
                 elif action == "hide_progress":
-                    self.progress_frame.pack_forget()
+                    self.hide_progress(data)
                 elif action == "extraction_complete":
                     messagebox.showinfo(
                         "Extraction Complete",
-                        f"Selected items have been extracted to {data}",
+                        f"Selected items have been extracted to "
+                        f"{data.shard_files[0] if len(data.shard_files) == 1 else data.output_file}\n"
+                        f"{data.summary()}",
                     )
                 elif action == "extraction_error":
                     messagebox.showerror(
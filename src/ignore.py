@@ -0,0 +1,214 @@
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.logger import logger
+from src.config import DEFAULT_IGNORE_PATTERNS, PROJECT_IGNORE_FILE
+
+GITIGNORE_FILE = ".gitignore"
+
+
+def _translate_segment(segment: str) -> str:
+    """Translate one path segment of a gitignore glob; wildcards never cross '/'."""
+    out = []
+    i, n = 0, len(segment)
+    while i < n:
+        c = segment[i]
+        i += 1
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "\\" and i < n:
+            out.append(re.escape(segment[i]))
+            i += 1
+        elif c == "[":
+            end = segment.find("]", i + 1 if i < n and segment[i] in "!^" else i)
+            if end == -1:
+                out.append("\\[")
+                continue
+            body = segment[i:end]
+            i = end + 1
+            if body[:1] in ("!", "^"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+def translate(pattern: str) -> Optional[Tuple[str, bool]]:
+    """Translate one gitignore line to (regex, negated), or None for blanks and comments.
+
+    The regex matches a path relative to the ignore file's directory, with a
+    trailing '/' appended for directories.
+    """
+    if pattern.endswith("\\ "):
+        pattern = pattern[:-2].rstrip(" ") + " "
+    else:
+        pattern = pattern.rstrip()
+    if not pattern or pattern.startswith("#"):
+        return None
+    negated = pattern.startswith("!")
+    if negated:
+        pattern = pattern[1:]
+    elif pattern.startswith("\\#") or pattern.startswith("\\!"):
+        pattern = pattern[1:]
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+    # A slash anywhere but the end anchors the pattern to the ignore file's directory
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    parts = [] if anchored else ["(?:.*/)?"]
+    segments = pattern.split("/")
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == "**":
+            parts.append(".+" if last else "(?:.*/)?")
+            continue
+        parts.append(_translate_segment(segment))
+        if not last:
+            parts.append("/")
+    parts.append("/" if dir_only else "/?")
+    return "".join(parts), negated
+
+
+class IgnoreRules:
+    """The patterns of one ignore file, compiled into a single regex.
+
+    Alternatives are ordered last rule first, so the group that matches is the
+    rule git would apply (the last one matching) and its sign decides.
+    """
+
+    def __init__(self, patterns: Iterable[str], source: str = ""):
+        self.source = source
+        translated = [t for t in map(translate, patterns) if t is not None]
+        self._negated = [negated for _, negated in reversed(translated)]
+        self._regex = None
+        if translated:
+            self._regex = re.compile("|".join(f"({regex})" for regex, _ in reversed(translated)))
+
+    def __bool__(self) -> bool:
+        return self._regex is not None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included by a negation, None if no rule matches."""
+        if self._regex is None:
+            return None
+        m = self._regex.fullmatch(rel_path + "/" if is_dir else rel_path)
+        if m is None:
+            return None
+        return not self._negated[m.lastindex - 1]
+
+    @classmethod
+    def from_file(cls, path: str) -> 'IgnoreRules':
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return cls(f.read().splitlines(), path)
+        except OSError as e:
+            logger.error(f"Unable to read ignore file {path}: {str(e)}")
+            return cls((), path)
+
+
+class IgnoreContext:
+    """Rules in effect for one directory, each with the directory's path relative to the rules' base."""
+
+    __slots__ = ("ignore_filter", "layers", "project")
+
+    def __init__(self, ignore_filter: 'IgnoreFilter', layers: Tuple[Tuple[IgnoreRules, str], ...],
+                 project: Optional[Tuple[IgnoreRules, str]]):
+        self.ignore_filter = ignore_filter
+        # Lowest precedence first; each prefix is "" or ends with "/"
+        self.layers = layers
+        self.project = project
+
+    def enter(self, dir_path: str, has_gitignore: bool) -> 'IgnoreContext':
+        """Add dir_path's own .gitignore, which applies to its entries and below."""
+        if not has_gitignore or not self.ignore_filter.use_gitignore:
+            return self
+        rules = self.ignore_filter.load(os.path.join(dir_path, GITIGNORE_FILE))
+        if not rules:
+            return self
+        return IgnoreContext(self.ignore_filter, self.layers + ((rules, ""),), self.project)
+
+    def descend(self, name: str) -> 'IgnoreContext':
+        layers = tuple((rules, f"{prefix}{name}/") for rules, prefix in self.layers)
+        project = None if self.project is None else (self.project[0], f"{self.project[1]}{name}/")
+        return IgnoreContext(self.ignore_filter, layers, project)
+
+    def is_ignored(self, name: str, is_dir: bool) -> bool:
+        # The project file overrides everything, then deeper .gitignore files
+        # take precedence over shallower ones and the built-in defaults
+        if self.project is not None:
+            result = self.project[0].match(self.project[1] + name, is_dir)
+            if result is not None:
+                return result
+        for rules, prefix in reversed(self.layers):
+            result = rules.match(prefix + name, is_dir)
+            if result is not None:
+                return result
+        return False
+
+
+class IgnoreFilter:
+    """Ignore rules for one scan root: built-in defaults, .gitignore files and the project file.
+
+    Parsed ignore files are kept for the filter's lifetime; create a new filter
+    to pick up edits to them.
+    """
+
+    def __init__(self, root_path: str, use_gitignore: bool = True,
+                 patterns: Iterable[str] = DEFAULT_IGNORE_PATTERNS):
+        self.root_path = root_path
+        self.use_gitignore = use_gitignore
+        self._rules: Dict[str, IgnoreRules] = {}
+        self._contexts: Dict[str, IgnoreContext] = {}
+        self._lock = threading.Lock()
+
+        layers = []
+        defaults = IgnoreRules(patterns, "defaults")
+        if defaults:
+            layers.append((defaults, ""))
+        if use_gitignore:
+            exclude_path = os.path.join(root_path, ".git", "info", "exclude")
+            if os.path.isfile(exclude_path):
+                layers.append((self.load(exclude_path), ""))
+        project = None
+        project_path = os.path.join(root_path, PROJECT_IGNORE_FILE)
+        if os.path.isfile(project_path):
+            project = (self.load(project_path), "")
+        self.root_context = IgnoreContext(self, tuple(layers), project)
+
+    def load(self, path: str) -> IgnoreRules:
+        with self._lock:
+            rules = self._rules.get(path)
+        if rules is None:
+            rules = IgnoreRules.from_file(path)
+            with self._lock:
+                self._rules[path] = rules
+        return rules
+
+    def context_for(self, dir_path: str) -> IgnoreContext:
+        """Context inherited by dir_path from the root and its ancestors' .gitignore files."""
+        with self._lock:
+            context = self._contexts.get(dir_path)
+        if context is not None:
+            return context
+        rel = os.path.relpath(dir_path, self.root_path)
+        parts: List[str] = [] if rel == os.curdir else rel.split(os.sep)
+        context = self.root_context
+        path = self.root_path
+        for part in parts:
+            context = context.enter(path, os.path.isfile(os.path.join(path, GITIGNORE_FILE))).descend(part)
+            path = os.path.join(path, part)
+        with self._lock:
+            self._contexts[dir_path] = context
+        return context
+
+    def listing_context(self, dir_path: str) -> IgnoreContext:
+        """Context for filtering the entries of dir_path when it is re-listed on its own
+        (cache refresh, watcher) rather than reached by the scanner."""
+        return self.context_for(dir_path).enter(dir_path, os.path.isfile(os.path.join(dir_path, GITIGNORE_FILE)))
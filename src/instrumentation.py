@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class Span:
+    """Amounts (files, bytes, ...) processed during one timed span."""
+
+    __slots__ = ("amounts",)
+
+    def __init__(self):
+        self.amounts: Dict[str, int] = {}
+
+    def add(self, **amounts: int):
+        for key, value in amounts.items():
+            self.amounts[key] = self.amounts.get(key, 0) + value
+
+
+class Metrics:
+    """Timing spans per phase and plain counters, safe to update from any thread.
+
+    Each span name accumulates its run count, total and longest duration and
+    the amounts added to it; snapshot() derives a per-second rate for every
+    amount.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[str, dict] = {}
+        self._counters: Dict[str, int] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        span = Span()
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.record(name, time.perf_counter() - start, **span.amounts)
+
+    def record(self, name: str, seconds: float, **amounts: int):
+        """Add one finished span measured elsewhere."""
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "amounts": {}}
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            totals = stats["amounts"]
+            for key, value in amounts.items():
+                totals[key] = totals.get(key, 0) + value
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            spans = {name: dict(stats, amounts=dict(stats["amounts"])) for name, stats in self._spans.items()}
+            counters = dict(self._counters)
+        for stats in spans.values():
+            amounts = stats.pop("amounts")
+            seconds = stats["seconds"]
+            for key, value in amounts.items():
+                stats[key] = value
+                stats[f"{key}_per_second"] = value / seconds if seconds > 0 else 0.0
+        return {"spans": spans, "counters": counters}
+
+    def export(self, path: str):
+        data = self.snapshot()
+        data["exported"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+
+metrics = Metrics()
@@ -0,0 +1,176 @@
+import heapq
+import itertools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+from src.logger import logger
+from src.config import JOB_WORKERS, PROGRESS_INTERVAL_SECONDS
+
+# Priorities: lower runs first when more jobs are queued than there are workers
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+
+# Forking a process with live threads (Tk, the scheduler, the watcher) can
+# hand the child a lock some other thread held, so workers start clean
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """A process pool whose workers start from a fresh interpreter rather than a fork."""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(_START_METHOD))
+
+
+class Cancelled(Exception):
+    """Raised inside a job once its token is cancelled."""
+
+
+class CancelToken(threading.Event):
+    """Set when a job is cancelled or superseded.
+
+    It is a threading.Event, so it can be passed as the cancel_event of
+    count_tokens, search_contents and the like.
+    """
+
+    def cancel(self):
+        self.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.is_set()
+
+    def check(self):
+        if self.is_set():
+            raise Cancelled()
+
+
+class JobProgress:
+    __slots__ = ("done", "total", "message", "elapsed", "eta")
+
+    def __init__(self, done: int, total: Optional[int], message: Optional[str], elapsed: float,
+                 eta: Optional[float]):
+        self.done = done
+        self.total = total  # None while the amount of work is unknown (scans)
+        self.message = message
+        self.elapsed = elapsed
+        self.eta = eta  # estimated seconds remaining, from the rate so far
+
+    @property
+    def fraction(self) -> Optional[float]:
+        return self.done / self.total if self.total else None
+
+
+class Job:
+    """One unit of background work: func(job, *args) on a scheduler thread."""
+
+    def __init__(self, key: str, func: Callable, args: tuple, priority: int,
+                 on_progress: Optional[Callable[['Job', JobProgress], None]]):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.priority = priority
+        self.token = CancelToken()
+        self.started: Optional[float] = None
+        self._on_progress = on_progress
+        self._last_report = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.is_set()
+
+    def cancel(self):
+        self.token.cancel()
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None,
+                 force: bool = False):
+        """Report progress, passed on at most once per PROGRESS_INTERVAL_SECONDS.
+
+        Every call checks the token, so long loops that report progress stop
+        with Cancelled soon after the job is cancelled.
+        """
+        self.token.check()
+        now = time.monotonic()
+        finished = total is not None and done >= total
+        if not (force or finished) and now - self._last_report < PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_report = now
+        elapsed = now - (self.started or now)
+        eta = elapsed * (total - done) / done if total and done else None
+        if self._on_progress is not None:
+            self._on_progress(self, JobProgress(done, total, message, elapsed, eta))
+
+
+class JobScheduler:
+    """Runs jobs on a small pool of daemon threads, highest priority first.
+
+    Jobs are submitted under a key ("scan", "preview", ...). By default a new
+    job supersedes the previous one with the same key, which is cancelled;
+    is_current() tells whether a result is still wanted when it reaches the
+    Tk thread. on_progress(job, progress) is called from the job's thread.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS,
+                 on_progress: Optional[Callable[[Job, JobProgress], None]] = None):
+        self.workers = workers
+        self.on_progress = on_progress
+        self._heap = []
+        self._sequence = itertools.count()
+        self._current: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._threads = []
+        self._running = 0
+
+    def submit(self, key: str, func: Callable, *args, priority: int = NORMAL, supersede: bool = True) -> Job:
+        job = Job(key, func, args, priority, self.on_progress)
+        with self._wakeup:
+            previous = self._current.get(key)
+            if supersede and previous is not None:
+                previous.cancel()
+            self._current[key] = job
+            heapq.heappush(self._heap, (priority, next(self._sequence), job))
+            self._ensure_workers()
+            self._wakeup.notify()
+        return job
+
+    def is_current(self, job: Job) -> bool:
+        """True unless job was cancelled or a newer job with its key was submitted."""
+        with self._lock:
+            return self._current.get(job.key) is job and not job.cancelled
+
+    def cancel(self, key: str):
+        with self._lock:
+            job = self._current.get(key)
+        if job is not None:
+            job.cancel()
+
+    def _ensure_workers(self):
+        # Threads start as needed, up to the limit, and then stay for reuse
+        idle = len(self._threads) - self._running
+        if idle < len(self._heap) and len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._heap:
+                    self._wakeup.wait()
+                _, _, job = heapq.heappop(self._heap)
+                if job.cancelled:
+                    continue
+                self._running += 1
+            job.started = time.monotonic()
+            try:
+                job.func(job, *job.args)
+            except Cancelled:
+                logger.debug("Job %s cancelled after %.2fs", job.key, time.monotonic() - job.started)
+            except Exception as e:
+                logger.error(f"Error in background job {job.key}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._running -= 1
@@ -3,22 +3,42 @@ import sys
 import os
 import atexit
 import time
+from multiprocessing import parent_process
+from src.config import LOG_LEVEL
 
 # Global variables
 log_file_path = None
 file_handler = None
+console_handler = None
 logger = None
+owner_pid = None  # the process that created the log file and removes it
+
+def parse_level(value):
+    """A level name (any case) or number; INFO, with a warning, for anything else."""
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    if isinstance(level, int):
+        return level
+    # The logger is not set up yet, so the warning goes straight to stderr, once
+    # rather than again from every spawned worker
+    if parent_process() is None:
+        print(f"Unknown log level {value!r} in CODEEXTRACTOR_LOG_LEVEL; using INFO", file=sys.stderr)
+    return logging.INFO
 
 def setup_logger():
-    global log_file_path, file_handler, logger
+    global log_file_path, file_handler, console_handler, logger
     logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
+    # The logger's level gates everything: debug calls on hot paths return
+    # before formatting unless DEBUG is enabled
+    logger.setLevel(parse_level(LOG_LEVEL))
 
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
     # File handler
     log_file_path = os.path.join(os.getcwd(), 'app.log')
-    file_handler = logging.FileHandler(log_file_path, encoding='utf-8')
+    file_handler = logging.FileHandler(log_file_path, encoding='utf-8', delay=True)
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
 
@@ -32,8 +52,19 @@ def setup_logger():
 
     return logger
 
+def set_console_level(level):
+    if console_handler:
+        console_handler.setLevel(level)
+
+def set_log_level(level):
+    if logger:
+        logger.setLevel(level)
+
 def cleanup_log_file():
     global log_file_path, file_handler, logger
+    if os.getpid() != owner_pid:
+        # A forked worker exiting through atexit; the log belongs to its parent
+        return
     if file_handler:
         logger.removeHandler(file_handler)
         file_handler.close()
@@ -43,16 +74,19 @@ def cleanup_log_file():
         for attempt in range(max_attempts):
             try:
                 os.remove(log_file_path)
-                print(f"Removed log file: {log_file_path}")
+                print(f"Removed log file: {log_file_path}", file=sys.stderr)
                 break
             except Exception as e:
                 if attempt < max_attempts - 1:
-                    print(f"Error removing log file (attempt {attempt + 1}): {e}")
+                    print(f"Error removing log file (attempt {attempt + 1}): {e}", file=sys.stderr)
                     time.sleep(0.5)
                 else:
-                    print(f"Failed to remove log file after {max_attempts} attempts: {e}")
+                    print(f"Failed to remove log file after {max_attempts} attempts: {e}", file=sys.stderr)
 
 logger = setup_logger()
 
-# Register the cleanup function to be called on exit
-atexit.register(cleanup_log_file)
+# Pool workers started with spawn (Windows, macOS) re-import the main module
+# and with it this one; only the main process may remove the shared log file
+if parent_process() is None:
+    owner_pid = os.getpid()
+    atexit.register(cleanup_log_file)
@@ -0,0 +1,218 @@
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import time
+from typing import List, Optional, Union
+from src.tokens import estimate_tokens
+from src.instrumentation import metrics
+from src.logger import logger
+from src.config import WRITE_BUFFER_SIZE, FLUSH_INTERVAL_BYTES, GZIP_LEVEL, XZ_PRESET
+
+GZIP = "gzip"
+XZ = "xz"
+COMPRESSIONS = (GZIP, XZ)
+_SUFFIXES = {GZIP: ".gz", XZ: ".xz"}
+
+MANIFEST_VERSION = 1
+
+
+class StreamedEntry:
+    """An extracted entry whose body is copied from a file instead of held in memory."""
+
+    def __init__(self, header: bytes, body_path: str, footer: bytes):
+        self.header = header
+        self.body_path = body_path
+        self.footer = footer
+
+    def read(self) -> bytes:
+        with open(self.body_path, "rb") as body:
+            return self.header + body.read() + self.footer
+
+
+class PreparedEntry:
+    """One entry ready for the writer: compressed, hashed and sized on a worker."""
+
+    __slots__ = ("path", "data", "size", "sha256", "tokens", "content_hash", "duplicate_of")
+
+    def __init__(self, path: str, data: Union[bytes, StreamedEntry], size: int,
+                 sha256: Optional[str], tokens: Optional[int]):
+        self.path = path
+        self.data = data
+        self.size = size  # uncompressed bytes
+        self.sha256 = sha256
+        self.tokens = tokens
+        # Set in dedupe mode: hash of the file's content without its header,
+        # and for later copies the path of the first occurrence
+        self.content_hash: Optional[str] = None
+        self.duplicate_of: Optional[str] = None
+
+
+def compress(data: bytes, compression: str) -> bytes:
+    # Each entry is a complete gzip member / xz stream. Concatenated they still
+    # decompress as one file, and any single entry can be decompressed alone.
+    if compression == GZIP:
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    return lzma.compress(data, preset=XZ_PRESET)
+
+
+def prepare_entry(rel_path: str, entry: Union[bytes, StreamedEntry], compression: Optional[str] = None,
+                  count_tokens: bool = False) -> PreparedEntry:
+    """Compress, hash and optionally token-count an entry; runs on extraction workers."""
+    path = rel_path.replace(os.sep, "/")
+    if isinstance(entry, StreamedEntry):
+        if compression is None and not count_tokens:
+            # Left on disk; the writer hashes it while copying
+            size = len(entry.header) + os.path.getsize(entry.body_path) + len(entry.footer)
+            return PreparedEntry(path, entry, size, None, None)
+        entry = entry.read()
+    tokens = estimate_tokens(entry) if count_tokens else None
+    sha256 = hashlib.sha256(entry).hexdigest()
+    data = compress(entry, compression) if compression is not None else entry
+    return PreparedEntry(path, data, len(entry), sha256, tokens)
+
+
+def shard_path(output_file: str, index: Optional[int], compression: Optional[str] = None) -> str:
+    """bundle.txt -> bundle.txt(.gz) unsharded, bundle.002.txt(.gz) for shard 2."""
+    suffix = _SUFFIXES.get(compression, "")
+    if suffix and output_file.endswith(suffix):
+        output_file = output_file[:-len(suffix)]
+    if index is not None:
+        stem, ext = os.path.splitext(output_file)
+        output_file = f"{stem}.{index:03d}{ext}"
+    return output_file + suffix
+
+
+class BundleWriter:
+    """Writes prepared entries in order, rolling over to a new shard at the byte or token cap,
+    and records where each entry landed in a JSON manifest."""
+
+    def __init__(self, output_file: str, root_path: str, shard_bytes: Optional[int] = None,
+                 shard_tokens: Optional[int] = None, compression: Optional[str] = None,
+                 manifest_file: Optional[str] = None, flush_interval: int = FLUSH_INTERVAL_BYTES):
+        self.output_file = output_file
+        self.root_path = root_path
+        self.shard_bytes = shard_bytes
+        self.shard_tokens = shard_tokens
+        self.compression = compression
+        self.manifest_file = manifest_file
+        self.flush_interval = flush_interval
+        self.sharded = bool(shard_bytes or shard_tokens)
+        self.shards: List[dict] = []
+        self.records: List[dict] = []
+        self.bytes_written = 0
+        self.write_seconds = 0.0  # spent in write(), for the "write" span
+        self._file = None
+        self._shard_bytes = 0
+        self._shard_tokens = 0
+        self._unflushed = 0
+
+    @property
+    def shard_files(self) -> List[str]:
+        return [shard["path"] for shard in self.shards]
+
+    def _open_shard(self):
+        self._close_shard()
+        path = shard_path(self.output_file, len(self.shards) if self.sharded else None, self.compression)
+        self._file = open(path, "wb", buffering=WRITE_BUFFER_SIZE)
+        self.shards.append({"path": path, "bytes": 0, "entries": 0})
+        self._shard_bytes = 0
+        self._shard_tokens = 0
+
+    def _close_shard(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            shard = self.shards[-1]
+            shard["bytes"] = self._shard_bytes
+            if self.shard_tokens:
+                shard["tokens"] = self._shard_tokens
+
+    def _full_for(self, entry: PreparedEntry, length: int) -> bool:
+        # An entry bigger than the cap still gets a shard of its own
+        if self._shard_bytes == 0:
+            return False
+        if self.shard_bytes and self._shard_bytes + length > self.shard_bytes:
+            return True
+        return bool(self.shard_tokens) and self._shard_tokens + (entry.tokens or 0) > self.shard_tokens
+
+    def write(self, entry: PreparedEntry) -> int:
+        start = time.perf_counter()
+        data = entry.data
+        length = len(data) if isinstance(data, bytes) else entry.size
+        if self._file is None or self._full_for(entry, length):
+            self._open_shard()
+        offset = self._shard_bytes
+        if isinstance(data, bytes):
+            self._file.write(data)
+            sha256 = entry.sha256
+        else:
+            sha256 = self._copy_streamed(data)
+        self._shard_bytes += length
+        self._shard_tokens += entry.tokens or 0
+        self.shards[-1]["entries"] += 1
+        self.bytes_written += length
+
+        record = {"path": entry.path, "shard": len(self.shards) - 1, "offset": offset,
+                  "length": length, "size": entry.size, "sha256": sha256}
+        if entry.tokens is not None:
+            record["tokens"] = entry.tokens
+        if entry.duplicate_of is not None:
+            record["duplicate_of"] = entry.duplicate_of
+        self.records.append(record)
+
+        self._unflushed += length
+        if self._unflushed >= self.flush_interval:
+            self._file.flush()
+            self._unflushed = 0
+        self.write_seconds += time.perf_counter() - start
+        return length
+
+    def _copy_streamed(self, entry: StreamedEntry) -> str:
+        digest = hashlib.sha256(entry.header)
+        self._file.write(entry.header)
+        with open(entry.body_path, "rb") as body:
+            while True:
+                chunk = body.read(WRITE_BUFFER_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                self._file.write(chunk)
+        digest.update(entry.footer)
+        self._file.write(entry.footer)
+        return digest.hexdigest()
+
+    def close(self):
+        if self._file is None:
+            # Nothing was written: still leave an (empty) output behind
+            self._open_shard()
+        self._close_shard()
+        if self.manifest_file:
+            self._write_manifest()
+        metrics.record("write", self.write_seconds, files=len(self.records), bytes=self.bytes_written)
+
+    def discard(self):
+        """Close and delete the shards written so far, without a manifest."""
+        self._close_shard()
+        for path in self.shard_files:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.error(f"Failed to remove partial output {path}: {str(e)}")
+
+    def _write_manifest(self):
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "root": self.root_path,
+            "compression": self.compression,
+            "shards": [
+                dict(shard, path=os.path.basename(shard["path"])) for shard in self.shards
+            ],
+            "files": self.records,
+        }
+        try:
+            with open(self.manifest_file, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=1)
+        except OSError as e:
+            logger.error(f"Failed to write manifest {self.manifest_file}: {str(e)}")
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+from src import archives
+from src.classifier import BINARY, UNDECODABLE, TOO_LARGE
+from src.extractors import TEXT, SkippedContent, extractor_for
+from src.sampling import policy_for, read_sample
+from src.instrumentation import metrics
+from src.jobs import Job, JobScheduler, HIGH, LOW
+from src.logger import logger
+from src.config import PREVIEW_MAX_CHARS, PREVIEW_CACHE_ENTRIES
+
+TRUNCATED_NOTICE = "\n\n[File truncated...]"
+
+
+SKIPPED_PREVIEWS = {
+    BINARY: "Unable to preview: binary file",
+    UNDECODABLE: "Unable to preview: encoding error",
+    TOO_LARGE: "Unable to preview: file exceeds the size limit",
+}
+
+
+def load_preview(file_path: str, max_chars: int = PREVIEW_MAX_CHARS) -> str:
+    """Return the text shown in the preview pane for file_path."""
+    if archives.isdir(file_path):
+        return f"Selected item is a directory: {file_path}"
+    if not archives.isfile(file_path):
+        return f"Item not found: {file_path}"
+    extractor = extractor_for(file_path)
+    try:
+        size = archives.signature(file_path)[0]
+        if extractor.too_large(size):
+            raise SkippedContent(TOO_LARGE)
+        policy = policy_for(file_path, size) if extractor is TEXT else None
+        if policy is not None:
+            # Sampled like extraction, scaled down to the pane; the markers say what was left out
+            sample = read_sample(file_path, policy, max_chars)
+            if sample is not None:
+                return sample
+        # Pieces are read until max_chars is reached; the rest of the file is never
+        # touched, and preview_parts caps how much of a document the backend parses
+        parts = []
+        length = 0
+        with archives.open_file(file_path, seekable=extractor is not TEXT) as file:
+            for text in extractor.iter_text(file, extractor.preview_parts):
+                parts.append(text)
+                length += len(text)
+                if length >= max_chars:
+                    break
+        content = "".join(parts)[:max_chars]
+    except SkippedContent as e:
+        return SKIPPED_PREVIEWS.get(e.kind, "Unable to preview this file")
+    except UnicodeDecodeError:
+        return "Unable to preview: encoding error"
+    except Exception as e:
+        return f"Error previewing file: {str(e)}"
+    if len(content) == max_chars:
+        content += TRUNCATED_NOTICE
+    return content
+
+
+def _signature(file_path: str):
+    try:
+        return archives.signature(file_path)
+    except OSError:
+        return None
+
+
+class PreviewLoader:
+    """Loads previews as scheduler jobs and keeps recent ones in an LRU cache.
+
+    Each request supersedes the previous one, so scrolling past files never
+    leaves a backlog of stale loads; prefetches run as a separate
+    low-priority job behind the request. on_loaded(path, text) is called from
+    a job thread.
+    """
+
+    def __init__(self, on_loaded: Callable[[str, str], None], scheduler: JobScheduler,
+                 cache_entries: int = PREVIEW_CACHE_ENTRIES):
+        self.on_loaded = on_loaded
+        self.scheduler = scheduler
+        self.cache_entries = cache_entries
+        self._cache = OrderedDict()  # path -> (signature, text)
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str) -> Optional[str]:
+        """Return the cached preview if the file is unchanged since it was loaded."""
+        with self._lock:
+            cached = self._cache.get(file_path)
+        if cached is None or cached[0] != _signature(file_path):
+            metrics.count("preview_cache_misses")
+            return None
+        with self._lock:
+            if file_path in self._cache:
+                self._cache.move_to_end(file_path)
+        metrics.count("preview_cache_hits")
+        return cached[1]
+
+    def request(self, file_path: Optional[str], prefetch: Iterable[str] = ()):
+        """Load file_path (reported via on_loaded), then the prefetch paths."""
+        if file_path is not None:
+            self.scheduler.submit("preview", self._load, [file_path], True, priority=HIGH)
+        else:
+            self.scheduler.cancel("preview")
+        wanted = [path for path in prefetch if self.get(path) is None]
+        if wanted:
+            self.scheduler.submit("preview_prefetch", self._load, wanted, False, priority=LOW)
+        else:
+            self.scheduler.cancel("preview_prefetch")
+
+    def invalidate(self, file_path: str):
+        with self._lock:
+            self._cache.pop(file_path, None)
+
+    def _load(self, job: Job, paths: List[str], report: bool):
+        for file_path in paths:
+            job.token.check()
+            try:
+                signature = _signature(file_path)
+                text = load_preview(file_path)
+                with self._lock:
+                    self._cache[file_path] = (signature, text)
+                    self._cache.move_to_end(file_path)
+                    while len(self._cache) > self.cache_entries:
+                        self._cache.popitem(last=False)
+                if report:
+                    self.on_loaded(file_path, text)
+            except Exception as e:
+                logger.error(f"Error loading preview for {file_path}: {str(e)}")
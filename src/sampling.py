@@ -0,0 +1,150 @@
+import mmap
+import os
+from typing import Dict, List, Optional, Tuple
+from src.classifier import DEFAULT_CLASSIFIER, FileClassifier, TEXT
+from src.extractors import SkippedContent
+from src import archives
+from src.config import SAMPLE_POLICIES, SAMPLE_MIN_BYTES, SAMPLE_MAX_BYTES
+
+# Samples are cut from a memory map with find/rfind for newlines, so only
+# the pages holding the sampled lines are read, however large the file.
+
+FULL = "full"
+HEAD = "head"
+TAIL = "tail"
+HEAD_TAIL = "head+tail"
+STRIDE = "stride"
+MODES = (FULL, HEAD, TAIL, HEAD_TAIL, STRIDE)
+
+# Newline scanning needs an encoding where b"\n" is always a line break
+_SAMPLED_ENCODINGS = ("utf-8", "utf-8-sig")
+
+
+def _line_end(data, start: int, lines: int, limit: int) -> int:
+    """Offset just past the lines-th line from start, or limit when that comes first."""
+    position = start
+    for _ in range(lines):
+        newline = data.find(b"\n", position, limit)
+        if newline == -1:
+            return limit
+        position = newline + 1
+    return position
+
+
+def _line_start(data, end: int, lines: int, limit: int) -> int:
+    """Offset of the first of the last lines lines before end, or limit when that comes first."""
+    # A final newline ends the last line rather than starting an empty one
+    position = end - 1 if end > limit and data[end - 1:end] == b"\n" else end
+    for _ in range(lines):
+        newline = data.rfind(b"\n", limit, position)
+        if newline == -1:
+            return limit
+        position = newline
+    return position + 1
+
+
+def _merge(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        elif end > start:
+            merged.append((start, end))
+    return merged
+
+
+class SamplePolicy:
+    def __init__(self, mode: str, lines: int):
+        if mode not in MODES:
+            raise ValueError(f"Unknown sampling policy {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.lines = max(1, lines)
+
+    def describe(self) -> str:
+        return {
+            FULL: "all lines",
+            HEAD: f"first {self.lines} lines",
+            TAIL: f"last {self.lines} lines",
+            HEAD_TAIL: f"first and last {self.lines} lines",
+            STRIDE: f"{self.lines} lines spread through the file",
+        }[self.mode]
+
+    def ranges(self, data, max_bytes: int) -> List[Tuple[int, int]]:
+        """Sorted, disjoint (start, end) byte ranges of data to keep, max_bytes in all.
+
+        Lines longer than their share of max_bytes are cut short.
+        """
+        size = len(data)
+        if self.mode == FULL:
+            return [(0, min(size, max_bytes))]
+        if self.mode == HEAD:
+            return [(0, _line_end(data, 0, self.lines, min(size, max_bytes)))]
+        if self.mode == TAIL:
+            return [(_line_start(data, size, self.lines, max(0, size - max_bytes)), size)]
+        if self.mode == HEAD_TAIL:
+            half = max_bytes // 2
+            head_end = _line_end(data, 0, self.lines, min(size, half))
+            tail_start = _line_start(data, size, self.lines, max(head_end, size - half))
+            return _merge([(0, head_end), (tail_start, size)])
+        # Stride: one line at or after each of lines evenly spaced offsets
+        share = max(1, max_bytes // self.lines)
+        ranges = []
+        for index in range(self.lines):
+            offset = index * size // self.lines
+            if offset:
+                newline = data.find(b"\n", offset - 1, min(size, offset - 1 + share))
+                if newline == -1:
+                    continue
+                offset = newline + 1
+            ranges.append((offset, _line_end(data, offset, 1, min(size, offset + share))))
+        return _merge(ranges)
+
+
+# Extension -> policy; "full" entries are kept so they can switch sampling off
+POLICIES: Dict[str, SamplePolicy] = {
+    ext.lower(): SamplePolicy(mode, lines) for ext, (mode, lines) in SAMPLE_POLICIES.items()
+}
+
+
+def policy_for(filename: str, size: int, min_bytes: int = SAMPLE_MIN_BYTES) -> Optional[SamplePolicy]:
+    """The policy to sample filename with at this size, or None to read it as usual."""
+    if size <= min_bytes:
+        return None
+    policy = POLICIES.get(os.path.splitext(filename)[1].lower())
+    if policy is None or policy.mode == FULL:
+        return None
+    return policy
+
+
+def read_sample(path: str, policy: SamplePolicy, max_bytes: int = SAMPLE_MAX_BYTES,
+                classifier: FileClassifier = DEFAULT_CLASSIFIER) -> Optional[str]:
+    """The sample of the file at path that policy selects, with the gaps marked.
+
+    Binaries and undecodable files raise SkippedContent, as the text
+    extractor does. Returns None for archive members, which cannot be
+    mapped, and for UTF-16/32 text; the caller reads those as usual.
+    """
+    if archives.locate(path) is not None:
+        return None
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        size = len(data)
+        head = data[:classifier.sniff_bytes]
+        kind, encoding = classifier.sniff(head, complete=len(head) == size)
+        if kind != TEXT:
+            raise SkippedContent(kind)
+        if encoding not in _SAMPLED_ENCODINGS:
+            return None
+        parts = []
+        position = 0
+        for start, end in policy.ranges(data, max_bytes):
+            if start > position:
+                parts.append(f"[... {start - position:,} bytes omitted ...]\n")
+            # A cut may split a character at either end of a range
+            text = data[start:end].decode(encoding if start == 0 else "utf-8", errors="replace")
+            parts.append(text if text.endswith("\n") else text + "\n")
+            position = end
+        if position < size:
+            parts.append(f"[... {size - position:,} bytes omitted ...]\n")
+    if len(parts) == 1 and position == size:
+        return parts[0]
+    return f"[Sample: {policy.describe()} of {size:,} bytes]\n" + "".join(parts)
@@ -0,0 +1,279 @@
+import hashlib
+import os
+import pickle
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from src.file_node import FileNode
+from src.file_utils import scan_directory, evict_lru, expand_archive
+from src.archives import ArchiveNode, is_archive_file, is_archive_name, mark_browsed
+from src.ignore import IgnoreFilter
+from src.instrumentation import metrics
+from src.logger import logger
+from src.config import (
+    SCAN_CACHE_DIR, SCAN_CACHE_MAX_BYTES, SCAN_CACHE_MAX_ENTRIES, SCAN_CACHE_STAT_CHUNK,
+)
+
+CACHE_VERSION = 1
+
+# Node kinds in the flattened layout
+_FILE = 0
+_DIR = 1
+_LINKED_DIR = 2  # symlinked directory, recorded but not listed
+_ARCHIVE_DIR = 3  # archive or folder inside one, rebuilt from the archive when it changes
+_ARCHIVE_FILE = 4
+
+
+def cache_path(root_path: str, cache_dir: str = SCAN_CACHE_DIR, variant: str = "") -> str:
+    # variant separates trees scanned with different ignore settings
+    key = hashlib.sha1(f"{os.path.abspath(root_path)}\0{variant}".encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{key}.scan")
+
+
+def _flatten(root: FileNode) -> dict:
+    # Columnar pre-order layout: far smaller and faster to pickle than the
+    # linked node objects, and rebuilt with a single stack walk
+    names = []
+    kinds = bytearray()
+    sizes = array("q")
+    mtimes = array("d")
+    child_counts = array("I")
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        names.append(node.name if node.parent is not None else node.path)
+        if isinstance(node, ArchiveNode):
+            kinds.append(_ARCHIVE_DIR if node.is_dir else _ARCHIVE_FILE)
+        else:
+            kinds.append(_FILE if not node.is_dir else _DIR if node.is_listable else _LINKED_DIR)
+        sizes.append(node.size)
+        mtimes.append(node.mtime)
+        child_counts.append(len(node.children))
+        stack.extend(reversed(node.children))
+    return {
+        "version": CACHE_VERSION,
+        "names": names,
+        "kinds": bytes(kinds),
+        "sizes": sizes,
+        "mtimes": mtimes,
+        "child_counts": child_counts,
+    }
+
+
+def _make_node(name: str, parent: Optional[FileNode], kind: int, size: int, mtime: float) -> FileNode:
+    if kind >= _ARCHIVE_DIR:
+        return ArchiveNode(name, parent, kind == _ARCHIVE_DIR, size, mtime)
+    node = FileNode(name, parent, kind != _FILE, size, mtime)
+    if kind == _LINKED_DIR:
+        node.children = ()
+    return node
+
+
+def _unflatten(data: dict) -> FileNode:
+    names, kinds = data["names"], data["kinds"]
+    sizes, mtimes, child_counts = data["sizes"], data["mtimes"], data["child_counts"]
+    root = _make_node(names[0], None, kinds[0], sizes[0], mtimes[0])
+    # (node, children still to attach)
+    stack = [(root, child_counts[0])]
+    for i in range(1, len(names)):
+        while stack[-1][1] == 0:
+            stack.pop()
+        parent, remaining = stack[-1]
+        stack[-1] = (parent, remaining - 1)
+        node = _make_node(names[i], parent, kinds[i], sizes[i], mtimes[i])
+        parent.children.append(node)
+        if child_counts[i]:
+            stack.append((node, child_counts[i]))
+    return root
+
+
+def load(root_path: str, cache_dir: str = SCAN_CACHE_DIR, variant: str = "") -> Optional[FileNode]:
+    path = cache_path(root_path, cache_dir, variant)
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data.get("version") != CACHE_VERSION:
+            return None
+        os.utime(path)  # Recency for LRU eviction
+        root = _unflatten(data)
+        # The cache is keyed by the absolute path; keep the caller's spelling
+        root._name = root_path
+        return root
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Ignoring unreadable scan cache {path}: {str(e)}")
+        return None
+
+
+def save(root: FileNode, cache_dir: str = SCAN_CACHE_DIR, variant: str = ""):
+    path = cache_path(root.path, cache_dir, variant)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(_flatten(root), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        evict(cache_dir)
+    except Exception as e:
+        logger.error(f"Failed to write scan cache {path}: {str(e)}")
+
+
+def evict(cache_dir: str = SCAN_CACHE_DIR, max_bytes: int = SCAN_CACHE_MAX_BYTES,
+          max_entries: int = SCAN_CACHE_MAX_ENTRIES):
+    evict_lru(cache_dir, ".scan", max_bytes, max_entries)
+
+
+def clear(cache_dir: str = SCAN_CACHE_DIR):
+    if os.path.isdir(cache_dir):
+        evict(cache_dir, max_bytes=0, max_entries=0)
+
+
+def _stat_mtimes(paths: List[str]) -> List[Optional[float]]:
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime)
+        except OSError:
+            mtimes.append(None)
+    return mtimes
+
+
+def _relist(node: FileNode, node_path: str, mtime: float, ignore: Optional[IgnoreFilter] = None,
+            expand_archives: bool = False) -> List[FileNode]:
+    """Re-list a changed directory, keeping cached subdirectories; return new subdirectories."""
+    context = ignore.listing_context(node_path) if ignore is not None else None
+    cached = {c.name: c for c in node.children if c.is_dir}
+    children = []
+    new_dirs = []
+    try:
+        with os.scandir(node_path) as entries:
+            for entry in entries:
+                if context is not None and context.is_ignored(entry.name, entry.is_dir()):
+                    continue
+                old = cached.get(entry.name)
+                if old is not None and old.is_listable and entry.is_dir() and not entry.is_symlink():
+                    # The cached subtree is validated on its own mtime
+                    children.append(old)
+                    continue
+                child = FileNode.from_entry(entry, node)
+                if expand_archives and not child.is_dir and is_archive_name(entry.name):
+                    if isinstance(old, ArchiveNode) and (old.size, old.mtime) == (child.size, child.mtime):
+                        child = old
+                    else:
+                        child = expand_archive(
+                            child, entry.path, context.descend(child.name) if context is not None else None
+                        )[0]
+                children.append(child)
+                if child.is_listable:
+                    new_dirs.append(child)
+    except PermissionError:
+        logger.error(f"Permission denied: {node_path}")
+    except Exception as e:
+        logger.error(f"Error scanning directory {node_path}: {str(e)}")
+    node.children = children
+    node.mtime = mtime
+    return new_dirs
+
+
+def refresh(
+    root: FileNode,
+    progress_callback: Callable[[int, int], None] = None,
+    max_workers: Optional[int] = None,
+    ignore: Optional[IgnoreFilter] = None,
+    expand_archives: bool = False,
+) -> Tuple[FileNode, int]:
+    """Bring a cached tree up to date, re-listing only directories whose mtime changed.
+
+    Archives are re-read when their own size or mtime changed, since
+    rewriting a file leaves its directory's mtime alone. Returns the tree and
+    the number of directories that were re-listed.
+    """
+    # Pre-order, so a re-listed parent is settled before its subdirectories
+    dirs = []
+    archive_nodes = []
+    entries_found = 0
+    stack = [(root, root.path)]
+    while stack:
+        node, node_path = stack.pop()
+        dirs.append((node, node_path))
+        entries_found += len(node.children)
+        for child in node.children:
+            if child.is_listable:
+                stack.append((child, os.path.join(node_path, child.name)))
+            elif isinstance(child, ArchiveNode) and child.is_archive_root:
+                archive_nodes.append((child, os.path.join(node_path, child.name)))
+
+    # One stat per directory, batched so thread hand-off costs stay small
+    paths = [node_path for _, node_path in dirs]
+    chunks = [paths[i:i + SCAN_CACHE_STAT_CHUNK] for i in range(0, len(paths), SCAN_CACHE_STAT_CHUNK)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        mtimes = [m for chunk in executor.map(_stat_mtimes, chunks) for m in chunk]
+    if progress_callback:
+        progress_callback(entries_found, len(dirs))
+
+    for node, node_path in archive_nodes:
+        try:
+            st = os.stat(node_path)
+        except OSError:
+            continue
+        if (st.st_size, st.st_mtime) == (node.size, node.mtime):
+            mark_browsed(node_path)
+        else:
+            fresh = expand_archive(
+                FileNode(node.name, node.parent, False, st.st_size, st.st_mtime), node_path,
+                ignore.context_for(node_path) if ignore is not None else None,
+            )[0]
+            node.parent.children[node.parent.children.index(node)] = fresh
+
+    relisted = 0
+    for (node, node_path), mtime in zip(dirs, mtimes):
+        # Vanished directories are dropped when their parent is re-listed
+        if mtime is None or mtime == node.mtime:
+            continue
+        relisted += 1
+        for new_dir in _relist(node, node_path, mtime, ignore, expand_archives):
+            subtree = scan_directory(
+                os.path.join(node_path, new_dir.name), max_workers=max_workers, ignore=ignore,
+                expand_archives=expand_archives,
+            )
+            for child in subtree.children:
+                child.parent = new_dir
+            new_dir.children = subtree.children
+            new_dir.mtime = subtree.mtime
+    return root, relisted
+
+
+def scan_with_cache(
+    path: str,
+    progress_callback: Callable[[int, int], None] = None,
+    max_workers: Optional[int] = None,
+    cache_dir: str = SCAN_CACHE_DIR,
+    ignore: Optional[IgnoreFilter] = None,
+    expand_archives: bool = False,
+) -> FileNode:
+    """scan_directory backed by the on-disk cache for path.
+
+    Edits to ignore files are only picked up for directories that are re-listed;
+    clear the cache after changing ignore rules. An archive as path is always
+    read from its member index, which is cheaper than validating a cache.
+    """
+    if is_archive_file(path):
+        return scan_directory(path, progress_callback, max_workers, ignore=ignore)
+    variant = "" if ignore is None else ("ignore" if ignore.use_gitignore else "defaults")
+    if expand_archives:
+        variant += "+archives"
+    root = load(path, cache_dir, variant)
+    if root is None:
+        metrics.count("scan_cache_misses")
+        root = scan_directory(path, progress_callback, max_workers, ignore=ignore, expand_archives=expand_archives)
+        save(root, cache_dir, variant)
+        return root
+    metrics.count("scan_cache_hits")
+
+    root, relisted = refresh(root, progress_callback, max_workers, ignore, expand_archives)
+    metrics.count("scan_cache_relisted_dirs", relisted)
+    logger.info(f"Loaded {path} from scan cache, re-listed {relisted} directories")
+    if relisted:
+        save(root, cache_dir, variant)
+    return root
@@ -0,0 +1,160 @@
+import re
+from array import array
+from fnmatch import translate
+from typing import Dict, Iterable, List, Optional
+from src.file_node import FileNode
+
+SUBSTRING = "substring"
+GLOB = "glob"
+REGEX = "regex"
+FUZZY = "fuzzy"
+SEARCH_MODES = (SUBSTRING, GLOB, REGEX, FUZZY)
+
+# Wildcards and bracket expressions ("]" may open the set as a literal); the
+# text between them must appear in every match
+_GLOB_WILDCARDS = re.compile(r"\[!?\]?[^\]]*\]|[*?]")
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Lower-cased name index with trigram posting lists.
+
+    Substring and glob queries intersect the posting lists of their literal
+    trigrams and only verify the surviving candidates; regex and fuzzy queries
+    run a compiled pattern over the flat name list.
+    """
+
+    def __init__(self):
+        self.nodes: List[FileNode] = []
+        self.names: List[str] = []
+        self.postings: Dict[str, array] = {}
+        self._last_query = None
+        self._last_ids: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def add(self, nodes: Iterable[FileNode]):
+        postings = self.postings
+        for node in nodes:
+            node_id = len(self.nodes)
+            name = node.name.lower()
+            self.nodes.append(node)
+            self.names.append(name)
+            for gram in _trigrams(name):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("I")
+                posting.append(node_id)
+        self._last_query = None
+
+    def add_tree(self, root: FileNode):
+        self.add([root])
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            self.add(node.children)
+            stack.extend(child for child in node.children if child.children)
+
+    def search(self, query: str, mode: str = SUBSTRING, limit: Optional[int] = None) -> List[FileNode]:
+        if not query:
+            return []
+        if mode == SUBSTRING:
+            ids = self._search_substring(query.lower())
+        elif mode == GLOB:
+            ids = self._search_glob(query)
+        elif mode == REGEX:
+            ids = self._search_regex(query)
+        elif mode == FUZZY:
+            return self._search_fuzzy(query.lower(), limit)
+        else:
+            raise ValueError(f"Unknown search mode: {mode}")
+        nodes = [self.nodes[i] for i in ids if self._is_live(self.nodes[i])]
+        return nodes[:limit] if limit else nodes
+
+    def _candidates(self, literals: Iterable[str]) -> Optional[List[int]]:
+        """Ids whose names contain every trigram of literals, or None if unconstrained."""
+        grams = set()
+        for literal in literals:
+            grams |= _trigrams(literal)
+        if not grams:
+            return None
+        postings = sorted((self.postings.get(g, ()) for g in grams), key=len)
+        if not postings[0]:
+            return []
+        ids = set(postings[0])
+        for posting in postings[1:]:
+            ids.intersection_update(posting)
+            if not ids:
+                break
+        return sorted(ids)
+
+    def _search_substring(self, query: str) -> List[int]:
+        # Search-as-you-type usually extends the previous query, so narrow its results
+        if self._last_query is not None and self._last_query in query:
+            candidates = self._last_ids
+        else:
+            candidates = self._candidates([query])
+        names = self.names
+        if candidates is None:
+            ids = [i for i, name in enumerate(names) if query in name]
+        else:
+            ids = [i for i in candidates if query in names[i]]
+        self._last_query, self._last_ids = query, ids
+        return ids
+
+    def _search_glob(self, pattern: str) -> List[int]:
+        # Only the last path segment is indexed; patterns with "/" match the
+        # name against that segment and the full relative path afterwards
+        path_pattern = None
+        if "/" in pattern:
+            path_pattern = re.compile(translate(pattern.lower()))
+            pattern = pattern.rsplit("/", 1)[1] or "*"
+        name_pattern = re.compile(translate(pattern.lower()))
+        candidates = self._candidates([part for part in _GLOB_WILDCARDS.split(pattern.lower()) if part])
+        ids = self._match_ids(name_pattern.match, candidates)
+        if path_pattern is None:
+            return ids
+        root = self.nodes[0]
+        return [i for i in ids if path_pattern.match(self._relative_path(self.nodes[i], root))]
+
+    def _search_regex(self, pattern: str) -> List[int]:
+        return self._match_ids(re.compile(pattern, re.IGNORECASE).search, None)
+
+    def _search_fuzzy(self, query: str, limit: Optional[int]) -> List[FileNode]:
+        # Characters in order with anything between; shorter spans rank first
+        pattern = re.compile(".*?".join(re.escape(c) for c in query))
+        scored = []
+        for i, name in enumerate(self.names):
+            match = pattern.search(name)
+            if match and self._is_live(self.nodes[i]):
+                span = match.end() - match.start()
+                scored.append((span, len(name), i))
+        scored.sort()
+        if limit:
+            scored = scored[:limit]
+        return [self.nodes[i] for _, _, i in scored]
+
+    def _is_live(self, node: FileNode) -> bool:
+        # Nodes removed from the tree stay in the index; removal detaches them
+        # (parent = None), so they no longer lead back to the indexed root
+        while node.parent is not None:
+            node = node.parent
+        return node is self.nodes[0]
+
+    def _match_ids(self, matcher, candidates: Optional[List[int]]) -> List[int]:
+        names = self.names
+        if candidates is None:
+            return [i for i, name in enumerate(names) if matcher(name)]
+        return [i for i in candidates if matcher(names[i])]
+
+    @staticmethod
+    def _relative_path(node: FileNode, root: FileNode) -> str:
+        parts = []
+        while node is not None and node is not root:
+            parts.append(node.name.lower())
+            node = node.parent
+        return "/".join(reversed(parts))
@@ -0,0 +1,143 @@
+import os
+from typing import Iterable, Iterator, List
+from src.file_node import FileNode
+
+CHECKED = "checked"
+PARTIAL = "partial"
+UNCHECKED = "unchecked"
+
+
+class SelectionModel:
+    """Tri-state check state for a FileNode tree.
+
+    Every node tracks how many selectable leaves (files and empty folders) its
+    subtree holds and how many of them are checked, so a folder's state is
+    derived from two integers instead of from its children's widgets.
+    """
+
+    def __init__(self, root: FileNode, checked: bool = True):
+        self.root = root
+        self._init_counts(root, checked)
+
+    @staticmethod
+    def _init_counts(root: FileNode, checked: bool):
+        # Post-order pass so every child is counted before its parent
+        order = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children)
+        for node in reversed(order):
+            if node.children:
+                node.leaf_count = sum(child.leaf_count for child in node.children)
+            else:
+                node.leaf_count = 1
+            node.checked_count = node.leaf_count if checked else 0
+
+    @staticmethod
+    def state(node: FileNode) -> str:
+        if node.checked_count == 0:
+            return UNCHECKED
+        if node.checked_count == node.leaf_count:
+            return CHECKED
+        return PARTIAL
+
+    def is_checked(self, node: FileNode) -> bool:
+        return node.checked_count == node.leaf_count
+
+    def children_changed(self, node: FileNode, added: List[FileNode], checked: bool):
+        """Recount node after children were added or removed in place.
+
+        New subtrees take the given check state; existing children keep theirs.
+        """
+        for child in added:
+            self._init_counts(child, checked)
+        old_leaves, old_checked = node.leaf_count, node.checked_count
+        if node.children:
+            node.leaf_count = sum(child.leaf_count for child in node.children)
+            node.checked_count = sum(child.checked_count for child in node.children)
+        else:
+            node.leaf_count = 1
+            node.checked_count = 1 if checked else 0
+        leaf_delta = node.leaf_count - old_leaves
+        checked_delta = node.checked_count - old_checked
+        parent = node.parent
+        while parent is not None:
+            parent.leaf_count += leaf_delta
+            parent.checked_count += checked_delta
+            parent = parent.parent
+
+    def copy_state(self, source: FileNode, target: FileNode):
+        """Give target the check state of source, matching descendants by name."""
+        stack = [(source, target)]
+        while stack:
+            old, new = stack.pop()
+            if old.checked_count == 0 or old.checked_count == old.leaf_count:
+                self.set_checked(new, old.checked_count != 0)
+                continue
+            old_children = {child.name: child for child in old.children}
+            for child in new.children:
+                match = old_children.get(child.name)
+                if match is not None:
+                    stack.append((match, child))
+                else:
+                    self.set_checked(child, False)
+
+    def toggle(self, node: FileNode) -> str:
+        """Check node's subtree unless it is fully checked, in which case uncheck it."""
+        self.set_checked(node, self.state(node) != CHECKED)
+        return self.state(node)
+
+    def set_checked(self, node: FileNode, checked: bool):
+        delta = (node.leaf_count if checked else 0) - node.checked_count
+        if delta == 0:
+            return
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            target = current.leaf_count if checked else 0
+            # Counts are consistent, so a subtree already at the target is left alone
+            if current.checked_count != target:
+                current.checked_count = target
+                stack.extend(current.children)
+        self._propagate(node.parent, delta)
+
+    def select_only(self, nodes: Iterable[FileNode]):
+        """Check exactly the given nodes' subtrees and nothing else."""
+        self.set_checked(self.root, False)
+        for node in nodes:
+            self.set_checked(node, True)
+
+    def _propagate(self, node: FileNode, delta: int):
+        while node is not None:
+            node.checked_count += delta
+            node = node.parent
+
+    def selected_paths(self) -> List[str]:
+        """Paths of fully checked nodes in tree order, skipping unchecked subtrees."""
+        return list(self.iter_selected(self.root))
+
+    def selected_nodes(self) -> List[FileNode]:
+        """Fully checked nodes in tree order, like selected_paths()."""
+        nodes = []
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            if current.checked_count == 0:
+                continue
+            if current.checked_count == current.leaf_count:
+                nodes.append(current)
+            stack.extend(reversed(current.children))
+        return nodes
+
+    def iter_selected(self, node: FileNode) -> Iterator[str]:
+        stack = [(node, node.path)]
+        while stack:
+            current, current_path = stack.pop()
+            if current.checked_count == 0:
+                continue
+            if current.checked_count == current.leaf_count:
+                yield current_path
+            for child in reversed(current.children):
+                stack.append((child, os.path.join(current_path, child.name)))
@@ -0,0 +1,243 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+from src.file_node import FileNode
+from src.archives import ArchiveNode
+from src.file_utils import evict_lru
+from src.tokens import SKIPPED, count_batch, estimate_text_tokens
+from src.extraction import SEPARATOR
+from src.instrumentation import metrics
+from src.jobs import process_pool
+from src.logger import logger
+from src.config import (
+    TOKEN_CACHE_DIR, TOKEN_CACHE_MAX_BYTES, TOKEN_CACHE_MAX_ENTRIES, TOKEN_COUNT_BATCH_SIZE,
+)
+
+SMALLEST = "smallest"
+RECENT = "recent"
+BUDGET_ORDERS = (SMALLEST, RECENT)
+
+
+def _cache_path(root_path: str, cache_dir: str) -> str:
+    key = hashlib.sha1(os.path.abspath(root_path).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{key}.tokens")
+
+
+def _load_cache(path: str) -> dict:
+    try:
+        with open(path, "rb") as f:
+            cache = pickle.load(f)
+        os.utime(path)  # Recency for LRU eviction
+        return cache
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Ignoring unreadable token cache {path}: {str(e)}")
+        return {}
+
+
+def _save_cache(path: str, cache: dict, cache_dir: str):
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        evict_lru(cache_dir, ".tokens", TOKEN_CACHE_MAX_BYTES, TOKEN_CACHE_MAX_ENTRIES)
+    except Exception as e:
+        logger.error(f"Failed to write token cache {path}: {str(e)}")
+
+
+def _stat_files(paths: List[str]) -> List[Optional[Tuple[int, float]]]:
+    stats = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stats.append((st.st_size, st.st_mtime))
+        except OSError:
+            stats.append(None)
+    return stats
+
+
+def _refresh_stats(files: List[Tuple[FileNode, str]], root_path: str, max_workers: Optional[int]):
+    """Bring the nodes' size and mtime up to date with the files on disk.
+
+    Trees from the scan cache only re-check directory mtimes, so files edited
+    in place still carry the stats they were scanned with. Changed nodes lose
+    their cached classification and estimate, as in watcher.apply_delta.
+    """
+    # Archive members are re-read with their archive; deleted files (git deltas) keep their node
+    disk = [(node, rel_path) for node, rel_path in files if not isinstance(node, ArchiveNode)]
+    paths = [os.path.join(root_path, rel_path) for _, rel_path in disk]
+    chunks = [paths[i:i + TOKEN_COUNT_BATCH_SIZE] for i in range(0, len(paths), TOKEN_COUNT_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        stats = [st for chunk in executor.map(_stat_files, chunks) for st in chunk]
+    for (node, _), st in zip(disk, stats):
+        if st is not None and st != (node.size, node.mtime):
+            node.size, node.mtime = st
+            node.kind = None
+            node.tokens = None
+
+
+def iter_files(root: FileNode) -> Iterable[Tuple[FileNode, str]]:
+    """(file node, path relative to root) in tree order."""
+    stack = [(root, "")]
+    while stack:
+        node, rel_path = stack.pop()
+        if node.is_dir:
+            prefix = rel_path + "/" if rel_path else ""
+            stack.extend((child, prefix + child.name) for child in reversed(node.children))
+        else:
+            yield node, rel_path
+
+
+def count_tokens(
+    root: FileNode,
+    progress_callback: Callable[[int, int], None] = None,
+    max_workers: Optional[int] = None,
+    cancel_event: Optional[threading.Event] = None,
+    cache_dir: str = TOKEN_CACHE_DIR,
+    partial: bool = False,
+) -> int:
+    """Fill in FileNode.tokens for every file under root and roll the totals up.
+
+    Estimates are cached on disk per root, keyed by relative path and checked
+    against each file's current size and mtime, so only new or changed files
+    are read. A partial tree (such as the changed files from src.git_delta)
+    or a cancelled run adds to the cache instead of replacing it. Returns the number of files
+    that had to be counted.
+    """
+    start = time.perf_counter()
+    cache_file = _cache_path(root.path, cache_dir)
+    cached = _load_cache(cache_file)
+    root_path = root.path
+    files = list(iter_files(root))
+    _refresh_stats(files, root_path, max_workers)
+    pending = []
+    for node, rel_path in files:
+        entry = cached.get(rel_path)
+        if entry is not None and entry[0] == node.size and entry[1] == node.mtime:
+            node.tokens = entry[2]
+        elif node.tokens is None:
+            pending.append((node, rel_path))
+
+    if pending:
+        batches = [pending[i:i + TOKEN_COUNT_BATCH_SIZE] for i in range(0, len(pending), TOKEN_COUNT_BATCH_SIZE)]
+        done = 0
+        # Counting is a regex pass over every byte, so it runs in processes
+        executor = process_pool(max_workers)
+        try:
+            futures = {
+                executor.submit(count_batch, [os.path.join(root_path, rel) for _, rel in batch]): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                batch = futures[future]
+                for (node, _), tokens in zip(batch, future.result()):
+                    node.tokens = tokens
+                done += len(batch)
+                if progress_callback:
+                    progress_callback(done, len(pending))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    rollup_tokens(root)
+    fresh = {
+        rel_path: (node.size, node.mtime, node.tokens)
+        for node, rel_path in iter_files(root) if node.tokens is not None
+    }
+    metrics.count("token_cache_hits", len(fresh) - len(pending))
+    if partial or (cancel_event is not None and cancel_event.is_set()):
+        # Entries this run did not get to are kept for the next one
+        fresh = {**cached, **fresh}
+    if fresh != cached:
+        _save_cache(cache_file, fresh, cache_dir)
+    metrics.record("tokens", time.perf_counter() - start, files=len(pending))
+    logger.info(f"Token estimates for {root_path}: {len(pending)} files counted, {root.tokens} tokens")
+    return len(pending)
+
+
+def rollup_tokens(root: FileNode):
+    """Set each directory's tokens to the sum over the files below it."""
+    order = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.is_dir:
+            order.append(node)
+            stack.extend(node.children)
+    # Reverse pre-order visits every directory after its subdirectories
+    for node in reversed(order):
+        node.tokens = sum(c.tokens for c in node.children if c.tokens is not None and c.tokens > 0)
+
+
+def update_rollup(node: FileNode):
+    """Recompute the totals of node and its ancestors after node's children changed."""
+    while node is not None:
+        if node.is_dir:
+            node.tokens = sum(c.tokens for c in node.children if c.tokens is not None and c.tokens > 0)
+        node = node.parent
+
+
+def selected_tokens(selection_model) -> int:
+    """Estimated tokens of the checked files, using directory totals where fully checked."""
+    total = 0
+    stack = [selection_model.root]
+    while stack:
+        node = stack.pop()
+        if node.checked_count == 0:
+            continue
+        if node.checked_count == node.leaf_count:
+            if node.tokens is not None and node.tokens > 0:
+                total += node.tokens
+        else:
+            stack.extend(node.children)
+    return total
+
+
+def entry_overhead(rel_path: str) -> int:
+    """Tokens extraction adds around a file's content (header and spacing)."""
+    return estimate_text_tokens(f"File: {rel_path}\n{SEPARATOR}\n\n\n")
+
+
+def pack_budget(
+    candidates: Sequence[Tuple[FileNode, str]],
+    budget: int,
+    preferred: Iterable[FileNode] = (),
+    order: str = SMALLEST,
+) -> Tuple[List[FileNode], int]:
+    """Choose files from candidates ((node, relative path) in tree order) that fit budget.
+
+    Preferred files are taken first, then the rest; within each group files
+    go smallest first or most recently modified first. Only the cached estimates are consulted, so files
+    left out are never read. Returns the chosen nodes in tree order and their
+    estimated total including per-file headers.
+    """
+    preferred_ids = {id(node) for node in preferred}
+    usable = [
+        (position, node, rel_path) for position, (node, rel_path) in enumerate(candidates)
+        if node.tokens is not None and node.tokens != SKIPPED
+    ]
+    first = [c for c in usable if id(c[1]) in preferred_ids]
+    rest = [c for c in usable if id(c[1]) not in preferred_ids]
+    for group in (first, rest):
+        if order == RECENT:
+            group.sort(key=lambda c: -c[1].mtime)
+        else:
+            group.sort(key=lambda c: c[1].tokens)
+
+    chosen = []
+    used = 0
+    for position, node, rel_path in first + rest:
+        cost = node.tokens + entry_overhead(rel_path)
+        if used + cost <= budget:
+            chosen.append((position, node))
+            used += cost
+    chosen.sort(key=lambda c: c[0])
+    return [node for _, node in chosen], used
@@ -0,0 +1,56 @@
+import re
+from typing import List, Sequence
+from src.classifier import DEFAULT_CLASSIFIER, NOT_CODE, DOCUMENT, TEXT
+from src.extractors import REGISTRY
+from src import archives
+from src.sampling import policy_for, read_sample
+
+SKIPPED = -1  # token count of files whose content is not extracted
+
+# Approximates BPE tokenizers without depending on one: short runs of letters,
+# digits or non-ASCII bytes and single punctuation marks each count as a token.
+_TOKEN_PATTERN = re.compile(rb"[A-Za-z]{1,4}|[0-9]{1,3}|[\x80-\xff]{1,3}|[^\sA-Za-z0-9\x80-\xff]")
+
+
+def estimate_tokens(data: bytes) -> int:
+    # subn counts without materialising a list of matches
+    return _TOKEN_PATTERN.subn(b"", data)[1]
+
+
+def estimate_text_tokens(text: str) -> int:
+    return estimate_tokens(text.encode("utf-8"))
+
+
+def count_file_tokens(path: str) -> int:
+    """Estimated tokens of the content extraction would write for path, or SKIPPED."""
+    kind = DEFAULT_CLASSIFIER.classify_name(path)
+    if kind == NOT_CODE:
+        return SKIPPED
+    try:
+        if kind == DOCUMENT:
+            extractor = REGISTRY.lookup(path)
+            size = archives.signature(path)[0]
+            if extractor.too_large(size):
+                return SKIPPED
+            if extractor.bytes_per_token:
+                # Parsing is far too slow for an estimate; the text is sized from the file
+                return size // extractor.bytes_per_token
+            return estimate_text_tokens(extractor.extract(path))
+        size = archives.signature(path)[0]
+        policy = policy_for(path, size)
+        if policy is not None:
+            sample = read_sample(path, policy)
+            if sample is not None:
+                return estimate_text_tokens(sample)
+        with archives.open_file(path) as file:
+            if DEFAULT_CLASSIFIER.classify_open(file, size)[0] != TEXT:
+                return SKIPPED
+            file.seek(0)
+            return estimate_tokens(file.read())
+    except Exception:
+        # Unreadable files, and documents their backend cannot parse
+        return SKIPPED
+
+
+def count_batch(paths: Sequence[str]) -> List[int]:
+    return [count_file_tokens(path) for path in paths]
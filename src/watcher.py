@@ -0,0 +1,358 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from src.file_node import FileNode
+from src.file_utils import scan_directory, expand_archive
+from src.archives import is_archive_name
+from src.ignore import IgnoreFilter
+from src.logger import logger
+from src.config import WATCH_COALESCE_SECONDS, WATCH_MAX_DELAY_SECONDS, WATCH_POLL_INTERVAL_SECONDS
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class DirectoryWatcher:
+    """Reports directories whose contents changed, coalescing bursts of events.
+
+    Uses inotify on Linux and falls back to polling directory mtimes elsewhere,
+    or when the inotify watch limit is reached. on_change is called from the
+    watcher thread with a set of directory paths.
+    """
+
+    def __init__(
+        self,
+        dir_paths: Iterable[str],
+        on_change: Callable[[Set[str]], None],
+        coalesce: float = WATCH_COALESCE_SECONDS,
+        poll_interval: float = WATCH_POLL_INTERVAL_SECONDS,
+        use_inotify: bool = True,
+    ):
+        self.on_change = on_change
+        self.coalesce = coalesce
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._dirty: Set[str] = set()
+        self._first_event = 0.0
+        self._last_event = 0.0
+        self._thread = None
+        self._fd = -1
+        self._libc = _load_inotify() if use_inotify else None
+        self._paths_by_wd: Dict[int, str] = {}
+        self._mtimes: Dict[str, Optional[float]] = {}
+        self.backend = "poll"
+
+        dir_paths = list(dir_paths)
+        if self._libc is not None and self._start_inotify(dir_paths):
+            self.backend = "inotify"
+        else:
+            for path in dir_paths:
+                self._mtimes[path] = self._stat_mtime(path)
+
+    def start(self):
+        target = self._run_inotify if self.backend == "inotify" else self._run_poll
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.watch_count} directories ({self.backend})")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    @property
+    def watch_count(self) -> int:
+        return len(self._paths_by_wd) if self.backend == "inotify" else len(self._mtimes)
+
+    def add_directories(self, dir_paths: Iterable[str]):
+        with self._lock:
+            for path in dir_paths:
+                if self.backend == "inotify":
+                    self._add_watch(path)
+                else:
+                    self._mtimes[path] = self._stat_mtime(path)
+
+    def _mark_dirty(self, path: str):
+        now = time.monotonic()
+        with self._lock:
+            if not self._dirty:
+                self._first_event = now
+            self._dirty.add(path)
+            self._last_event = now
+
+    def _flush(self, force: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            if not self._dirty:
+                return
+            quiet = now - self._last_event >= self.coalesce
+            overdue = now - self._first_event >= WATCH_MAX_DELAY_SECONDS
+            if not (force or quiet or overdue):
+                return
+            dirty, self._dirty = self._dirty, set()
+        try:
+            self.on_change(dirty)
+        except Exception as e:
+            logger.error(f"Error handling file system changes: {str(e)}")
+
+    # inotify backend
+
+    def _start_inotify(self, dir_paths: List[str]) -> bool:
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            return False
+        for path in dir_paths:
+            if not self._add_watch(path):
+                logger.info("inotify watch limit reached, falling back to polling")
+                os.close(self._fd)
+                self._fd = -1
+                self._paths_by_wd.clear()
+                return False
+        return True
+
+    def _add_watch(self, path: str) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            # Directories that vanished or became unreadable are simply not watched
+            return err != errno.ENOSPC
+        self._paths_by_wd[wd] = path
+        return True
+
+    def _run_inotify(self):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd], [], [], min(self.coalesce, 0.5))
+            if ready:
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    data = b""
+                self._handle_events(data)
+            self._flush()
+
+    def _handle_events(self, data: bytes):
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; every watched directory may be stale
+                for path in list(self._paths_by_wd.values()):
+                    self._mark_dirty(path)
+                continue
+            path = self._paths_by_wd.get(wd)
+            if path is None:
+                continue
+            if mask & IN_IGNORED:
+                with self._lock:
+                    self._paths_by_wd.pop(wd, None)
+                continue
+            if mask & IN_DELETE_SELF:
+                self._mark_dirty(os.path.dirname(path))
+                continue
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # Watch new directories right away so their first writes are seen
+                with self._lock:
+                    self._add_watch(os.path.join(path, os.fsdecode(name)))
+            self._mark_dirty(path)
+
+    # Polling backend
+
+    @staticmethod
+    def _stat_mtime(path: str) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _run_poll(self):
+        while not self._stop.wait(self.poll_interval):
+            with self._lock:
+                snapshot = list(self._mtimes.items())
+            for path, mtime in snapshot:
+                current = self._stat_mtime(path)
+                if current == mtime:
+                    continue
+                with self._lock:
+                    if current is None:
+                        self._mtimes.pop(path, None)
+                    else:
+                        self._mtimes[path] = current
+                self._mark_dirty(os.path.dirname(path) if current is None else path)
+            # The poll interval already batches events
+            self._flush(force=True)
+
+
+class DirectoryDelta:
+    def __init__(self, node: FileNode):
+        self.node = node
+        self.added: List[FileNode] = []
+        self.removed: List[FileNode] = []
+        self.updated: Dict[FileNode, Tuple[int, float]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.updated)
+
+
+class ChangeBatches:
+    """Lets one batch of changed directories at a time be turned into deltas.
+
+    A delta computed from a snapshot taken before the running batch's delta
+    is applied would add the same new entries twice, so paths that arrive in
+    the meantime are held until finish() hands them back.
+    """
+
+    def __init__(self):
+        self.running = False
+        self._held: Set[str] = set()
+
+    def hold(self, paths: Iterable[str]) -> bool:
+        """Hold paths if a batch is running; False when they can be listed now."""
+        if not self.running:
+            return False
+        self._held.update(paths)
+        return True
+
+    def finish(self) -> Set[str]:
+        """Mark the running batch applied and return the paths held meanwhile."""
+        self.running = False
+        paths, self._held = self._held, set()
+        return paths
+
+
+def compute_delta(node: FileNode, node_path: str, existing: Dict[str, FileNode],
+                  ignore: Optional[IgnoreFilter] = None, expand_archives: bool = False) -> DirectoryDelta:
+    """Compare a fresh listing of node_path with a snapshot of node's children.
+
+    Runs off the UI thread: new nodes are created with node as their parent
+    but are not attached, and new directories are scanned in full. Entries
+    that are ignored now count as removed. With expand_archives, a changed
+    archive is replaced by a fresh virtual directory.
+    """
+    delta = DirectoryDelta(node)
+    seen = set()
+    context = ignore.listing_context(node_path) if ignore is not None else None
+    try:
+        with os.scandir(node_path) as entries:
+            for entry in entries:
+                if context is not None and context.is_ignored(entry.name, entry.is_dir()):
+                    continue
+                fresh = FileNode.from_entry(entry, node)
+                old = existing.get(entry.name)
+                seen.add(entry.name)
+                if expand_archives and not fresh.is_dir and is_archive_name(entry.name):
+                    # Unchanged archives, and unreadable ones left as plain files, stay as they are
+                    if old is not None and not old.is_listable and (old.size, old.mtime) == (fresh.size, fresh.mtime):
+                        continue
+                    if old is not None:
+                        delta.removed.append(old)
+                    delta.added.append(expand_archive(
+                        fresh, entry.path, context.descend(fresh.name) if context is not None else None
+                    )[0])
+                    continue
+                if old is not None and old.is_dir == fresh.is_dir and old.is_listable == fresh.is_listable:
+                    if not old.is_dir and (old.size, old.mtime) != (fresh.size, fresh.mtime):
+                        delta.updated[old] = (fresh.size, fresh.mtime)
+                    continue
+                if old is not None:
+                    # A file replaced by a directory or the other way round
+                    delta.removed.append(old)
+                if fresh.is_listable:
+                    subtree = scan_directory(
+                        os.path.join(node_path, entry.name), ignore=ignore, expand_archives=expand_archives
+                    )
+                    for child in subtree.children:
+                        child.parent = fresh
+                    fresh.children = subtree.children
+                delta.added.append(fresh)
+    except FileNotFoundError:
+        # The directory itself is gone; its parent's delta removes it
+        return DirectoryDelta(node)
+    except Exception as e:
+        logger.error(f"Error listing changed directory {node_path}: {str(e)}")
+        return DirectoryDelta(node)
+    delta.removed.extend(old for name, old in existing.items() if name not in seen)
+    return delta
+
+
+def apply_delta(delta: DirectoryDelta, selection_model=None):
+    """Apply a delta to the FileNode tree (and selection counts) on the UI thread."""
+    node = delta.node
+    for child, (size, mtime) in delta.updated.items():
+        child.size, child.mtime = size, mtime
+        child.kind = None
+        child.tokens = None
+    if not delta.added and not delta.removed:
+        return
+    inherit_checked = selection_model is not None and selection_model.is_checked(node)
+    if delta.removed:
+        removed = set(map(id, delta.removed))
+        node.children = [c for c in node.children if id(c) not in removed]
+        for child in delta.removed:
+            child.parent = None
+    node.children.extend(delta.added)
+    if selection_model is not None:
+        selection_model.children_changed(node, delta.added, inherit_checked)
+        # A removal and an addition of the same kind, size and mtime within one
+        # directory is a rename; keep the user's selection across it
+        renamed = {(c.is_dir, c.size, c.mtime): c for c in delta.removed}
+        for child in delta.added:
+            old = renamed.pop((child.is_dir, child.size, child.mtime), None)
+            if old is not None:
+                selection_model.copy_state(old, child)
+
+
+def iter_listable_dirs(node: FileNode) -> Iterable[str]:
+    if not node.is_listable:
+        # An archive opened as the root: nothing on disk to watch
+        return
+    stack = [(node, node.path)]
+    while stack:
+        current, current_path = stack.pop()
+        yield current_path
+        for child in current.children:
+            if child.is_listable:
+                stack.append((child, os.path.join(current_path, child.name)))
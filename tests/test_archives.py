@@ -0,0 +1,100 @@
+import io
+import os
+import tarfile
+import zipfile
+import pytest
+from src import archives
+from src.archives import ArchiveNode
+from src.extraction import build_entry
+from src.file_utils import scan_directory
+
+MEMBERS = {
+    "pkg/__init__.py": b"",
+    "pkg/module.py": b"def f():\n    return 1\n",
+    "pkg/data/big.txt": b"line\n" * 5000,
+    "README.md": "# Café\n".encode("utf-8"),
+}
+
+
+def _write_zip(path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in MEMBERS.items():
+            archive.writestr(name, data)
+        archive.writestr("../escape.py", b"x = 1\n")
+
+
+def _write_tar(path):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+        info = tarfile.TarInfo("../escape.py")
+        info.size = 6
+        archive.addfile(info, io.BytesIO(b"x = 1\n"))
+
+
+@pytest.fixture(params=["src.zip", "src.tar.gz"])
+def archive_path(request, tmp_path):
+    path = str(tmp_path / request.param)
+    (_write_zip if path.endswith(".zip") else _write_tar)(path)
+    yield path
+    archives.close_archives()
+
+
+def _files(node, found=None):
+    found = {} if found is None else found
+    for child in node.children:
+        if child.is_dir:
+            _files(child, found)
+        else:
+            found[child.path] = child
+    return found
+
+
+def test_locate():
+    assert archives.locate(__file__) is None
+
+
+def test_locate_member(archive_path):
+    member = os.path.join(archive_path, "pkg", "module.py")
+    assert archives.locate(member) == (archive_path, "pkg/module.py")
+    assert archives.locate(archive_path) == (archive_path, "")
+    assert archives.locate(os.path.dirname(archive_path)) is None
+
+
+def test_members_read_back_unchanged(archive_path):
+    root = scan_directory(archive_path)
+    files = _files(root)
+    expected = {os.path.join(archive_path, *name.split("/")): data for name, data in MEMBERS.items()}
+    # Names that would escape the archive are left out
+    assert sorted(files) == sorted(expected)
+    for path, data in expected.items():
+        node = files[path]
+        assert isinstance(node, ArchiveNode)
+        assert node.size == len(data)
+        assert archives.isfile(path) and not archives.isdir(path)
+        assert archives.signature(path)[0] == len(data)
+        with archives.open_file(path) as stream:
+            assert stream.read() == data
+        with archives.open_file(path, seekable=True) as stream:
+            stream.seek(len(data) // 2)
+            assert stream.read() == data[len(data) // 2:]
+    assert archives.isdir(os.path.join(archive_path, "pkg", "data"))
+    with pytest.raises(FileNotFoundError):
+        archives.signature(os.path.join(archive_path, "pkg", "missing.py"))
+
+
+def test_archives_inside_a_tree_are_expanded_on_request(archive_path):
+    folder = os.path.dirname(archive_path)
+    assert [child.is_dir for child in scan_directory(folder).children] == [False]
+    node = scan_directory(folder, expand_archives=True).children[0]
+    assert node.is_dir and node.path == archive_path
+    assert os.path.join(archive_path, "pkg", "module.py") in _files(node)
+
+
+def test_member_is_extracted_like_a_file(archive_path):
+    member = os.path.join(archive_path, "pkg", "module.py")
+    entry = build_entry(member, os.path.dirname(archive_path))
+    assert entry.startswith(f"File: {os.path.relpath(member, os.path.dirname(archive_path))}\n".encode("utf-8"))
+    assert MEMBERS["pkg/module.py"] in entry
@@ -0,0 +1,15 @@
+from src.content_search import SNIPPET_LENGTH, _search_buffer, compile_query
+
+
+def test_snippet_is_the_matching_line():
+    data = b"first\n  second needle here\nthird\n"
+    assert _search_buffer(data, compile_query("needle"), 10) == [(2, "second needle here")]
+
+
+def test_snippet_on_a_long_line_contains_the_match():
+    data = b"x" * 10000 + b" needle " + b"y" * 10000 + b"\nneedle at the start\n"
+    matches = _search_buffer(data, compile_query("needle"), 10)
+    assert [line_no for line_no, _ in matches] == [1, 2]
+    snippet = matches[0][1]
+    assert "needle" in snippet and len(snippet) <= SNIPPET_LENGTH
+    assert matches[1][1] == "needle at the start"
@@ -0,0 +1,54 @@
+import gzip
+import json
+from src.config import DEDUPE_MIN_BYTES
+from src.extraction import manifest_path, stream_extract
+
+SHARED = "def shared():\n    return 'the same body in several files'\n" * 4
+
+
+def _extract(tmp_path, files, **options):
+    root = tmp_path / "project"
+    root.mkdir()
+    paths = []
+    for name, content in files:
+        (root / name).write_text(content)
+        paths.append(str(root / name))
+    output_file = str(tmp_path / "bundle.txt")
+    stats = stream_extract(paths, str(root), output_file, max_workers=3, dedupe=True, **options)
+    with open(manifest_path(output_file), encoding="utf-8") as f:
+        records = {record["path"]: record for record in json.load(f)["files"]}
+    with open(stats.shard_files[0], "rb") as f:
+        data = f.read()
+    if stats.shard_files[0].endswith(".gz"):
+        data = gzip.decompress(data)
+    return stats, records, data.decode("utf-8")
+
+
+def test_later_copies_reference_the_first(tmp_path):
+    assert len(SHARED) >= DEDUPE_MIN_BYTES
+    stats, records, output = _extract(tmp_path, [
+        ("a.py", SHARED), ("b.py", "unique = 1\n" * 20), ("c.py", SHARED), ("d.py", SHARED),
+    ])
+    assert stats.duplicates == 2
+    assert "duplicate_of" not in records["a.py"]
+    assert "duplicate_of" not in records["b.py"]
+    assert records["c.py"]["duplicate_of"] == "a.py"
+    assert records["d.py"]["duplicate_of"] == "a.py"
+    assert output.count(SHARED) == 1
+    assert "Duplicate of: a.py (content omitted)" in output
+    assert stats.bytes_saved == 2 * (records["a.py"]["size"] - records["c.py"]["size"])
+
+
+def test_small_files_are_always_written(tmp_path):
+    small = "x = 1\n"
+    stats, records, output = _extract(tmp_path, [("a.py", small), ("b.py", small)])
+    assert stats.duplicates == 0
+    assert not any("duplicate_of" in record for record in records.values())
+    assert output.count(small) == 2
+
+
+def test_references_are_compressed_like_other_entries(tmp_path):
+    stats, records, output = _extract(tmp_path, [("a.py", SHARED), ("b.py", SHARED)], compression="gzip")
+    assert stats.duplicates == 1
+    assert records["b.py"]["duplicate_of"] == "a.py"
+    assert output.count(SHARED) == 1
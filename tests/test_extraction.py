@@ -0,0 +1,54 @@
+import json
+from src.classifier import FileClassifier, TEXT
+from src.extraction import build_entry, stream_extract
+from src.extractors import REGISTRY
+from src.file_utils import scan_directory
+from src.preview import load_preview
+from src.tokens import SKIPPED, count_file_tokens
+
+
+def test_file_grown_past_the_limit_after_classification_is_skipped(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_bytes(b"x = 1\n")
+    classifier = FileClassifier(max_size=1000)
+    node = scan_directory(str(tmp_path)).children[0]
+    assert b"x = 1" in build_entry(node, str(tmp_path), classifier=classifier)
+    assert node.kind == (TEXT, "utf-8")
+
+    path.write_bytes(b"x = 1\n" * 1000)
+    entry = build_entry(node, str(tmp_path), classifier=classifier)
+    assert b"exceeds the size limit" in entry
+
+
+def test_document_over_its_extractor_limit_is_not_parsed(tmp_path, monkeypatch):
+    path = tmp_path / "analysis.ipynb"
+    path.write_text(json.dumps({"cells": [{"cell_type": "code", "source": ["x = 1\n"]}] * 100}))
+    notebook = REGISTRY.get("notebook")
+    assert b"x = 1" in build_entry(str(path), str(tmp_path))
+    assert load_preview(str(path)).count("# %%") == notebook.preview_parts
+    assert count_file_tokens(str(path)) > 0
+
+    monkeypatch.setattr(notebook, "max_bytes", 100)
+    assert b"exceeds the size limit" in build_entry(str(path), str(tmp_path))
+    assert "exceeds the size limit" in load_preview(str(path))
+    assert count_file_tokens(str(path)) == SKIPPED
+
+
+def test_document_error_body_ends_its_line(tmp_path):
+    path = tmp_path / "broken.ipynb"
+    path.write_text("{not json")
+    entry = build_entry(str(path), str(tmp_path))
+    assert b"Error extracting notebook content: " in entry
+    # Like every other body it ends in a newline, so the next header starts on a line of its own
+    assert entry.endswith(b"\n\n\n")
+
+
+def test_output_lines_end_in_newline_only(tmp_path):
+    path = tmp_path / "windows.py"
+    path.write_bytes(b"a = 1\r\nb = 2\r\n")
+    output_file = str(tmp_path / "bundle.txt")
+    stream_extract([str(path)], str(tmp_path), output_file, max_workers=1, manifest=False)
+    with open(output_file, "rb") as f:
+        output = f.read()
+    assert b"a = 1\nb = 2\n" in output
+    assert b"\r" not in output
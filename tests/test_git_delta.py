@@ -0,0 +1,76 @@
+import os
+import subprocess
+import pytest
+from src.git_delta import ADDED, DELETED, MODIFIED, RENAMED, UNTRACKED, GitChanges, GitError
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        check=True, capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "staged.py").write_text("a = 1\n")
+    (tmp_path / "unstaged.py").write_text("b = 1\n")
+    (tmp_path / "old_name.py").write_text("def renamed():\n    return 'same content'\n" * 5)
+    (tmp_path / "deleted.py").write_text("c = 1\n")
+    (tmp_path / "untouched.py").write_text("d = 1\n")
+    (tmp_path / ".gitignore").write_text("*.log\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "initial")
+
+    (tmp_path / "staged.py").write_text("a = 2\n")
+    _git(tmp_path, "add", "staged.py")
+    (tmp_path / "unstaged.py").write_text("b = 2\n")
+    _git(tmp_path, "mv", "old_name.py", "new_name.py")
+    _git(tmp_path, "rm", "-q", "deleted.py")
+    (tmp_path / "untracked.py").write_text("e = 1\n")
+    (tmp_path / "ignored.log").write_text("noise\n")
+    return tmp_path
+
+
+def test_statuses(repo):
+    changes = GitChanges(str(repo))
+    statuses = {change.path: change.status for change in changes.changes.values()}
+    assert statuses == {
+        "staged.py": MODIFIED,
+        "unstaged.py": MODIFIED,
+        "new_name.py": RENAMED,
+        "deleted.py": DELETED,
+        "untracked.py": UNTRACKED,
+    }
+    assert changes.changes[os.path.join(str(repo), "new_name.py")].old_path == "old_name.py"
+    assert sorted(os.path.basename(path) for path in changes.deleted_paths()) == ["deleted.py"]
+
+
+def test_build_tree_and_diffs(repo):
+    changes = GitChanges(str(repo))
+    names = sorted(node.name for node in changes.build_tree().children)
+    assert names == ["new_name.py", "staged.py", "unstaged.py", "untracked.py"]
+    assert len(changes.build_tree(include_deleted=True).children) == 5
+    by_name = {change.path: change for change in changes.changes.values()}
+    assert "+a = 2" in by_name["staged.py"].diff()
+    assert "+b = 2" in by_name["unstaged.py"].diff()
+    assert "+e = 1" in by_name["untracked.py"].diff()
+    assert "-c = 1" in by_name["deleted.py"].diff()
+
+
+def test_unborn_head_compares_against_the_empty_tree(tmp_path):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "new.py").write_text("x = 1\n")
+    _git(tmp_path, "add", "new.py")
+    statuses = [change.status for change in GitChanges(str(tmp_path)).changes.values()]
+    assert statuses == [ADDED]
+
+
+def test_refs_that_look_like_options_are_rejected(repo, tmp_path):
+    target = tmp_path / "written_by_git"
+    with pytest.raises(GitError):
+        GitChanges(str(repo), f"--output={target}")
+    assert not target.exists()
+    with pytest.raises(GitError):
+        GitChanges(str(repo), "no-such-ref")
@@ -0,0 +1,73 @@
+import os
+from src.file_utils import scan_directory
+from src.ignore import IgnoreFilter, IgnoreRules
+
+
+def _paths(node, prefix=""):
+    paths = []
+    for child in node.children:
+        rel = prefix + child.name
+        paths.append(rel + "/" if child.is_dir else rel)
+        if child.is_dir:
+            paths.extend(_paths(child, rel + "/"))
+    return sorted(paths)
+
+
+def _write(root, files):
+    for rel, content in files.items():
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+
+def test_last_matching_rule_wins():
+    rules = IgnoreRules(["*.log", "!keep.log", "# comment", "", "build/"])
+    assert rules.match("debug.log", False) is True
+    assert rules.match("keep.log", False) is False
+    assert rules.match("logs/keep.log", False) is False
+    assert rules.match("build", True) is True
+    assert rules.match("build", False) is None
+    assert rules.match("main.py", False) is None
+
+
+def test_anchoring_and_double_star():
+    rules = IgnoreRules(["/only_root.txt", "docs/**/draft.md", "[Tt]emp?.py"])
+    assert rules.match("only_root.txt", False) is True
+    assert rules.match("sub/only_root.txt", False) is None
+    assert rules.match("docs/draft.md", False) is True
+    assert rules.match("docs/a/b/draft.md", False) is True
+    assert rules.match("temp1.py", False) is True
+    assert rules.match("Temp12.py", False) is None
+
+
+def test_scan_applies_nested_ignore_files_and_the_project_file(tmp_path):
+    _write(str(tmp_path), {
+        ".gitignore": "*.log\n!keep.log\nbuild/\n/only_root.txt\n",
+        ".codeextractorignore": "secret.py\n",
+        "main.py": "",
+        "debug.log": "",
+        "keep.log": "",
+        "only_root.txt": "",
+        "secret.py": "",
+        "build/out.py": "",
+        "node_modules/pkg/index.js": "",
+        "sub/.gitignore": "!debug.log\nlocal.py\n!secret.py\n",
+        "sub/debug.log": "",
+        "sub/other.log": "",
+        "sub/local.py": "",
+        "sub/only_root.txt": "",
+        "sub/secret.py": "",
+        "sub/deeper/local.py": "",
+    })
+    tree = scan_directory(str(tmp_path), ignore=IgnoreFilter(str(tmp_path)))
+    assert _paths(tree) == [
+        ".codeextractorignore", ".gitignore", "keep.log", "main.py",
+        "sub/", "sub/.gitignore", "sub/debug.log", "sub/deeper/", "sub/only_root.txt",
+    ]
+
+
+def test_gitignore_files_can_be_switched_off(tmp_path):
+    _write(str(tmp_path), {".gitignore": "*.log\n", "debug.log": "", "node_modules/x.js": ""})
+    tree = scan_directory(str(tmp_path), ignore=IgnoreFilter(str(tmp_path), use_gitignore=False))
+    assert _paths(tree) == [".gitignore", "debug.log"]
@@ -0,0 +1,114 @@
+import threading
+import pytest
+from src.jobs import HIGH, LOW, NORMAL, Cancelled, JobScheduler
+
+TIMEOUT = 5
+
+
+def _blocker(scheduler, key="blocker"):
+    """Occupy the scheduler's only worker until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def run(job):
+        started.set()
+        release.wait(TIMEOUT)
+
+    scheduler.submit(key, run)
+    assert started.wait(TIMEOUT)
+    return release
+
+
+def test_submitting_a_key_again_supersedes_the_previous_job():
+    scheduler = JobScheduler(workers=1)
+    release = _blocker(scheduler)
+    ran = []
+    first = scheduler.submit("scan", lambda job: ran.append("first"))
+    second = scheduler.submit("scan", lambda job: ran.append("second"))
+    scheduler.submit("done", lambda job: ran.append("done"), priority=LOW)
+    assert first.cancelled and not scheduler.is_current(first)
+    assert scheduler.is_current(second)
+    release.set()
+    _wait_for(lambda: "done" in ran)
+    # The superseded job was dropped from the queue without running
+    assert ran == ["second", "done"]
+
+
+def test_supersede_false_keeps_the_previous_job():
+    scheduler = JobScheduler(workers=1)
+    release = _blocker(scheduler)
+    ran = []
+    first = scheduler.submit("prefetch", lambda job: ran.append(1), supersede=False)
+    scheduler.submit("prefetch", lambda job: ran.append(2), supersede=False)
+    assert not first.cancelled
+    release.set()
+    _wait_for(lambda: len(ran) == 2)
+    assert ran == [1, 2]
+
+
+def test_higher_priority_runs_first():
+    scheduler = JobScheduler(workers=1)
+    release = _blocker(scheduler)
+    ran = []
+    for key, priority in (("low", LOW), ("normal", NORMAL), ("high", HIGH), ("high2", HIGH)):
+        scheduler.submit(key, lambda job: ran.append(job.key), priority=priority)
+    release.set()
+    _wait_for(lambda: len(ran) == 4)
+    assert ran == ["high", "high2", "normal", "low"]
+
+
+def test_cancel_stops_a_running_job_at_its_next_progress_report():
+    scheduler = JobScheduler(workers=2)
+    started, finished = threading.Event(), threading.Event()
+    outcome = []
+
+    def run(job):
+        started.set()
+        try:
+            while True:
+                job.progress(1, 10)
+                job.token.wait(0.01)
+        except Cancelled:
+            outcome.append("cancelled")
+            raise
+        finally:
+            finished.set()
+
+    job = scheduler.submit("count", run)
+    assert started.wait(TIMEOUT)
+    scheduler.cancel("count")
+    assert finished.wait(TIMEOUT)
+    assert outcome == ["cancelled"]
+    assert not scheduler.is_current(job)
+
+
+def test_progress_is_throttled_but_completion_always_reported():
+    reports = []
+    scheduler = JobScheduler(workers=1, on_progress=lambda job, progress: reports.append(progress))
+    finished = threading.Event()
+
+    def run(job):
+        for done in range(1, 101):
+            job.progress(done, 100)
+        finished.set()
+
+    scheduler.submit("work", run)
+    assert finished.wait(TIMEOUT)
+    assert 1 <= len(reports) < 100
+    assert (reports[-1].done, reports[-1].fraction) == (100, 1.0)
+
+
+def test_failing_job_does_not_stop_the_worker():
+    scheduler = JobScheduler(workers=1)
+    ran = threading.Event()
+    scheduler.submit("broken", lambda job: 1 / 0)
+    scheduler.submit("next", lambda job: ran.set())
+    assert ran.wait(TIMEOUT)
+
+
+def _wait_for(condition):
+    done = threading.Event()
+    for _ in range(TIMEOUT * 100):
+        if condition():
+            return
+        done.wait(0.01)
+    pytest.fail("timed out waiting for jobs")
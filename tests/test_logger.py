@@ -0,0 +1,15 @@
+import logging
+from src.logger import parse_level
+
+
+def test_names_and_numbers_are_accepted():
+    assert parse_level("debug") == logging.DEBUG
+    assert parse_level(" WARNING ") == logging.WARNING
+    assert parse_level("10") == 10
+    assert parse_level("15") == 15
+
+
+def test_unknown_levels_fall_back_to_info(capsys):
+    assert parse_level("verbose") == logging.INFO
+    assert parse_level("-5") == logging.INFO
+    assert "verbose" in capsys.readouterr().err
@@ -0,0 +1,70 @@
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import pytest
+from src.extraction import manifest_path, stream_extract
+from src.output_writer import GZIP, XZ, shard_path
+
+DECOMPRESS = {None: lambda data: data, GZIP: gzip.decompress, XZ: lzma.decompress}
+
+
+def _tree(tmp_path, count=12):
+    root = tmp_path / "project"
+    root.mkdir()
+    paths = []
+    for i in range(count):
+        path = root / f"module_{i:02d}.py"
+        path.write_text(f"def function_{i}():\n    return {i}\n" * (i + 1))
+        paths.append(str(path))
+    return str(root), paths
+
+
+def test_shard_path():
+    assert shard_path("out/bundle.txt", None) == "out/bundle.txt"
+    assert shard_path("out/bundle.txt", 2) == "out/bundle.002.txt"
+    assert shard_path("out/bundle.txt.gz", 0, GZIP) == "out/bundle.000.txt.gz"
+    assert shard_path("out/bundle.txt", None, XZ) == "out/bundle.txt.xz"
+
+
+@pytest.mark.parametrize("compression", [None, GZIP, XZ])
+def test_manifest_offsets_read_back_every_entry(tmp_path, compression):
+    root, paths = _tree(tmp_path)
+    output_file = str(tmp_path / "bundle.txt")
+    stats = stream_extract(paths, root, output_file, max_workers=2, shard_bytes=400, compression=compression)
+
+    with open(manifest_path(output_file), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["compression"] == compression
+    assert len(manifest["shards"]) > 1
+    assert [os.path.basename(path) for path in stats.shard_files] == [shard["path"] for shard in manifest["shards"]]
+    assert [record["path"] for record in manifest["files"]] == [os.path.basename(path) for path in paths]
+
+    shards = []
+    for shard in manifest["shards"]:
+        with open(os.path.join(str(tmp_path), shard["path"]), "rb") as f:
+            shards.append(f.read())
+        assert len(shards[-1]) == shard["bytes"]
+        # Shards roll over before the cap unless one entry fills a shard alone
+        assert shard["bytes"] <= 400 or shard["entries"] == 1
+    for record in manifest["files"]:
+        data = shards[record["shard"]][record["offset"]:record["offset"] + record["length"]]
+        content = DECOMPRESS[compression](data)
+        assert len(content) == record["size"]
+        assert hashlib.sha256(content).hexdigest() == record["sha256"]
+        assert content.startswith(f"File: {record['path']}\n".encode("utf-8"))
+
+    # Entries are complete gzip members / xz streams, so a whole shard decompresses too
+    first = DECOMPRESS[compression](shards[0])
+    assert first.count(b"File: ") == manifest["shards"][0]["entries"]
+
+
+def test_unsharded_output_without_manifest(tmp_path):
+    root, paths = _tree(tmp_path, 3)
+    output_file = str(tmp_path / "bundle.txt")
+    stats = stream_extract(paths, root, output_file, max_workers=1, manifest=False)
+    assert stats.shard_files == [output_file]
+    assert not os.path.exists(manifest_path(output_file))
+    with open(output_file, "rb") as f:
+        assert f.read().count(b"File: ") == 3
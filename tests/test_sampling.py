@@ -0,0 +1,58 @@
+from src.extraction import build_entry
+from src.file_utils import scan_directory
+from src.sampling import SamplePolicy, policy_for, read_sample
+from src.config import SAMPLE_MIN_BYTES
+
+DATA = b"a\nb\nc\nd\ne\nf\n"
+
+
+def _lines(data, ranges):
+    return [data[start:end] for start, end in ranges]
+
+
+def test_head_and_tail():
+    assert _lines(DATA, SamplePolicy("head", 2).ranges(DATA, 100)) == [b"a\nb\n"]
+    assert _lines(DATA, SamplePolicy("tail", 2).ranges(DATA, 100)) == [b"e\nf\n"]
+    assert _lines(b"a\nb\nc", SamplePolicy("tail", 2).ranges(b"a\nb\nc", 100)) == [b"b\nc"]
+
+
+def test_head_tail_merges_when_the_ends_meet():
+    assert SamplePolicy("head+tail", 2).ranges(DATA, 100) == [(0, 4), (8, 12)]
+    assert SamplePolicy("head+tail", 3).ranges(DATA, 100) == [(0, 12)]
+
+
+def test_stride_takes_whole_lines():
+    assert _lines(DATA, SamplePolicy("stride", 3).ranges(DATA, 100)) == [b"a\n", b"c\n", b"e\n"]
+
+
+def test_long_lines_are_capped():
+    data = b"x" * 1000
+    assert SamplePolicy("head", 5).ranges(data, 100) == [(0, 100)]
+    assert SamplePolicy("tail", 5).ranges(data, 100) == [(900, 1000)]
+
+
+def test_policy_applies_only_to_large_files():
+    assert policy_for("app.log", 10) is None
+    assert policy_for("app.log", SAMPLE_MIN_BYTES + 1).mode == "head+tail"
+    assert policy_for("app.py", SAMPLE_MIN_BYTES + 1) is None
+
+
+def test_read_sample_marks_the_gap(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"".join(b"line %d\n" % i for i in range(1000)))
+    sample = read_sample(str(path), SamplePolicy("head+tail", 2), max_bytes=1000)
+    assert sample.splitlines()[1:3] == ["line 0", "line 1"]
+    assert "bytes omitted" in sample
+    assert sample.endswith("line 998\nline 999\n")
+
+
+def test_grown_log_is_sampled_on_extraction(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"started\n")
+    tree = scan_directory(str(tmp_path))
+    node = tree.children[0]
+    with open(path, "ab") as file:
+        file.write(b"more output\n" * (SAMPLE_MIN_BYTES // 10))
+    entry = build_entry(node, str(tmp_path))
+    assert b"[Sample: first and last" in entry
+    assert len(entry) < SAMPLE_MIN_BYTES
@@ -0,0 +1,76 @@
+import os
+from src import scan_cache
+from src.scan_cache import refresh, scan_with_cache
+
+
+def _paths(node, prefix=""):
+    paths = []
+    for child in node.children:
+        rel = prefix + child.name
+        paths.append(rel + "/" if child.is_dir else rel)
+        if child.is_dir:
+            paths.extend(_paths(child, rel + "/"))
+    return sorted(paths)
+
+
+def _project(tmp_path):
+    root = tmp_path / "project"
+    (root / "pkg" / "sub").mkdir(parents=True)
+    (root / "main.py").write_text("x = 1\n")
+    (root / "pkg" / "a.py").write_text("a = 1\n")
+    (root / "pkg" / "sub" / "b.py").write_text("b = 1\n")
+    return root, str(tmp_path / "cache")
+
+
+def _warm(root, cache_dir):
+    """The cached tree as the next load sees it, refreshed, with the directories re-listed."""
+    cached = scan_cache.load(str(root), cache_dir)
+    assert cached is not None
+    return refresh(cached)
+
+
+def test_cold_scan_is_saved_and_loaded(tmp_path):
+    root, cache_dir = _project(tmp_path)
+    tree = scan_with_cache(str(root), cache_dir=cache_dir)
+    assert _paths(tree) == ["main.py", "pkg/", "pkg/a.py", "pkg/sub/", "pkg/sub/b.py"]
+    cached = scan_cache.load(str(root), cache_dir)
+    assert _paths(cached) == _paths(tree)
+    assert [(c.name, c.size, c.mtime) for c in cached.children] == [(c.name, c.size, c.mtime) for c in tree.children]
+
+
+def test_refresh_follows_added_removed_and_renamed_entries(tmp_path):
+    root, cache_dir = _project(tmp_path)
+    scan_with_cache(str(root), cache_dir=cache_dir)
+
+    (root / "pkg" / "new.py").write_text("n = 1\n")
+    (root / "main.py").unlink()
+    os.rename(str(root / "pkg" / "sub"), str(root / "pkg" / "renamed"))
+    (root / "pkg" / "renamed" / "c.py").write_text("c = 1\n")
+    tree = scan_with_cache(str(root), cache_dir=cache_dir)
+    expected = ["pkg/", "pkg/a.py", "pkg/new.py", "pkg/renamed/", "pkg/renamed/b.py", "pkg/renamed/c.py"]
+    assert _paths(tree) == expected
+    for node in (tree, tree.children[0]):
+        assert all(child.parent is node for child in node.children)
+
+    # The refreshed tree was saved, so the next load starts from it
+    tree, relisted = _warm(root, cache_dir)
+    assert _paths(tree) == expected
+    assert relisted == 0
+
+
+def test_unchanged_tree_is_not_relisted(tmp_path):
+    root, cache_dir = _project(tmp_path)
+    assert scan_with_cache(str(root), cache_dir=cache_dir).mtime == os.stat(str(root)).st_mtime
+    tree, relisted = _warm(root, cache_dir)
+    assert relisted == 0
+    assert _paths(tree) == ["main.py", "pkg/", "pkg/a.py", "pkg/sub/", "pkg/sub/b.py"]
+
+
+def test_directories_found_by_a_refresh_are_not_relisted_again(tmp_path):
+    root, cache_dir = _project(tmp_path)
+    scan_with_cache(str(root), cache_dir=cache_dir)
+    (root / "added" / "deeper").mkdir(parents=True)
+    (root / "added" / "deeper" / "d.py").write_text("d = 1\n")
+    tree = scan_with_cache(str(root), cache_dir=cache_dir)
+    assert "added/deeper/d.py" in _paths(tree)
+    assert _warm(root, cache_dir)[1] == 0
@@ -0,0 +1,29 @@
+from fnmatch import fnmatch
+from src.file_node import FileNode
+from src.search_index import SearchIndex, GLOB, SUBSTRING
+
+NAMES = ["test_1.py", "test_a.py", "axyz.py", "bxyz.py", "dxyz.py", "main.py", "x]y.txt"]
+
+
+def _index():
+    root = FileNode("/project", None, True)
+    for name in NAMES:
+        root.children.append(FileNode(name, root, False))
+    index = SearchIndex()
+    index.add_tree(root)
+    return index
+
+
+def _names(nodes):
+    return sorted(node.name for node in nodes)
+
+
+def test_substring():
+    assert _names(_index().search("xyz", SUBSTRING)) == ["axyz.py", "bxyz.py", "dxyz.py"]
+
+
+def test_glob_matches_fnmatch():
+    index = _index()
+    for pattern in ["test_[0-9]*", "[abc]xyz*", "[!a]xyz.py", "*.py", "test_?.py", "x[]]y*", "main.p[y]"]:
+        expected = sorted(name for name in NAMES if fnmatch(name, pattern))
+        assert _names(index.search(pattern, GLOB)) == expected, pattern
@@ -0,0 +1,108 @@
+import os
+from src.file_node import FileNode
+from src.selection import CHECKED, PARTIAL, UNCHECKED, SelectionModel
+
+
+def _add(parent, name, is_dir=False):
+    node = FileNode(name, parent, is_dir)
+    parent.children.append(node)
+    return node
+
+
+def _tree():
+    """/project: a/ (x.py, y.py, b/ (z.py)), empty/, top.py"""
+    root = FileNode("/project", None, True)
+    a = _add(root, "a", True)
+    _add(a, "x.py")
+    _add(a, "y.py")
+    b = _add(a, "b", True)
+    _add(b, "z.py")
+    _add(root, "empty", True)
+    _add(root, "top.py")
+    return root
+
+
+def _node(root, rel_path):
+    node = root
+    for name in rel_path.split("/"):
+        node = next(child for child in node.children if child.name == name)
+    return node
+
+
+def test_counts_start_checked_or_unchecked():
+    root = _tree()
+    SelectionModel(root)
+    # Files and empty folders are the selectable leaves
+    assert (root.leaf_count, root.checked_count) == (5, 5)
+    assert SelectionModel.state(root) == CHECKED
+    SelectionModel(root, checked=False)
+    assert root.checked_count == 0 and SelectionModel.state(root) == UNCHECKED
+
+
+def test_toggling_a_file_makes_its_ancestors_partial():
+    root = _tree()
+    model = SelectionModel(root)
+    z = _node(root, "a/b/z.py")
+    assert model.toggle(z) == UNCHECKED
+    assert [model.state(_node(root, path)) for path in ("a/b", "a", "empty")] == [UNCHECKED, PARTIAL, CHECKED]
+    assert (root.leaf_count, root.checked_count) == (5, 4)
+    assert model.state(root) == PARTIAL
+
+    # A partial folder toggles to fully checked
+    assert model.toggle(_node(root, "a")) == CHECKED
+    assert model.state(root) == CHECKED
+    assert model.toggle(root) == UNCHECKED
+    assert all(node.checked_count == 0 for node in (root, _node(root, "a"), z))
+
+
+def test_selected_paths_skip_unchecked_subtrees():
+    root = _tree()
+    model = SelectionModel(root)
+    model.toggle(_node(root, "a/y.py"))
+    model.toggle(_node(root, "empty"))
+    expected = [os.path.join("/project", *path.split("/")) for path in ("a/x.py", "a/b", "a/b/z.py", "top.py")]
+    assert model.selected_paths() == expected
+    assert [node.path for node in model.selected_nodes()] == expected
+
+
+def test_select_only():
+    root = _tree()
+    model = SelectionModel(root)
+    model.select_only([_node(root, "a/b/z.py"), _node(root, "top.py")])
+    assert root.checked_count == 2
+    assert model.state(_node(root, "a")) == PARTIAL
+
+
+def test_children_changed_updates_every_ancestor():
+    root = _tree()
+    model = SelectionModel(root)
+    b = _node(root, "a/b")
+    new = _add(b, "new.py")
+    model.children_changed(b, [new], checked=False)
+    assert (root.leaf_count, root.checked_count) == (6, 5)
+    assert model.state(b) == PARTIAL
+
+    b.children.remove(new)
+    model.children_changed(b, [], checked=False)
+    assert (root.leaf_count, root.checked_count) == (5, 5)
+
+    # A folder emptied of its children becomes a leaf itself
+    empty_dir = _node(root, "a/b")
+    empty_dir.children.clear()
+    model.children_changed(empty_dir, [], checked=True)
+    assert (empty_dir.leaf_count, empty_dir.checked_count) == (1, 1)
+    assert (root.leaf_count, root.checked_count) == (5, 5)
+
+
+def test_copy_state_matches_children_by_name():
+    old = _tree()
+    old_model = SelectionModel(old)
+    old_model.toggle(_node(old, "a/x.py"))
+    new = _tree()
+    _add(_node(new, "a"), "added.py")
+    model = SelectionModel(new)
+    model.copy_state(old, new)
+    assert model.state(_node(new, "a/x.py")) == UNCHECKED
+    assert model.state(_node(new, "a/added.py")) == UNCHECKED
+    assert model.state(_node(new, "a/b")) == CHECKED
+    assert model.state(_node(new, "top.py")) == CHECKED
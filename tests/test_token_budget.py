@@ -0,0 +1,35 @@
+import threading
+from src.file_utils import scan_directory
+from src.token_budget import _cache_path, _load_cache, count_tokens
+
+
+def test_estimate_follows_a_file_edited_after_the_scan(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_bytes(b"x = 1\n")
+    cache_dir = str(tmp_path / "cache")
+    tree = scan_directory(str(tmp_path))
+    count_tokens(tree, max_workers=1, cache_dir=cache_dir)
+    small = tree.tokens
+
+    # The same nodes, as a warm scan cache would hand them back
+    path.write_bytes(b"value = compute(1, 2, 3)\n" * 1000)
+    count_tokens(tree, max_workers=1, cache_dir=cache_dir)
+    assert tree.children[0].size == path.stat().st_size
+    assert tree.tokens > small * 100
+
+
+def test_cancelled_count_keeps_the_cached_estimates(tmp_path):
+    files = tmp_path / "files"
+    files.mkdir()
+    for name in ("a.py", "b.py"):
+        (files / name).write_bytes(b"x = 1\n")
+    cache_dir = str(tmp_path / "cache")
+    count_tokens(scan_directory(str(files)), max_workers=1, cache_dir=cache_dir)
+    cache_file = _cache_path(str(files), cache_dir)
+    assert set(_load_cache(cache_file)) == {"a.py", "b.py"}
+
+    (files / "a.py").write_bytes(b"x = 2\ny = 3\n")
+    cancelled = threading.Event()
+    cancelled.set()
+    count_tokens(scan_directory(str(files)), max_workers=1, cache_dir=cache_dir, cancel_event=cancelled)
+    assert set(_load_cache(cache_file)) == {"a.py", "b.py"}
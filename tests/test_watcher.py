@@ -0,0 +1,75 @@
+import os
+import pytest
+from src.file_utils import scan_directory
+from src.selection import SelectionModel
+from src.watcher import ChangeBatches, compute_delta, apply_delta
+
+
+def _write(path, text="x = 1\n"):
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def _snapshot(node):
+    return {child.name: child for child in node.children}
+
+
+def test_compute_and_apply_delta(tmp_path):
+    _write(tmp_path / "a.py")
+    _write(tmp_path / "gone.py")
+    tree = scan_directory(str(tmp_path))
+    model = SelectionModel(tree)
+    _write(tmp_path / "b.py")
+    os.remove(tmp_path / "gone.py")
+
+    delta = compute_delta(tree, str(tmp_path), _snapshot(tree))
+    assert [c.name for c in delta.added] == ["b.py"]
+    assert [c.name for c in delta.removed] == ["gone.py"]
+    apply_delta(delta, model)
+    assert sorted(c.name for c in tree.children) == ["a.py", "b.py"]
+    assert tree.leaf_count == tree.checked_count == 2
+
+
+def test_batches_arriving_mid_job_are_held_until_it_is_applied(tmp_path):
+    _write(tmp_path / "a.py")
+    tree = scan_directory(str(tmp_path))
+    model = SelectionModel(tree)
+    batches = ChangeBatches()
+    _write(tmp_path / "b.py")
+
+    assert not batches.hold([str(tmp_path)])
+    batches.running = True
+    first = compute_delta(tree, str(tmp_path), _snapshot(tree))
+    # The second batch arrives before the first one's delta is applied
+    assert batches.hold([str(tmp_path)])
+    apply_delta(first, model)
+    held = batches.finish()
+    assert held == {str(tmp_path)} and not batches.running
+
+    # Its snapshot is taken only now, so b.py is already known
+    second = compute_delta(tree, str(tmp_path), _snapshot(tree))
+    assert not second
+    apply_delta(second, model)
+    assert sorted(c.name for c in tree.children) == ["a.py", "b.py"]
+    assert tree.leaf_count == 2
+    assert batches.finish() == set()
+
+
+def test_gui_applies_overlapping_batches_once(tmp_path):
+    pytest.importorskip("tkinter")
+    from benchmarks import headless
+
+    _write(tmp_path / "a.py")
+    tree = scan_directory(str(tmp_path))
+    app = headless.headless_app(tree, SelectionModel(tree))
+    app.populate_tree()
+    _write(tmp_path / "b.py")
+
+    app.handle_fs_changes([str(tmp_path)])
+    app.handle_fs_changes([str(tmp_path)])
+    while app.fs_batches.running:
+        action, data = app.queue.get(timeout=10)
+        if action == "fs_deltas":
+            app.apply_fs_deltas(*data)
+    assert sorted(c.name for c in tree.children) == ["a.py", "b.py"]
+    assert tree.leaf_count == 2